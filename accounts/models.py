@@ -5,6 +5,8 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.utils.translation import gettext_lazy as _
 
+from apps.core.medias import CheminReparti
+
 
 class CustomUser(AbstractUser):
     phone_number = models.CharField(
@@ -107,7 +109,7 @@ class UserProfile(models.Model):
         verbose_name="Numéro CNI/Passeport",
     )
     cni_scan = models.FileField(
-        upload_to='users/cni/',
+        upload_to=CheminReparti('users/cni/'),
         blank=True,
         null=True,
         verbose_name="Scan CNI/Passeport",
@@ -115,7 +117,7 @@ class UserProfile(models.Model):
 
     # Justificatif de domicile pour le KYC
     justificatif_domicile = models.FileField(
-        upload_to='users/justificatifs_domicile/',
+        upload_to=CheminReparti('users/justificatifs_domicile/'),
         blank=True,
         null=True,
         verbose_name="Justificatif de domicile",
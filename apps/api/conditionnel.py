@@ -0,0 +1,69 @@
+"""
+GET conditionnels (ETag / If-None-Match) pour le catalogue public.
+
+L'ETag est calculé sans sérialiser : une requête d'agrégat (nombre de biens,
+max(updated_at), somme des identifiants pour détecter un bien qui entre ou
+sort du catalogue) + la version du cache catalogue, incrémentée par les
+signaux sur Annonce / Bien / Bail et qui change chaque jour.
+Une réponse 304 évite la sérialisation et le transfert du contenu.
+"""
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db.models import Count, Max, Sum
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+
+from apps.core import cache as cache_public
+
+
+def _etag(*parties):
+    empreinte = hashlib.sha1("|".join(str(p) for p in parties).encode()).hexdigest()
+    # Faible : le contenu peut être recompressé par un proxy sans changer de sens
+    return f'W/"{empreinte}"'
+
+
+class CatalogueConditionnelMixin:
+    """
+    À placer avant la vue générique DRF (ListAPIView, RetrieveAPIView).
+    Ajoute ETag + Cache-Control public et répond 304 si le client est à jour.
+    """
+
+    def get_object(self):
+        # Évite de charger deux fois l'objet (ETag puis sérialisation)
+        if not hasattr(self, "_objet_conditionnel"):
+            self._objet_conditionnel = super().get_object()
+        return self._objet_conditionnel
+
+    def get_etag(self, request, *args, **kwargs):
+        parametres = urlencode(sorted(request.query_params.lists()), doseq=True)
+        if self.lookup_url_kwarg in kwargs or self.lookup_field in kwargs:
+            # Détail : l'objet lui-même (404 levée ici si indisponible)
+            obj = self.get_object()
+            etat = (obj.pk, obj.updated_at.isoformat())
+        else:
+            agregats = self.filter_queryset(self.get_queryset()).order_by().aggregate(
+                nb=Count("pk"), maj=Max("updated_at"), ids=Sum("pk")
+            )
+            etat = (agregats["nb"], agregats["maj"], agregats["ids"])
+        return _etag(cache_public.version(cache_public.CATALOGUE), request.path, parametres, *etat)
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag(request, *args, **kwargs)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        response["ETag"] = etag
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if request.method in ("GET", "HEAD") and response.status_code in (200, 304):
+            patch_cache_control(
+                response,
+                public=True,
+                max_age=settings.API_CATALOGUE_MAX_AGE,
+                stale_while_revalidate=settings.API_CATALOGUE_STALE,
+            )
+            patch_vary_headers(response, ("Accept",))
+        return response
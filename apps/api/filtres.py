@@ -0,0 +1,49 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from apps.core.models import Bien
+
+
+class BienFiltreBackend(BaseFilterBackend):
+    """
+    Filtres du catalogue :
+    ?ville=Dakar&type_bien=APPARTEMENT&loyer_min=50000&loyer_max=150000
+    &nb_pieces=3&nb_pieces_min=2&surface_min=40&surface_max=120
+    """
+
+    BORNES = {
+        "loyer_min": "loyer_ref__gte",
+        "loyer_max": "loyer_ref__lte",
+        "nb_pieces": "nb_pieces",
+        "nb_pieces_min": "nb_pieces__gte",
+        "surface_min": "surface__gte",
+        "surface_max": "surface__lte",
+    }
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+
+        if ville := params.get("ville"):
+            queryset = queryset.filter(ville__iexact=ville.strip())
+
+        if type_bien := params.get("type_bien"):
+            types = {code for code, _ in Bien.TYPE_CHOICES}
+            if type_bien not in types:
+                raise ValidationError({"type_bien": f"Valeurs possibles : {', '.join(sorted(types))}"})
+            queryset = queryset.filter(type_bien=type_bien)
+
+        erreurs = {}
+        for param, lookup in self.BORNES.items():
+            valeur = params.get(param)
+            if valeur in (None, ""):
+                continue
+            try:
+                entier = int(valeur)
+            except ValueError:
+                erreurs[param] = "Entier attendu."
+                continue
+            queryset = queryset.filter(**{lookup: entier})
+        if erreurs:
+            raise ValidationError(erreurs)
+
+        return queryset
@@ -0,0 +1,220 @@
+"""
+Sérialisation en lecture seule optimisée pour les listes.
+
+Au lieu d'instancier un modèle puis d'appeler le ModelSerializer champ par
+champ, on projette le queryset avec .values() (plus les annotations des
+champs calculés) et on construit les dicts directement. Les champs simples
+réutilisent le to_representation() du champ DRF correspondant : le JSON
+produit est identique octet pour octet à celui du serializer d'origine
+(vérifié par les tests de apps/api et `manage.py bench_serialisation`).
+
+    lecture = BienLecture(request)
+    page = paginator.paginate_queryset(lecture.projeter(queryset), request)
+    data = lecture.serialiser(page)
+"""
+from datetime import date
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.db import models
+from django.db.models import BooleanField, Exists, ExpressionWrapper, F, OuterRef, Q
+from rest_framework.relations import RelatedField
+from rest_framework.response import Response
+
+from apps.api.serializers import BailSerializer, BienSerializer, InterventionSerializer
+from apps.core.models import Bail
+from apps.core.services import images
+
+
+def _champ_modele(model, chemin):
+    """Champ de modèle au bout d'un chemin "a__b__c" (None si ce n'en est pas un)."""
+    champ = None
+    for partie in chemin.split("__"):
+        try:
+            champ = model._meta.get_field(partie)
+        except FieldDoesNotExist:
+            return None
+        model = champ.related_model or model
+    return champ
+
+
+class LectureRapide:
+    """
+    Base : `serializer_class` fournit la liste et l'ordre des champs ;
+    `calcules` associe aux champs non projetables une fonction ligne -> valeur ;
+    `annotations` ajoute au queryset les expressions dont ces fonctions ont besoin.
+    `photos` associe un champ "<photo>_derives" à son ImageField : les
+    manifestes des dérivés sont lus en une fois par page.
+    """
+
+    serializer_class = None
+    annotations = {}
+    calcules = {}
+    # Colonnes supplémentaires lues par les fonctions de `calcules`
+    colonnes = ()
+    photos = {}
+
+    def __init__(self, request=None):
+        self.request = request
+        self.serializer = self.serializer_class(context={"request": request})
+        self.model = self.serializer.Meta.model
+        self.calcules = dict(self.calcules)
+        for nom, champ_photo in self.photos.items():
+            self.calcules[nom] = lambda ligne, c=champ_photo: self._derives(ligne, c)
+        self._manifestes = {}
+        self.plan = [self._planifier(nom, champ) for nom, champ in self.serializer.fields.items()]
+
+    def _derives(self, ligne, champ_photo):
+        nom = ligne[champ_photo]
+        if not nom:
+            return None
+        storage = self.model._meta.get_field(champ_photo).storage
+        return images.urls_derives(self._manifestes.get(nom), storage, self.request)
+
+    def get_annotations(self, queryset):
+        return dict(self.annotations)
+
+    def _planifier(self, nom, champ):
+        if nom in self.calcules:
+            return nom, None, self.calcules[nom]
+
+        source = champ.source
+        affichage = source.startswith("get_") and source.endswith("_display")
+        chemin = source[4:-8] if affichage else source.replace(".", "__")
+        champ_modele = _champ_modele(self.model, chemin)
+        if champ_modele is None:
+            raise ImproperlyConfigured(f"{type(self).__name__} : champ '{nom}' non projetable, à déclarer dans calcules")
+
+        if affichage:
+            libelles = dict(champ_modele.flatchoices)
+            return nom, chemin, lambda v: libelles.get(v, v)
+        if isinstance(champ_modele, models.FileField):
+            # to_representation attend un FieldFile (url via le storage)
+            return nom, chemin, lambda v, f=champ_modele, c=champ: c.to_representation(f.attr_class(None, f, v))
+        if isinstance(champ, RelatedField):
+            return nom, chemin, lambda v: v
+        return nom, chemin, champ.to_representation
+
+    def projeter(self, queryset):
+        """Queryset de dicts contenant tout ce que serialiser() lit."""
+        chemins = {chemin for _, chemin, _ in self.plan if chemin}
+        chemins.update(self.colonnes)
+        chemins.update(self.photos.values())
+        return queryset.annotate(**self.get_annotations(queryset)).values(*chemins)
+
+    def serialiser(self, lignes):
+        if self.photos:
+            lignes = list(lignes)
+            self._manifestes = images.manifestes(
+                ligne[champ] for ligne in lignes for champ in self.photos.values()
+            )
+        plan = self.plan
+        resultat = []
+        for ligne in lignes:
+            donnees = {}
+            for nom, chemin, convertir in plan:
+                if chemin is None:
+                    donnees[nom] = convertir(ligne)
+                else:
+                    valeur = ligne[chemin]
+                    donnees[nom] = None if valeur is None else convertir(valeur)
+            resultat.append(donnees)
+        return resultat
+
+
+def lecture_active():
+    return getattr(settings, "API_LECTURE_RAPIDE", True)
+
+
+class LectureRapideListMixin:
+    """list() des vues génériques DRF via `lecture_class` (repli sur le serializer si désactivé)."""
+
+    lecture_class = None
+
+    def list(self, request, *args, **kwargs):
+        if self.lecture_class is None or not lecture_active():
+            return super().list(request, *args, **kwargs)
+
+        lecture = self.lecture_class(request)
+        lignes = lecture.projeter(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(lignes)
+        if page is not None:
+            return self.get_paginated_response(lecture.serialiser(page))
+        return Response(lecture.serialiser(lignes))
+
+
+# ============================================================================
+# IMPLÉMENTATIONS
+# ============================================================================
+
+def _bail_actif_sur_bien():
+    today = date.today()
+    return Exists(
+        Bail.objects.filter(
+            bien=OuterRef("pk"),
+            est_signe=True,
+            date_debut__lte=today,
+            date_fin__gte=today,
+        )
+    )
+
+
+def _disponibilite(ligne):
+    est_disponible = ligne["disponible_annote"]
+    return {
+        "est_disponible": bool(est_disponible),
+        "label": "Disponible" if est_disponible else "Occupé",
+    }
+
+
+class BienLecture(LectureRapide):
+    serializer_class = BienSerializer
+    # id / created_at : colonnes d'ordre de la pagination par curseur
+    colonnes = ("id", "created_at", "loyer_ref", "disponible_annote")
+    photos = {"photo_principale_derives": "photo_principale"}
+    calcules = {
+        "loyer_mensuel": lambda ligne: None if ligne["loyer_ref"] is None else int(ligne["loyer_ref"]),
+        "disponibilite": _disponibilite,
+    }
+
+    def get_annotations(self, queryset):
+        # Catalogue : la vue annote déjà disponible_annote, pas de sous-requête par ligne
+        if "disponible_annote" in queryset.query.annotations:
+            return {}
+        # Construit à chaque projection : "aujourd'hui" reste juste
+        return {
+            "disponible_annote": ExpressionWrapper(
+                Q(est_actif=True) & ~_bail_actif_sur_bien(), output_field=BooleanField()
+            ),
+        }
+
+
+def _nom_complet(prefixe):
+    # Même résultat que AbstractUser.get_full_name()
+    return lambda ligne: f"{ligne[prefixe + 'first_name']} {ligne[prefixe + 'last_name']}".strip()
+
+
+class BailLecture(LectureRapide):
+    serializer_class = BailSerializer
+    colonnes = (
+        "bien__proprietaire__first_name",
+        "bien__proprietaire__last_name",
+        "locataire__first_name",
+        "locataire__last_name",
+        "loyer_mensuel_annote",
+    )
+    annotations = {
+        "loyer_mensuel_annote": ExpressionWrapper(
+            F("montant_loyer") + F("montant_charges"), output_field=models.DecimalField()
+        ),
+    }
+    calcules = {
+        "proprietaire_nom": _nom_complet("bien__proprietaire__"),
+        "locataire_nom": _nom_complet("locataire__"),
+        "loyer_mensuel": lambda ligne: int(ligne["loyer_mensuel_annote"]),
+    }
+
+
+class InterventionLecture(LectureRapide):
+    serializer_class = InterventionSerializer
+    photos = {"photo_avant_derives": "photo_avant", "photo_apres_derives": "photo_apres"}
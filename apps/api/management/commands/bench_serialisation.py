@@ -0,0 +1,120 @@
+"""
+Compare le débit (lignes/s) des serializers DRF et de la lecture rapide
+(apps/api/lecture_rapide.py) et vérifie que le JSON produit est identique.
+
+Le jeu de données est créé puis annulé (transaction), comme pour `bench`.
+
+Usage:
+    python manage.py bench_serialisation
+    python manage.py bench_serialisation --biens 2000 --repetitions 10
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import BooleanField, Value
+from django.test import RequestFactory
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from apps.api.lecture_rapide import BailLecture, BienLecture, InterventionLecture
+from apps.api.serializers import BailSerializer, BienSerializer, InterventionSerializer
+from apps.core.benchmark import creer_jeu_de_donnees
+from apps.core.models import Bail, Bien, Intervention
+
+
+class _Rollback(Exception):
+    """Levée pour annuler la transaction du jeu de données."""
+
+
+def _cas():
+    # (nom, serializer, lecture, fabrique de queryset) ; tri stable pour comparer les sorties
+    return [
+        (
+            "biens_catalogue",
+            BienSerializer,
+            BienLecture,
+            lambda: Bien.objects.disponibles()
+            .annotate(disponible_annote=Value(True, output_field=BooleanField()))
+            .order_by("pk"),
+        ),
+        ("biens_tous", BienSerializer, BienLecture, lambda: Bien.objects.order_by("pk")),
+        (
+            "baux",
+            BailSerializer,
+            BailLecture,
+            lambda: Bail.objects.select_related("bien__proprietaire", "locataire").order_by("pk"),
+        ),
+        ("interventions", InterventionSerializer, InterventionLecture, lambda: Intervention.objects.order_by("pk")),
+    ]
+
+
+class Command(BaseCommand):
+    help = "Débit des serializers DRF vs lecture rapide (.values()) et contrôle d'identité du JSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--biens',
+            type=int,
+            default=500,
+            help='Taille du jeu de données en nombre de biens (défaut: 500)',
+        )
+        parser.add_argument(
+            '--repetitions',
+            type=int,
+            default=5,
+            help='Mesures par cas, la meilleure est retenue (défaut: 5)',
+        )
+
+    def handle(self, *args, **options):
+        request = Request(RequestFactory().get("/api/"))
+        renderer = JSONRenderer()
+        differences = []
+
+        try:
+            # Les URLs absolues des fichiers passent par request.get_host()
+            with override_settings(ALLOWED_HOSTS=["testserver", *settings.ALLOWED_HOSTS]), transaction.atomic():
+                creer_jeu_de_donnees(nb_biens=options['biens'])
+
+                self.stdout.write(f"{'Cas':<18} {'Lignes':>7} {'DRF l/s':>10} {'Rapide l/s':>11} {'Gain':>6}  JSON")
+                for nom, serializer_class, lecture_class, queryset in _cas():
+
+                    def drf():
+                        return serializer_class(queryset(), many=True, context={"request": request}).data
+
+                    def rapide():
+                        lecture = lecture_class(request)
+                        return lecture.serialiser(lecture.projeter(queryset()))
+
+                    json_drf, duree_drf = self._mesurer(drf, renderer, options['repetitions'])
+                    json_rapide, duree_rapide = self._mesurer(rapide, renderer, options['repetitions'])
+                    nb = queryset().count()
+                    identique = json_drf == json_rapide
+                    if not identique:
+                        differences.append(nom)
+
+                    style = self.style.SUCCESS if identique else self.style.ERROR
+                    self.stdout.write(
+                        style(
+                            f"{nom:<18} {nb:>7} {nb / duree_drf:>10,.0f} {nb / duree_rapide:>11,.0f} "
+                            f"{duree_drf / duree_rapide:>5.1f}x  {'identique' if identique else 'DIFFÉRENT'}"
+                        )
+                    )
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        if differences:
+            raise CommandError(f"JSON différent pour : {', '.join(differences)}")
+
+    @staticmethod
+    def _mesurer(fonction, renderer, repetitions):
+        meilleure = float("inf")
+        contenu = None
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            contenu = renderer.render(fonction())
+            meilleure = min(meilleure, time.perf_counter() - debut)
+        return contenu, meilleure
@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class CatalogueCursorPagination(CursorPagination):
+    """
+    Pagination par curseur : coût constant quelle que soit la page
+    (pas d'OFFSET) et stable si des biens sont ajoutés pendant le défilement.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    # Ordre total requis par le curseur : id départage les created_at égaux
+    ordering = ("-created_at", "-id")
@@ -1,13 +1,33 @@
 from apps.core.models import Intervention, Bien, Bail
+from django.conf import settings
 from rest_framework import serializers
 from rest_framework import serializers
 
-from apps.core.models import Intervention, Bien, Bail
+from apps.core.models import Intervention, Bien, Bail, Loyer, Televersement
+from apps.core.services import images
+
+
+class ChampsDynamiquesMixin:
+    """
+    Sparse fieldset : ?fields=id,titre,loyer_mensuel ne sérialise (et ne
+    calcule) que ces champs. Les noms inconnus sont ignorés.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        demandes = request.query_params.get("fields") if request is not None else None
+        if not demandes:
+            return
+        gardes = {nom.strip() for nom in demandes.split(",")}
+        for nom in set(self.fields) - gardes:
+            self.fields.pop(nom)
 
 
-class BienSerializer(serializers.ModelSerializer):
+class BienSerializer(ChampsDynamiquesMixin, serializers.ModelSerializer):
     loyer_mensuel = serializers.SerializerMethodField(read_only=True)
     disponibilite = serializers.SerializerMethodField(read_only=True)
+    photo_principale_derives = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Bien
@@ -22,6 +42,8 @@ class BienSerializer(serializers.ModelSerializer):
             "loyer_mensuel",
             "charges_ref",
             "disponibilite",
+            "photo_principale",
+            "photo_principale_derives",
             "est_actif",
             "created_at",
         ]
@@ -41,17 +63,27 @@ class BienSerializer(serializers.ModelSerializer):
             return value
 
     def get_disponibilite(self, obj):
+        # Annotation posée par les vues catalogue : évite 2 requêtes par bien
+        est_disponible = getattr(obj, "disponible_annote", None)
+        if est_disponible is None:
+            est_disponible = obj.est_disponible
         return {
-            "est_disponible": bool(obj.est_disponible),
-            "label": "Disponible" if obj.est_disponible else "Occupé",
+            "est_disponible": bool(est_disponible),
+            "label": "Disponible" if est_disponible else "Occupé",
         }
 
+    def get_photo_principale_derives(self, obj):
+        # {"webp": {"320": url, ...}, "jpeg": {...}} ; None tant que non générés
+        return images.derives(obj.photo_principale, self.context.get("request"))
+
 
 class InterventionSerializer(serializers.ModelSerializer):
     statut_display = serializers.CharField(
         source="get_statut_display",
         read_only=True,
     )
+    photo_avant_derives = serializers.SerializerMethodField(read_only=True)
+    photo_apres_derives = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = Intervention
@@ -60,12 +92,22 @@ class InterventionSerializer(serializers.ModelSerializer):
             "objet",
             "description",
             "photo_avant",
+            "photo_avant_derives",
+            "photo_apres",
+            "photo_apres_derives",
             "statut",
             "statut_display",
             "created_at",
+            "updated_at",
         ]
         # statut fixé en lecture seule côté API si on gères le changement de statut ailleurs
-        read_only_fields = ["statut", "created_at"]
+        read_only_fields = ["statut", "photo_apres", "created_at", "updated_at"]
+
+    def get_photo_avant_derives(self, obj):
+        return images.derives(obj.photo_avant, self.context.get("request"))
+
+    def get_photo_apres_derives(self, obj):
+        return images.derives(obj.photo_apres, self.context.get("request"))
 class BailSerializer(serializers.ModelSerializer):
     bien_titre = serializers.CharField(source="bien.titre", read_only=True)
     bien_adresse = serializers.CharField(source="bien.adresse", read_only=True)
@@ -100,6 +142,7 @@ class BailSerializer(serializers.ModelSerializer):
             "est_signe",
             "fichier_contrat",
             "created_at",
+            "updated_at",
         ]
         read_only_fields = [
             "id",
@@ -110,6 +153,7 @@ class BailSerializer(serializers.ModelSerializer):
             "locataire_nom",
             "loyer_mensuel",
             "created_at",
+            "updated_at",
         ]
 
     def get_loyer_mensuel(self, obj):
@@ -120,3 +164,52 @@ class BailSerializer(serializers.ModelSerializer):
             return int(obj.loyer_total())
         except Exception:
             return int(obj.montant_loyer + obj.montant_charges)
+
+
+class LoyerSerializer(serializers.ModelSerializer):
+    """Échéance vue par le locataire (avec le lien de sa quittance)."""
+
+    statut_display = serializers.CharField(source="get_statut_display", read_only=True)
+    reste_a_payer = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Loyer
+        fields = [
+            "id",
+            "bail",
+            "periode_debut",
+            "periode_fin",
+            "date_echeance",
+            "montant_du",
+            "montant_verse",
+            "reste_a_payer",
+            "statut",
+            "statut_display",
+            "date_paiement",
+            "quittance",
+            "updated_at",
+        ]
+        read_only_fields = fields
+
+
+class TeleversementSerializer(serializers.ModelSerializer):
+    """Création / état d'un téléversement reprenable (voir apps/core/services/televersement.py)."""
+
+    taille_morceau = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Televersement
+        fields = [
+            "id",
+            "cible",
+            "nom_original",
+            "type_mime",
+            "taille",
+            "recu",
+            "statut",
+            "taille_morceau",
+        ]
+        read_only_fields = ["id", "recu", "statut"]
+
+    def get_taille_morceau(self, obj):
+        return settings.TELEVERSEMENT_TAILLE_MORCEAU
@@ -0,0 +1,65 @@
+"""
+Synchronisation différentielle de l'application mobile locataire.
+
+Le client envoie le curseur reçu lors de la synchronisation précédente
+(`?since=<curseur>`) et ne reçoit que ce qui a changé depuis : baux, loyers
+(avec quittance), interventions, et les suppressions (tombstones).
+
+Le curseur encode l'instant de début de la requête précédente. Une marge
+de recouvrement (MARGE) rattrape les transactions validées après coup :
+un même objet peut donc revenir deux fois, le client doit l'écraser (upsert).
+"""
+import base64
+import binascii
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from apps.core.models import Bail, Intervention, Loyer, Suppression
+
+MARGE = timedelta(seconds=5)
+
+
+def encoder_curseur(instant):
+    return base64.urlsafe_b64encode(instant.isoformat().encode()).decode().rstrip("=")
+
+
+def decoder_curseur(curseur):
+    if not curseur:
+        return None
+    try:
+        brut = base64.urlsafe_b64decode(curseur + "=" * (-len(curseur) % 4)).decode()
+        instant = datetime.fromisoformat(brut)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValidationError({"since": "Curseur invalide, relancez une synchronisation complète."})
+    if timezone.is_naive(instant):
+        raise ValidationError({"since": "Curseur invalide, relancez une synchronisation complète."})
+    return instant
+
+
+def delta_locataire(user, depuis=None):
+    """
+    Querysets des objets visibles par `user` modifiés depuis `depuis`
+    (tout, sans suppressions, si `depuis` est None). Chaque filtre
+    s'appuie sur un index (<fk>, updated_at).
+    """
+    baux = Bail.objects.filter(locataire=user).select_related("bien__proprietaire", "locataire")
+    loyers = Loyer.objects.filter(bail__locataire=user, bail__deleted_at__isnull=True)
+    interventions = Intervention.objects.filter(locataire=user)
+
+    if depuis is None:
+        suppressions = Suppression.objects.none()
+    else:
+        borne = depuis - MARGE
+        baux = baux.filter(updated_at__gte=borne)
+        loyers = loyers.filter(updated_at__gte=borne)
+        interventions = interventions.filter(updated_at__gte=borne)
+        suppressions = Suppression.objects.filter(locataire=user, deleted_at__gte=borne)
+
+    return {
+        "baux": baux.order_by("updated_at"),
+        "loyers": loyers.order_by("updated_at"),
+        "interventions": interventions.order_by("updated_at"),
+        "suppressions": suppressions.order_by("deleted_at").values("type_objet", "objet_id"),
+    }
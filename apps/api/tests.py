@@ -0,0 +1,243 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db.models import BooleanField, Value
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from apps.api.lecture_rapide import BailLecture, BienLecture, InterventionLecture
+from apps.api.serializers import BailSerializer, BienSerializer, InterventionSerializer
+from apps.core.models import Bail, Bien, Intervention, Loyer
+
+
+def creer_bien(proprietaire, titre="Studio", **champs):
+    champs = {"ville": "Dakar", "adresse": "Plateau", "surface": 30, "loyer_ref": Decimal("100000"), **champs}
+    return Bien.objects.create(titre=titre, proprietaire=proprietaire, **champs)
+
+
+class CatalogueApiTestCase(TestCase):
+    """Catalogue public : bailleur et biens communs, cache vidé à chaque test."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.bailleur = get_user_model().objects.create_user(username="bailleur", password="pass1234")
+        cls.biens = [creer_bien(cls.bailleur, titre=f"Bien {i}") for i in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+
+class CatalogueConditionnelTests(CatalogueApiTestCase):
+    url = "/api/biens/mobile/"
+
+    def test_etag_et_cache_control_public(self):
+        reponse = self.client.get(self.url)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertTrue(reponse["ETag"].startswith('W/"'))
+        self.assertIn("public", reponse["Cache-Control"])
+        self.assertIn("max-age=", reponse["Cache-Control"])
+
+    def test_if_none_match_a_jour_renvoie_304(self):
+        etag = self.client.get(self.url)["ETag"]
+        reponse = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(reponse.status_code, 304)
+        self.assertEqual(reponse.content, b"")
+        self.assertEqual(reponse["ETag"], etag)
+
+    def test_etag_change_apres_modification_d_un_bien(self):
+        etag = self.client.get(self.url)["ETag"]
+        bien = self.biens[0]
+        bien.titre = "Studio rénové"
+        bien.save()
+
+        reponse = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(reponse.status_code, 200)
+        self.assertNotEqual(reponse["ETag"], etag)
+        self.assertIn("Studio rénové", [b["titre"] for b in reponse.json()["results"]])
+
+    def test_etag_depend_des_parametres(self):
+        self.assertNotEqual(
+            self.client.get(self.url)["ETag"], self.client.get(self.url, {"ville": "Thiès"})["ETag"]
+        )
+
+    def test_detail_conditionnel(self):
+        url = f"/api/mobile/biens/{self.biens[0].pk}/"
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.biens[0].save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class CataloguePaginationFiltresTests(CatalogueApiTestCase):
+    url = "/api/biens/mobile/"
+
+    def _parcourir(self, url, ajout_en_cours=None):
+        ids = []
+        while url:
+            reponse = self.client.get(url)
+            self.assertEqual(reponse.status_code, 200)
+            donnees = reponse.json()
+            ids += [bien["id"] for bien in donnees["results"]]
+            url = donnees["next"]
+            if ajout_en_cours and url:
+                creer_bien(self.bailleur, titre=ajout_en_cours)
+                ajout_en_cours = None
+        return ids
+
+    def test_curseur_stable_entre_les_pages(self):
+        attendus = list(Bien.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        self.assertEqual(self._parcourir(f"{self.url}?page_size=2"), attendus)
+
+    def test_bien_ajoute_pendant_le_defilement(self):
+        attendus = list(Bien.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+        # Le nouveau bien est en tête : ni doublon ni décalage dans les pages suivantes
+        self.assertEqual(self._parcourir(f"{self.url}?page_size=1", ajout_en_cours="Nouveau"), attendus)
+
+    def test_filtres(self):
+        creer_bien(self.bailleur, titre="Villa", ville="Thiès", type_bien="MAISON", surface=150)
+        reponse = self.client.get(self.url, {"ville": "thiès", "surface_min": "100"})
+        self.assertEqual([b["titre"] for b in reponse.json()["results"]], ["Villa"])
+
+    def test_valeurs_de_filtre_invalides(self):
+        reponse = self.client.get(self.url, {"loyer_min": "abc", "surface_max": "1.5"})
+        self.assertEqual(reponse.status_code, 400)
+        self.assertEqual(set(reponse.json()), {"loyer_min", "surface_max"})
+
+        reponse = self.client.get(self.url, {"type_bien": "CHATEAU"})
+        self.assertEqual(reponse.status_code, 400)
+        self.assertIn("type_bien", reponse.json())
+
+    def test_fields_restreint_les_champs(self):
+        for lecture_rapide in (True, False):
+            with self.subTest(lecture_rapide=lecture_rapide), self.settings(API_LECTURE_RAPIDE=lecture_rapide):
+                resultats = self.client.get(self.url, {"fields": "id, titre,inconnu"}).json()["results"]
+                self.assertEqual(len(resultats), 3)
+                self.assertTrue(all(set(bien) == {"id", "titre"} for bien in resultats))
+
+
+class MobileMeTests(TestCase):
+    url = "/api/mobile/me/"
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        bailleur = User.objects.create_user(username="bailleur", password="pass1234")
+        cls.locataire = User.objects.create_user(username="awa", password="pass1234")
+        cls.locataire.groups.add(Group.objects.create(name="LOCATAIRE"))
+        aujourd_hui = date.today()
+        cls.bien = creer_bien(bailleur)
+        cls.bail = Bail.objects.create(
+            bien=cls.bien, locataire=cls.locataire, date_debut=aujourd_hui - timedelta(days=365),
+            date_fin=aujourd_hui + timedelta(days=365), montant_loyer=Decimal("100000"),
+            depot_garantie=Decimal("1"), est_signe=True,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.client.force_login(self.locataire)
+
+    def _loyers(self, nombre, **champs):
+        debut = self.bail.date_debut
+        deja = Loyer.objects.filter(bail=self.bail).count()
+        return [
+            Loyer.objects.create(
+                bail=self.bail, periode_debut=debut + timedelta(days=31 * i), periode_fin=debut + timedelta(days=31 * i + 27),
+                date_echeance=debut + timedelta(days=31 * i + 4), montant_du=Decimal("100000"), **champs,
+            )
+            for i in range(deja, deja + nombre)
+        ]
+
+    @override_settings(API_ME_NB_LOYERS=2)
+    def test_solde_sur_tous_les_impayes(self):
+        self._loyers(4, montant_verse=Decimal("25000"), statut="PARTIEL")
+        donnees = self.client.get(self.url).json()
+        self.assertEqual(len(donnees["loyers"]), 2)
+        self.assertEqual(donnees["solde_du"], 4 * 75000)
+
+    def test_nombre_de_requetes_fixe(self):
+        self._loyers(2)
+        # Session, utilisateur, 2 groupes (IsTenant), puis bail, loyers (prefetch), solde, interventions
+        with self.assertNumQueries(8):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+        cache.clear()
+        self._loyers(8)
+        for i in range(5):
+            Intervention.objects.create(locataire=self.locataire, bien=self.bien, objet=f"Fuite {i}", description="")
+        with self.assertNumQueries(8):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_cache_par_locataire_invalide_par_un_paiement(self):
+        loyer = self._loyers(1)[0]
+        self.assertEqual(self.client.get(self.url).json()["solde_du"], 100000)
+        # Deuxième appel servi par le cache : seulement session, utilisateur, groupes
+        with self.assertNumQueries(4):
+            self.client.get(self.url)
+
+        loyer.enregistrer_paiement(Decimal("40000"))
+        donnees = self.client.get(self.url).json()
+        self.assertEqual(donnees["solde_du"], 60000)
+        self.assertEqual(donnees["loyers"][0]["statut"], "PARTIEL")
+
+
+class LectureRapideTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        bailleur = User.objects.create_user(username="bailleur", first_name="Moussa", last_name="Fall", password="pass1234")
+        locataire = User.objects.create_user(username="awa", first_name="Awa", password="pass1234")
+        aujourd_hui = date.today()
+        cls.loue = creer_bien(bailleur, titre="Loué", type_bien="MAISON", photo_principale="biens/loue.jpg")
+        creer_bien(bailleur, titre="Libre", charges_ref=Decimal("5000"))
+        creer_bien(bailleur, titre="Retiré", est_actif=False)
+        Bail.objects.create(
+            bien=cls.loue, locataire=locataire, date_debut=aujourd_hui - timedelta(days=30),
+            date_fin=aujourd_hui + timedelta(days=335), montant_loyer=Decimal("150000"),
+            montant_charges=Decimal("10000"), depot_garantie=Decimal("300000"), est_signe=True,
+            fichier_contrat="baux_signes/contrat.pdf",
+        )
+        Intervention.objects.create(locataire=locataire, bien=cls.loue, objet="Fuite", description="Cuisine", photo_avant="interventions/fuite.jpg")
+        Intervention.objects.create(
+            locataire=locataire, bien=cls.loue, objet="Serrure", description="Entrée",
+            photo_avant="interventions/serrure.jpg", photo_apres="interventions/serrure_reparee.jpg",
+        )
+
+    def setUp(self):
+        self.request = Request(RequestFactory().get("/api/"))
+
+    def _comparer(self, serializer_class, lecture_class, queryset):
+        drf = serializer_class(queryset, many=True, context={"request": self.request}).data
+        lecture = lecture_class(self.request)
+        rapide = lecture.serialiser(lecture.projeter(queryset))
+        self.assertEqual(JSONRenderer().render(rapide), JSONRenderer().render(drf))
+
+    def test_biens_identiques_octet_pour_octet(self):
+        self._comparer(BienSerializer, BienLecture, Bien.objects.order_by("pk"))
+
+    def test_catalogue_identique_sans_sous_requete_par_ligne(self):
+        catalogue = Bien.objects.disponibles().annotate(
+            disponible_annote=Value(True, output_field=BooleanField())
+        ).order_by("pk")
+        self._comparer(BienSerializer, BienLecture, catalogue)
+
+        # Disponibilité déjà annotée par la vue : aucune sous-requête ajoutée à la projection
+        projete = str(BienLecture(self.request).projeter(catalogue).query)
+        self.assertEqual(projete.count("EXISTS"), str(catalogue.query).count("EXISTS"))
+        self.assertGreater(str(BienLecture(self.request).projeter(Bien.objects.all()).query).count("EXISTS"), 0)
+
+    def test_baux_identiques_octet_pour_octet(self):
+        self._comparer(BailSerializer, BailLecture, Bail.objects.select_related("bien__proprietaire", "locataire"))
+
+    def test_interventions_identiques_octet_pour_octet(self):
+        self._comparer(InterventionSerializer, InterventionLecture, Intervention.objects.order_by("pk"))
+
+    def test_sparse_fieldset_identique(self):
+        self.request = Request(RequestFactory().get("/api/", {"fields": "id,disponibilite,loyer_mensuel"}))
+        self._comparer(BienSerializer, BienLecture, Bien.objects.order_by("pk"))
@@ -1,9 +1,25 @@
 from django.urls import path
 
-from .views import BienDetailView, InterventionListCreateView, BienListView
+from .views import (
+    BienDetailView,
+    BienListView,
+    InterventionListCreateView,
+    MobileMeView,
+    MobileSyncView,
+    MyBailView,
+    TeleversementCreateView,
+    TeleversementDetailView,
+    WebhookPaiementView,
+)
 
 urlpatterns = [
     path('biens/mobile/', BienListView.as_view()),
     path('mobile/biens/<int:pk>/', BienDetailView.as_view(), name='api-mobile-biens-detail'),
     path('mobile/interventions/', InterventionListCreateView.as_view(), name='api-mobile-interventions'),
+    path('mobile/sync/', MobileSyncView.as_view(), name='api-mobile-sync'),
+    path('mobile/me/', MobileMeView.as_view(), name='api-mobile-me'),
+    path('mobile/bail/', MyBailView.as_view(), name='api-mobile-bail'),
+    path('televersements/', TeleversementCreateView.as_view(), name='api-televersements'),
+    path('televersements/<uuid:pk>/', TeleversementDetailView.as_view(), name='api-televersement'),
+    path('webhooks/paiements/<str:provider>/', WebhookPaiementView.as_view(), name='api-webhook-paiement'),
 ]
\ No newline at end of file
@@ -1,31 +1,69 @@
-from rest_framework import generics, permissions
-from rest_framework.exceptions import PermissionDenied
+import io
+import logging
+from datetime import date
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models import BooleanField, F, Prefetch, Sum, Value
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from apps.api.conditionnel import CatalogueConditionnelMixin
+from apps.api.filtres import BienFiltreBackend
+from apps.api.lecture_rapide import (
+    BailLecture,
+    BienLecture,
+    InterventionLecture,
+    LectureRapideListMixin,
+    lecture_active,
+)
+from apps.api.pagination import CatalogueCursorPagination
 from apps.api.permissions import IsTenant
-from apps.core.models import Bien, Intervention
+from apps.api.sync import decoder_curseur, delta_locataire, encoder_curseur
+from apps.core import cache as cache_public
+from apps.core.models import Bail, Bien, Intervention, Loyer, Televersement
 from apps.core.permissions import get_active_bail
+from apps.core.services import televersement, webhooks
+from apps.core.tasks import traiter_evenement_paiement
 from .serializers import (
     BienSerializer,
     InterventionSerializer,
     BailSerializer,
+    LoyerSerializer,
+    TeleversementSerializer,
 )
 
+logger = logging.getLogger(__name__)
 
-class BienListView(generics.ListAPIView):
+
+class BienListView(CatalogueConditionnelMixin, LectureRapideListMixin, generics.ListAPIView):
     """
     Liste publique des biens disponibles.
     Accessible sans authentification pour la vitrine.
+    GET conditionnel : 304 si l'ETag envoyé (If-None-Match) est à jour.
+    Paginée par curseur, filtrable (voir BienFiltreBackend), ?fields=... pour
+    ne recevoir que certains champs.
     """
     serializer_class = BienSerializer
+    lecture_class = BienLecture
     permission_classes = [permissions.AllowAny]
+    pagination_class = CatalogueCursorPagination
+    filter_backends = [BienFiltreBackend]
 
     def get_queryset(self):
-        return Bien.objects.disponibles().order_by("-created_at")
+        # Tous les biens listés sont disponibles par construction
+        return Bien.objects.disponibles().annotate(
+            disponible_annote=Value(True, output_field=BooleanField())
+        )
 
 
-class BienDetailView(generics.RetrieveAPIView):
+class BienDetailView(CatalogueConditionnelMixin, generics.RetrieveAPIView):
     """
     Détail public d'un bien actif.
     Utilise la même logique que la liste pour la cohérence.
@@ -35,16 +73,19 @@ class BienDetailView(generics.RetrieveAPIView):
 
     def get_queryset(self):
         # Utilise disponibles() pour rester cohérent avec la liste
-        return Bien.objects.disponibles()
+        return Bien.objects.disponibles().annotate(
+            disponible_annote=Value(True, output_field=BooleanField())
+        )
 
 
-class InterventionListCreateView(generics.ListCreateAPIView):
+class InterventionListCreateView(LectureRapideListMixin, generics.ListCreateAPIView):
     """
     Endpoint pour lister et créer des interventions.
     - GET : liste les interventions du locataire connecté
     - POST : crée une nouvelle intervention (auto-associe le bail/bien)
     """
     serializer_class = InterventionSerializer
+    lecture_class = InterventionLecture
     permission_classes = [IsTenant]
 
     def get_queryset(self):
@@ -76,3 +117,239 @@ class MyBailView(APIView):
         serializer = BailSerializer(bail)
         return Response(serializer.data)
 
+
+class MobileSyncView(APIView):
+    """
+    Synchronisation différentielle du locataire : GET /api/mobile/sync/?since=<curseur>.
+    Sans `since`, renvoie tout (synchronisation initiale). Toujours renvoyer
+    ensuite le `cursor` reçu dans la réponse précédente.
+    """
+    permission_classes = [IsTenant]
+
+    def get(self, request):
+        depuis = decoder_curseur(request.query_params.get("since"))
+        # Pris avant les requêtes : un changement concurrent sera revu au prochain appel
+        maintenant = timezone.now()
+        delta = delta_locataire(request.user, depuis)
+        contexte = {"request": request}
+
+        if lecture_active():
+            baux = BailLecture(request)
+            interventions = InterventionLecture(request)
+            baux = baux.serialiser(baux.projeter(delta["baux"]))
+            interventions = interventions.serialiser(interventions.projeter(delta["interventions"]))
+        else:
+            baux = BailSerializer(delta["baux"], many=True, context=contexte).data
+            interventions = InterventionSerializer(delta["interventions"], many=True, context=contexte).data
+
+        return Response(
+            {
+                "cursor": encoder_curseur(maintenant),
+                "complet": depuis is None,
+                "baux": baux,
+                "loyers": LoyerSerializer(delta["loyers"], many=True, context=contexte).data,
+                "interventions": interventions,
+                "suppressions": [
+                    {"type": s["type_objet"], "id": s["objet_id"]} for s in delta["suppressions"]
+                ],
+            }
+        )
+
+
+class MobileMeView(APIView):
+    """
+    Écran d'accueil locataire en un seul appel : bail actif, derniers loyers
+    (avec reste à payer), interventions récentes et liens des documents.
+    Nombre de requêtes fixe ; réponse mise en cache par utilisateur et
+    invalidée par les signaux Bail / Loyer / Intervention.
+    """
+    permission_classes = [IsTenant]
+    nb_interventions = 5
+
+    def get(self, request):
+        user = request.user
+        donnees = cache_public.get_or_set(
+            cache_public.groupe_locataire(user.pk),
+            ("me", request.get_host(), request.scheme),
+            lambda: self.construire(request),
+            timeout=settings.API_ME_TIMEOUT,
+        )
+        return Response(donnees)
+
+    def construire(self, request):
+        user = request.user
+        today = date.today()
+        contexte = {"request": request}
+
+        bail = (
+            Bail.objects.filter(
+                locataire=user,
+                est_signe=True,
+                date_debut__lte=today,
+                date_fin__gte=today,
+            )
+            .select_related("bien__proprietaire", "locataire")
+            .prefetch_related(
+                Prefetch(
+                    "loyers",
+                    queryset=Loyer.objects.order_by("-date_echeance")[: settings.API_ME_NB_LOYERS],
+                    to_attr="derniers_loyers",
+                )
+            )
+            .order_by("-date_debut")
+            .first()
+        )
+        interventions = (
+            Intervention.objects.filter(locataire=user)
+            .select_related("bien")
+            .order_by("-created_at")[: self.nb_interventions]
+        )
+
+        loyers = bail.derniers_loyers if bail else []
+        # Sur tous les impayés du bail, pas seulement les derniers loyers affichés
+        solde_du = 0
+        if bail:
+            solde_du = bail.loyers.exclude(statut="PAYE").aggregate(
+                solde=Sum(F("montant_du") - F("montant_verse"))
+            )["solde"] or 0
+        documents = []
+        if bail and bail.fichier_contrat:
+            documents.append(
+                {
+                    "type": "contrat",
+                    "titre": f"Contrat de bail #{bail.pk}",
+                    "url": request.build_absolute_uri(reverse("download_contrat", args=[bail.pk])),
+                }
+            )
+        for loyer in loyers:
+            if loyer.statut == "PAYE":
+                documents.append(
+                    {
+                        "type": "quittance",
+                        "titre": f"Quittance {loyer.periode_debut:%m/%Y}",
+                        "url": request.build_absolute_uri(reverse("download_quittance", args=[loyer.pk])),
+                    }
+                )
+
+        return {
+            "bail": BailSerializer(bail, context=contexte).data if bail else None,
+            "loyers": LoyerSerializer(loyers, many=True, context=contexte).data,
+            "solde_du": int(solde_du),
+            "interventions": InterventionSerializer(interventions, many=True, context=contexte).data,
+            "documents": documents,
+        }
+
+
+def _erreur_validation(exc):
+    return ValidationError(exc.message_dict if hasattr(exc, "error_dict") else exc.messages)
+
+
+class TeleversementCreateView(APIView):
+    """
+    POST /api/televersements/ {cible, nom_original, type_mime, taille} :
+    ouvre un téléversement reprenable et renvoie son id (à envoyer ensuite
+    par morceaux en PATCH sur l'URL du header Location).
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = TeleversementSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        donnees = serializer.validated_data
+        try:
+            objet = televersement.creer(
+                request.user,
+                donnees["cible"],
+                donnees["nom_original"],
+                donnees["taille"],
+                donnees["type_mime"],
+            )
+        except DjangoValidationError as exc:
+            raise _erreur_validation(exc)
+
+        url = request.build_absolute_uri(reverse("api-televersement", args=[objet.pk]))
+        return Response(
+            TeleversementSerializer(objet).data,
+            status=status.HTTP_201_CREATED,
+            headers={"Location": url, "Upload-Offset": "0"},
+        )
+
+
+class TeleversementDetailView(APIView):
+    """
+    GET / HEAD : état (header Upload-Offset = octets déjà reçus, pour reprendre).
+    PATCH : corps brut du morceau, header Upload-Offset = position du morceau.
+    DELETE : abandon.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, pk):
+        objet = get_object_or_404(Televersement, pk=pk, utilisateur=request.user)
+        return Response(
+            TeleversementSerializer(objet).data,
+            headers={"Upload-Offset": str(objet.recu), "Upload-Length": str(objet.taille)},
+        )
+
+    def patch(self, request, pk):
+        try:
+            offset = int(request.headers["Upload-Offset"])
+        except (KeyError, ValueError):
+            raise ValidationError({"Upload-Offset": "En-tête obligatoire (entier)."})
+
+        try:
+            # Corps lu directement depuis le flux : ni request.data ni request.body
+            objet = televersement.ajouter_morceau(pk, request.user, offset, request.stream or io.BytesIO())
+        except Televersement.DoesNotExist:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        except televersement.ConflitOffset as exc:
+            return Response(
+                {"detail": str(exc), "recu": exc.recu},
+                status=status.HTTP_409_CONFLICT,
+                headers={"Upload-Offset": str(exc.recu)},
+            )
+        except televersement.MorceauTropGrand as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+        except DjangoValidationError as exc:
+            raise _erreur_validation(exc)
+
+        return Response(TeleversementSerializer(objet).data, headers={"Upload-Offset": str(objet.recu)})
+
+    def delete(self, request, pk):
+        objet = get_object_or_404(Televersement, pk=pk, utilisateur=request.user, statut="EN_COURS")
+        televersement.annuler(objet)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class WebhookPaiementView(APIView):
+    """
+    POST /api/webhooks/paiements/<wave|om>/ : notification de paiement signée.
+    Répond 200 dès que l'événement est enregistré (ou reconnu comme doublon) ;
+    l'application au loyer se fait en tâche de fond.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request, provider):
+        provider = provider.upper()
+        if provider not in webhooks.PROVIDERS:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        # Signature calculée sur le corps brut, avant tout parsing
+        corps = request.body
+        if not webhooks.verifier_signature(provider, corps, request.headers.get(webhooks.ENTETES_SIGNATURE[provider])):
+            return Response({"detail": "Signature invalide."}, status=status.HTTP_403_FORBIDDEN)
+        try:
+            evenement, cree = webhooks.recevoir(provider, corps)
+        except ValueError:
+            return Response({"detail": "Corps JSON invalide."}, status=status.HTTP_400_BAD_REQUEST)
+        if cree:
+            transaction.on_commit(lambda: _planifier_traitement(evenement.pk))
+        return Response({"recu": True, "doublon": not cree})
+
+
+def _planifier_traitement(evenement_id):
+    try:
+        traiter_evenement_paiement.delay(evenement_id)
+    except Exception:
+        # Broker indisponible : l'événement reste "reçu" et déjà acquitté,
+        # reprendre_evenements_paiement le relancera
+        logger.exception("Impossible de planifier l'événement de paiement %s.", evenement_id)
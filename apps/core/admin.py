@@ -1,7 +1,11 @@
 from django.contrib import admin
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import Transaction
-from .models import Bien, Bail, Loyer, HistoriqueRelance
+from django.contrib import messages
+from .models import EvenementPaiement, LigneReleve, Transaction
+from .models import Bien, BienArchive, Bail, BailArchive, Loyer, HistoriqueRelance, RequeteLente
+from .services import archivage, rapprochement, webhooks
 
 # Configuration de l'interface gestionadmin
 admin.site.site_header = "MADA IMMO Administration"
@@ -218,4 +222,154 @@ class TransactionAdmin(admin.ModelAdmin):
 
     @admin.display(description="Locataire")
     def locataire_info(self, obj):
-        return obj.loyer.bail.locataire.get_full_name()
\ No newline at end of file
+        return obj.loyer.bail.locataire.get_full_name()
+
+
+@admin.register(LigneReleve)
+class LigneReleveAdmin(admin.ModelAdmin):
+    """
+    File de vérification des relevés Wave / Orange Money (`manage.py rapprocher_releve`) :
+    choisir le loyer puis l'action "Créditer le loyer choisi".
+    """
+
+    list_display = ("date_operation", "provider", "montant", "telephone", "libelle", "motif", "candidats_fmt", "statut", "loyer")
+    list_filter = ("statut", "motif", "provider")
+    search_fields = ("reference_externe", "telephone", "libelle")
+    date_hierarchy = "date_operation"
+    raw_id_fields = ("loyer",)
+    readonly_fields = (
+        "provider", "reference_externe", "date_operation", "montant", "telephone", "libelle", "fichier",
+        "motif", "candidats", "statut", "transaction", "traite_par", "traite_le", "created_at",
+    )
+    actions = ["crediter", "ignorer"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="Loyers possibles")
+    def candidats_fmt(self, obj):
+        return ", ".join(f"LOY{pk}" for pk in obj.candidats) or "—"
+
+    @admin.action(description="Créditer le loyer choisi")
+    def crediter(self, request, queryset):
+        creditees = 0
+        for ligne in queryset.filter(statut="A_REVOIR"):
+            try:
+                rapprochement.rapprocher_ligne(ligne, request.user)
+                creditees += 1
+            except ValueError as exc:
+                self.message_user(request, f"{ligne} : {exc}", messages.WARNING)
+        self.message_user(request, f"{creditees} ligne(s) créditée(s).")
+
+    @admin.action(description="Ignorer (pas un paiement de loyer)")
+    def ignorer(self, request, queryset):
+        nb = queryset.filter(statut="A_REVOIR").update(statut="IGNOREE", traite_par=request.user, traite_le=timezone.now())
+        self.message_user(request, f"{nb} ligne(s) ignorée(s).")
+
+
+@admin.register(EvenementPaiement)
+class EvenementPaiementAdmin(admin.ModelAdmin):
+    """
+    Notifications reçues par webhook (Wave / Orange Money), en lecture seule.
+    Les paiements non rattachés à un loyer passent dans la file des relevés.
+    """
+
+    list_display = ("recu_le", "provider", "type_evenement", "statut", "tentatives", "transaction", "traite_le")
+    list_filter = ("statut", "provider")
+    search_fields = ("cle_idempotence",)
+    date_hierarchy = "recu_le"
+    readonly_fields = (
+        "provider", "cle_idempotence", "type_evenement", "corps", "statut", "tentatives", "erreur",
+        "transaction", "recu_le", "traite_le",
+    )
+    actions = ["retraiter"]
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description="Retraiter (événements en échec)")
+    def retraiter(self, request, queryset):
+        traites = sum(
+            1 for pk in queryset.filter(statut="ECHEC").values_list("pk", flat=True) if webhooks.traiter(pk) is not None
+        )
+        self.message_user(request, f"{traites} événement(s) retraité(s).")
+
+
+@admin.register(RequeteLente)
+class RequeteLenteAdmin(admin.ModelAdmin):
+    """
+    Classement des requêtes lentes par temps cumulé.
+    Une ligne par empreinte (dernière capture), avec total et nombre d'occurrences.
+    """
+
+    list_display = ("sql_court", "duree_totale_fmt", "occurrences", "duree_ms", "contexte", "created_at")
+    list_filter = ("contexte", "base")
+    search_fields = ("sql", "contexte")
+    readonly_fields = ("empreinte", "sql_pre", "duree_ms", "plan_pre", "contexte", "base", "created_at")
+    exclude = ("sql", "plan")
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        meme_empreinte = (
+            RequeteLente.objects.filter(empreinte=OuterRef("empreinte"))
+            .order_by()
+            .values("empreinte")
+        )
+        dernieres = RequeteLente.objects.order_by().values("empreinte").annotate(dernier=Max("id")).values("dernier")
+        return (
+            qs.filter(id__in=dernieres)
+            .annotate(
+                duree_totale=Subquery(meme_empreinte.annotate(t=Sum("duree_ms")).values("t")),
+                nb_occurrences=Subquery(meme_empreinte.annotate(n=Count("id")).values("n")),
+            )
+            .order_by("-duree_totale")
+        )
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description="Requête")
+    def sql_court(self, obj):
+        return obj.sql[:120]
+
+    @admin.display(description="Temps total", ordering="duree_totale")
+    def duree_totale_fmt(self, obj):
+        return f"{obj.duree_totale:.0f} ms"
+
+    @admin.display(description="Occurrences", ordering="nb_occurrences")
+    def occurrences(self, obj):
+        return obj.nb_occurrences
+
+    @admin.display(description="SQL")
+    def sql_pre(self, obj):
+        return format_html("<pre style=\"white-space: pre-wrap\">{}</pre>", obj.sql)
+
+    @admin.display(description="Plan d'exécution")
+    def plan_pre(self, obj):
+        return format_html("<pre>{}</pre>", obj.plan or "—")
+
+
+@admin.register(BienArchive, BailArchive)
+class ArchiveSuppressionAdmin(admin.ModelAdmin):
+    """Lignes archivées par `manage.py archiver_supprimes` (lecture seule, restaurables)."""
+
+    list_display = ("objet_id", "deleted_at", "archived_at")
+    search_fields = ("objet_id",)
+    readonly_fields = ("objet_id", "donnees", "deleted_at", "archived_at")
+    actions = ["restaurer"]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.action(description="Restaurer dans la table (reste marqué supprimé)")
+    def restaurer(self, request, queryset):
+        archives = list(queryset)
+        for archive in archives:
+            archivage.restaurer(archive)
+        self.message_user(request, f"{len(archives)} ligne(s) restaurée(s).")
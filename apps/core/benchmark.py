@@ -0,0 +1,294 @@
+"""
+Outils de mesure de performance utilisés par la commande `bench`.
+
+- creer_jeu_de_donnees() : peuple la base avec un portefeuille réaliste
+- mesurer_scenario()     : rejoue une URL via le client de test Django
+- mesurer_connexions()   : coût d'ouverture d'une connexion vs réutilisation
+- resumer() / comparer() : percentiles et comparaison entre deux exécutions
+"""
+import gc
+import math
+import statistics
+import time
+import tracemalloc
+from datetime import date, timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.conf import settings
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
+
+from apps.core.models import (
+    Annonce,
+    Bail,
+    Bien,
+    Depense,
+    Intervention,
+    Loyer,
+    Transaction,
+)
+
+User = get_user_model()
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+# ============================================================================
+# STATISTIQUES
+# ============================================================================
+
+def percentile(valeurs, p):
+    """Percentile par la méthode du rang le plus proche (valeurs non triées acceptées)."""
+    if not valeurs:
+        return None
+    ordonnees = sorted(valeurs)
+    rang = max(1, math.ceil(p / 100 * len(ordonnees)))
+    return ordonnees[rang - 1]
+
+
+def resumer(durees_ms):
+    """Résumé statistique d'une série de durées (en millisecondes)."""
+    resume = {
+        "n": len(durees_ms),
+        "min": round(min(durees_ms), 3),
+        "max": round(max(durees_ms), 3),
+        "moyenne": round(statistics.fmean(durees_ms), 3),
+    }
+    for p in PERCENTILES:
+        resume[f"p{p}"] = round(percentile(durees_ms, p), 3)
+    return resume
+
+
+def comparer(ancien, nouveau, metriques=("p50", "p95", "requetes", "memoire_pic_ko")):
+    """
+    Compare deux fichiers de résultats (dicts déjà chargés).
+    Retourne une liste de lignes (scenario, metrique, avant, apres, variation en %).
+    """
+    lignes = []
+    anciens = ancien.get("scenarios", {})
+    nouveaux = nouveau.get("scenarios", {})
+
+    for nom in sorted(set(anciens) | set(nouveaux)):
+        avant_s = anciens.get(nom, {})
+        apres_s = nouveaux.get(nom, {})
+        for metrique in metriques:
+            avant = avant_s.get("latence_ms", {}).get(metrique, avant_s.get(metrique))
+            apres = apres_s.get("latence_ms", {}).get(metrique, apres_s.get(metrique))
+            if avant is None and apres is None:
+                continue
+            variation = None
+            if avant not in (None, 0) and apres is not None:
+                variation = round((apres - avant) / avant * 100, 1)
+            lignes.append((nom, metrique, avant, apres, variation))
+    return lignes
+
+
+# ============================================================================
+# MESURE
+# ============================================================================
+
+def mesurer_scenario(client, url, iterations=30, echauffement=3, secure=False, avant_requete=None):
+    """
+    Exécute `iterations` requêtes GET sur `url` et renvoie latences,
+    nombre de requêtes SQL et pic mémoire (mesuré sur une passe dédiée,
+    tracemalloc faussant les latences). `avant_requete` est appelé hors
+    chronométrage avant chaque requête (ex. invalider le cache de la page
+    pour mesurer la vue plutôt qu'un HIT).
+    """
+    preparer = avant_requete or (lambda: None)
+    for _ in range(echauffement):
+        preparer()
+        client.get(url, secure=secure)
+
+    durees = []
+    statut = None
+    taille = 0
+    for _ in range(iterations):
+        preparer()
+        debut = time.perf_counter()
+        response = client.get(url, secure=secure)
+        durees.append((time.perf_counter() - debut) * 1000)
+        statut = response.status_code
+        taille = len(response.content) if not response.streaming else 0
+
+    preparer()
+    with CaptureQueriesContext(connection) as ctx:
+        client.get(url, secure=secure)
+    nb_requetes = len(ctx.captured_queries)
+    temps_sql = sum(float(q["time"]) for q in ctx.captured_queries) * 1000
+
+    preparer()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        client.get(url, secure=secure)
+        _, pic = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "url": url,
+        "statut": statut,
+        "taille_octets": taille,
+        "latence_ms": resumer(durees),
+        "requetes": nb_requetes,
+        "temps_sql_ms": round(temps_sql, 3),
+        "memoire_pic_ko": round(pic / 1024, 1),
+    }
+
+
+def mesurer_connexions(iterations=30, alias="default"):
+    """
+    Compare une requête triviale sur une connexion neuve (fermeture puis
+    reconnexion, comme une requête HTTP sans CONN_MAX_AGE) et sur une connexion
+    réutilisée. En mode pool, la "connexion neuve" est un emprunt au pool.
+    """
+    conn = connections[alias]
+
+    def requete():
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+    ouverture, reutilisee = [], []
+    for _ in range(iterations):
+        conn.close()
+        debut = time.perf_counter()
+        requete()
+        ouverture.append((time.perf_counter() - debut) * 1000)
+
+        debut = time.perf_counter()
+        requete()
+        reutilisee.append((time.perf_counter() - debut) * 1000)
+
+    ouverture_p50 = percentile(ouverture, 50)
+    reutilisee_p50 = percentile(reutilisee, 50)
+    return {
+        "mode": getattr(settings, "DB_POOL_MODE", "none"),
+        "processus": getattr(settings, "DB_PROCESS_TYPE", "web"),
+        "ouverture_ms": resumer(ouverture),
+        "reutilisee_ms": resumer(reutilisee),
+        "gain_par_requete_ms": round(ouverture_p50 - reutilisee_p50, 3),
+    }
+
+
+# ============================================================================
+# JEU DE DONNÉES
+# ============================================================================
+
+def _groupe(nom):
+    groupe, _ = Group.objects.get_or_create(name=nom)
+    return groupe
+
+
+def _utilisateur(username, groupe=None, **extra):
+    # Mot de passe inutilisable : évite le coût du hachage, on utilise force_login
+    user = User.objects.create_user(username=username, email=f"{username}@bench.local", password=None, **extra)
+    if groupe:
+        user.groups.add(groupe)
+    return user
+
+
+def creer_jeu_de_donnees(nb_biens=200, nb_bailleurs=10, mois_historique=12, taux_occupation=0.7):
+    """
+    Crée un portefeuille complet : bailleurs, biens, locataires, baux signés,
+    loyers sur `mois_historique` mois (avec transactions), dépenses et annonces.
+    Retourne les utilisateurs représentatifs de chaque rôle.
+    """
+    today = date.today()
+    g_bailleur, g_locataire = _groupe("BAILLEUR"), _groupe("LOCATAIRE")
+
+    admin = _utilisateur("bench_admin", is_superuser=True, is_staff=True)
+    bailleurs = [_utilisateur(f"bench_bailleur_{i}", g_bailleur) for i in range(nb_bailleurs)]
+
+    villes = ["Dakar", "Thiès", "Saint-Louis", "Mbour", "Ziguinchor"]
+    types = [code for code, _ in Bien.TYPE_CHOICES]
+    biens = Bien.objects.bulk_create(
+        [
+            Bien(
+                titre=f"Bien de test {i}",
+                type_bien=types[i % len(types)],
+                adresse=f"{i} avenue du Benchmark",
+                ville=villes[i % len(villes)],
+                surface=30 + (i % 120),
+                nb_pieces=1 + (i % 6),
+                loyer_ref=Decimal(50000 + (i % 40) * 5000),
+                charges_ref=Decimal(5000),
+                proprietaire=bailleurs[i % nb_bailleurs],
+            )
+            for i in range(nb_biens)
+        ]
+    )
+
+    nb_occupes = int(nb_biens * taux_occupation)
+    debut_bail = today.replace(day=1) - relativedelta(months=mois_historique)
+    locataires = [_utilisateur(f"bench_locataire_{i}", g_locataire) for i in range(nb_occupes)]
+    baux = Bail.objects.bulk_create(
+        [
+            Bail(
+                bien=bien,
+                locataire=locataire,
+                date_debut=debut_bail,
+                date_fin=today + timedelta(days=365),
+                montant_loyer=bien.loyer_ref,
+                montant_charges=bien.charges_ref,
+                depot_garantie=bien.loyer_ref * 2,
+                est_signe=True,
+            )
+            for bien, locataire in zip(biens[:nb_occupes], locataires)
+        ]
+    )
+
+    loyers = []
+    for bail in baux:
+        for m in range(mois_historique + 1):
+            periode = debut_bail + relativedelta(months=m)
+            paye = m < mois_historique
+            montant = bail.montant_loyer + bail.montant_charges
+            loyers.append(
+                Loyer(
+                    bail=bail,
+                    periode_debut=periode,
+                    periode_fin=periode + relativedelta(months=1, days=-1),
+                    date_echeance=periode.replace(day=5),
+                    montant_du=montant,
+                    montant_verse=montant if paye else 0,
+                    statut="PAYE" if paye else "A_PAYER",
+                )
+            )
+    loyers = Loyer.objects.bulk_create(loyers, batch_size=1000)
+
+    Transaction.objects.bulk_create(
+        [
+            Transaction(loyer=loyer, montant=loyer.montant_verse, provider="WAVE", est_validee=True, auteur=admin)
+            for loyer in loyers
+            if loyer.statut == "PAYE"
+        ],
+        batch_size=1000,
+    )
+    Depense.objects.bulk_create(
+        [
+            Depense(bien=bien, type_depense="REPARATION", libelle="Entretien", montant=Decimal(15000))
+            for bien in biens[: nb_biens // 2]
+        ]
+    )
+    Intervention.objects.bulk_create(
+        [
+            Intervention(bien=bail.bien, locataire=bail.locataire, objet="Fuite", description="Robinet")
+            for bail in baux[: nb_occupes // 3]
+        ]
+    )
+    Annonce.objects.bulk_create(
+        [
+            Annonce(bien=bien, titre=bien.titre, prix=bien.loyer_ref, statut="PUBLIE")
+            for bien in biens[nb_occupes:]
+        ]
+    )
+
+    return {
+        "admin": admin,
+        "bailleur": bailleurs[0],
+        "locataire": locataires[0] if locataires else None,
+    }
@@ -0,0 +1,128 @@
+"""
+Cache des pages publiques avec invalidation par générations.
+
+Chaque groupe (ex. "catalogue") possède un numéro de génération stocké dans
+le cache et inclus dans toutes ses clés. Invalider un groupe = incrémenter
+sa génération : les anciennes entrées ne sont plus jamais lues et expirent
+d'elles-mêmes. Les handlers de signaux (signals.py) invalident exactement
+les groupes concernés par une modification d'Annonce, Bien ou Bail.
+"""
+import functools
+import hashlib
+from datetime import date
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+CATALOGUE = "catalogue"
+# Pages sans données (à propos...) : seul un déploiement les change, aucun
+# signal ne les invalide, elles expirent après CACHE_PUBLIC_TIMEOUT
+PAGES = "pages"
+
+
+def groupe_locataire(user_id):
+    """Groupe des données propres à un locataire (écran d'accueil mobile)."""
+    return f"locataire:{user_id}"
+
+
+def generation(groupe):
+    cle = f"generation:{groupe}"
+    valeur = cache.get(cle)
+    if valeur is None:
+        cache.add(cle, 1, timeout=None)
+        valeur = cache.get(cle, 1)
+    return valeur
+
+
+def invalider(*groupes):
+    for groupe in groupes:
+        cle = f"generation:{groupe}"
+        try:
+            cache.incr(cle)
+        except ValueError:
+            # Clé absente (cache vidé) : toute nouvelle génération convient
+            cache.set(cle, 2, timeout=None)
+
+
+def version(groupe):
+    """
+    Version courante du groupe, à inclure dans les clés de fragments
+    ({% cache ... version %}). Contient la date du jour : l'occupation des
+    biens (baux qui commencent ou finissent) change à minuit sans signal.
+    """
+    return f"v{generation(groupe)}-{date.today():%Y%m%d}"
+
+
+def cle(groupe, *parties):
+    empreinte = hashlib.md5("|".join(str(p) for p in parties).encode()).hexdigest()
+    return f"{groupe}:{version(groupe)}:{empreinte}"
+
+
+def get_or_set(groupe, parties, calcul, timeout=None):
+    """cache.get_or_set sur une clé versionnée du groupe."""
+    return cache.get_or_set(cle(groupe, *parties), calcul, timeout or settings.CACHE_PUBLIC_TIMEOUT)
+
+
+def _requete_cachable(request):
+    if request.method != "GET" or request.user.is_authenticated:
+        return False
+    # Un message flash en attente rend la page propre à ce visiteur
+    if "messages" in request.COOKIES:
+        return False
+    if request.META.get("CSRF_COOKIE_NEEDS_UPDATE"):
+        return False
+    if settings.SESSION_COOKIE_NAME in request.COOKIES and request.session.get("_messages"):
+        return False
+    return True
+
+
+def _query_string_normalisee(request):
+    return urlencode(sorted(request.GET.lists()), doseq=True)
+
+
+def cache_publique(groupe, timeout=None):
+    """
+    Met en cache la réponse complète d'une vue publique (contenu et en-têtes :
+    Last-Modified, X-Robots-Tag...) pour les visiteurs anonymes, par chemin +
+    query string (paramètres triés).
+    """
+
+    def decorateur(view_func):
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _requete_cachable(request):
+                return view_func(request, *args, **kwargs)
+
+            cle_page = cle(groupe, "reponse", request.path, _query_string_normalisee(request))
+            en_cache = cache.get(cle_page)
+            if en_cache is not None:
+                contenu, entetes = en_cache
+                response = HttpResponse(contenu)
+                for nom, valeur in entetes:
+                    response[nom] = valeur
+                response["X-Cache"] = "HIT"
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if hasattr(response, "render") and callable(response.render):
+                response.render()
+            # Une page contenant un jeton CSRF est propre au visiteur : jamais mise en cache
+            if (
+                response.status_code == 200
+                and not response.streaming
+                and not response.cookies
+                and not request.META.get("CSRF_COOKIE_NEEDS_UPDATE")
+            ):
+                cache.set(
+                    cle_page,
+                    (response.content, list(response.items())),
+                    timeout or settings.CACHE_PUBLIC_TIMEOUT,
+                )
+                response["X-Cache"] = "MISS"
+            return response
+
+        return wrapper
+
+    return decorateur
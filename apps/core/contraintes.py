@@ -0,0 +1,36 @@
+"""
+Contraintes propres à PostgreSQL déclarées dans Meta.constraints.
+
+Le développement local tourne sous SQLite : ces contraintes n'y produisent
+aucun SQL (création comme suppression), la règle restant vérifiée en Python
+par le clean() du modèle.
+"""
+from django.contrib.postgres.constraints import ExclusionConstraint
+
+
+class ExclusionPostgres(ExclusionConstraint):
+    """
+    ExclusionConstraint créée uniquement sous PostgreSQL.
+
+    validate() ne fait rien : full_clean() exécuterait sinon la même requête
+    de chevauchement que clean(), qui garde la vérification Python (et son
+    message métier) et peut être sautée pour les traitements en masse.
+    """
+
+    def constraint_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return None
+        return super().constraint_sql(model, schema_editor)
+
+    def create_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return None
+        return super().create_sql(model, schema_editor)
+
+    def remove_sql(self, model, schema_editor):
+        if schema_editor.connection.vendor != "postgresql":
+            return None
+        return super().remove_sql(model, schema_editor)
+
+    def validate(self, *args, **kwargs):
+        pass
@@ -4,6 +4,7 @@ from django.contrib.auth.forms import UserCreationForm
 from django.core.exceptions import ValidationError
 from django.db.models import Q
 from .models import Loyer
+from .services import televersement
 
 
 from .models import (
@@ -25,6 +26,46 @@ STYLE_CHECKBOX = "w-5 h-5 rounded border-neutral-700 bg-neutral-900 text-emerald
 STYLE_FILE = "w-full text-sm text-neutral-400 file:mr-4 file:py-2 file:px-4 file:rounded-lg file:border-0 file:text-xs file:font-semibold file:bg-neutral-800 file:text-emerald-500 hover:file:bg-neutral-700 cursor-pointer"
 
 
+# ============================================================================
+# TÉLÉVERSEMENTS REPRENABLES
+# ============================================================================
+
+class TeleversementMixin:
+    """
+    Pour chaque champ fichier de `televersements` ({champ: cible}), ajoute un
+    champ caché "<champ>_televersement" : identifiant d'un document déjà
+    envoyé par morceaux (/api/televersements/, static/js/televersement.js),
+    rattaché tel quel à l'objet, sans second envoi.
+    Le formulaire reçoit user= : seul l'auteur d'un envoi peut le rattacher.
+    """
+
+    televersements = {}
+
+    def __init__(self, *args, user=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.televersement_user = user
+        for champ, cible in self.televersements.items():
+            nom_cache = f"{champ}_televersement"
+            self.fields[nom_cache] = forms.UUIDField(required=False, widget=forms.HiddenInput)
+            self.fields[champ].widget.attrs.update({
+                "data-televersement": cible,
+                "data-televersement-champ": self[nom_cache].auto_id,
+            })
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for champ, cible in self.televersements.items():
+            identifiant = cleaned_data.get(f"{champ}_televersement")
+            # Un fichier envoyé directement dans le formulaire reste prioritaire
+            if not identifiant or self.add_prefix(champ) in self.files:
+                continue
+            try:
+                cleaned_data[champ] = televersement.resoudre(self.televersement_user, identifiant, cible)
+            except ValidationError as exc:
+                self.add_error(champ, exc)
+        return cleaned_data
+
+
 # ============================================================================
 # BIENS
 # ============================================================================
@@ -54,7 +95,9 @@ class BienForm(forms.ModelForm):
 # BAUX / LOYERS
 # ============================================================================
 
-class BailForm(forms.ModelForm):
+class BailForm(TeleversementMixin, forms.ModelForm):
+    televersements = {"fichier_contrat": "bail.fichier_contrat"}
+
     class Meta:
         model = Bail
         fields = [
@@ -140,7 +183,9 @@ class InterventionForm(forms.ModelForm):
 # ÉTATS DES LIEUX
 # ============================================================================
 
-class EtatDesLieuxForm(forms.ModelForm):
+class EtatDesLieuxForm(TeleversementMixin, forms.ModelForm):
+    televersements = {"pdf": "edl.pdf"}
+
     class Meta:
         model = EtatDesLieux
         fields = [
@@ -253,7 +298,9 @@ class LocataireCreationForm(UserCreationForm):
                 user.profile.cni_numero = self.cleaned_data["cni_numero"]
                 user.profile.save()
         return user
-class DepenseForm(forms.ModelForm):
+class DepenseForm(TeleversementMixin, forms.ModelForm):
+    televersements = {"justificatif": "depense.justificatif"}
+
     class Meta:
         model = Depense
         fields = ['bien', 'type_depense', 'libelle', 'montant', 'date_paiement', 'est_recuperable', 'justificatif']
@@ -360,6 +407,84 @@ class UnifiedCreationForm(forms.Form):
 
         return cleaned_data
 
+
+# ============================================================================
+# IMPORT EN MASSE (PORTEFEUILLE)
+# ============================================================================
+
+FORMATS_DATE_IMPORT = ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y"]
+
+
+class ImportPortefeuilleForm(forms.Form):
+    fichier = forms.FileField(
+        label="Fichier (.xlsx ou .csv)",
+        widget=forms.ClearableFileInput(attrs={"class": STYLE_FILE, "accept": ".xlsx,.csv"}),
+    )
+    simulation = forms.BooleanField(
+        label="Vérifier seulement (aucune création)",
+        required=False,
+        widget=forms.CheckboxInput(attrs={"class": STYLE_CHECKBOX}),
+    )
+
+    def clean_fichier(self):
+        fichier = self.cleaned_data["fichier"]
+        if not fichier.name.lower().endswith((".xlsx", ".csv")):
+            raise ValidationError("Format non pris en charge : utilisez un classeur .xlsx ou un fichier .csv.")
+        return fichier
+
+
+class LigneImportForm(forms.Form):
+    """
+    Une ligne du fichier d'import : mêmes champs que UnifiedCreationForm,
+    sans mot de passe (les comptes sont activés par e-mail). Aucune requête
+    ici : propriétaires, doublons et chevauchements sont vérifiés pour tout
+    le fichier à la fois (services.import_portefeuille).
+    """
+    email = forms.EmailField()
+    first_name = forms.CharField(max_length=150)
+    last_name = forms.CharField(max_length=150)
+    telephone = forms.CharField(max_length=20, required=False)
+    cni_numero = forms.CharField(max_length=50, required=False)
+    proprietaire = forms.CharField(max_length=254, required=False)
+
+    titre_bien = forms.CharField(max_length=200)
+    type_bien = forms.ChoiceField(choices=Bien.TYPE_CHOICES)
+    adresse = forms.CharField()
+    ville = forms.CharField(max_length=100, required=False)
+    surface = forms.IntegerField(min_value=1)
+    nb_pieces = forms.IntegerField(min_value=1, required=False)
+    description = forms.CharField(required=False)
+
+    date_debut = forms.DateField(input_formats=FORMATS_DATE_IMPORT)
+    date_fin = forms.DateField(input_formats=FORMATS_DATE_IMPORT)
+    montant_loyer = forms.DecimalField(max_digits=10, decimal_places=0, min_value=0)
+    montant_charges = forms.DecimalField(max_digits=10, decimal_places=0, min_value=0, required=False)
+    depot_garantie = forms.DecimalField(max_digits=10, decimal_places=0, min_value=0)
+    jour_paiement = forms.IntegerField(min_value=1, max_value=31, required=False)
+
+    def clean_email(self):
+        return self.cleaned_data["email"].strip().lower()
+
+    def clean_proprietaire(self):
+        return self.cleaned_data["proprietaire"].strip().lower()
+
+    def __init__(self, data=None, *args, **kwargs):
+        # Type de bien saisi en code ("MAISON") ou en libellé ("Maison")
+        if data and data.get("type_bien"):
+            libelles = {libelle.lower(): code for code, libelle in Bien.TYPE_CHOICES}
+            saisi = str(data["type_bien"]).strip()
+            data = {**data, "type_bien": libelles.get(saisi.lower(), saisi.upper())}
+        super().__init__(data, *args, **kwargs)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        d1 = cleaned_data.get("date_debut")
+        d2 = cleaned_data.get("date_fin")
+        if d1 and d2 and d2 <= d1:
+            self.add_error("date_fin", "La date de fin doit être postérieure à la date de début.")
+        return cleaned_data
+
+
 class CashPaymentForm(forms.Form):
     montant = forms.DecimalField(
         max_digits=10,
@@ -0,0 +1,62 @@
+"""
+Déplace les biens et baux supprimés (soft delete) depuis plus de
+ARCHIVAGE_DELAI_JOURS vers les tables d'archive, par lots, pour garder les
+tables vivantes compactes. Voir apps/core/services/archivage.py pour les
+lignes exclues (historique comptable encore rattaché).
+
+Usage:
+    python manage.py archiver_supprimes --dry-run
+    python manage.py archiver_supprimes --jours 730 --lot 1000
+"""
+from django.conf import settings
+
+from apps.core.profiling import CommandeProfilable
+from apps.core.services.archivage import ORDRE, archivables, archiver_lot, limite_archivage
+
+
+class Command(CommandeProfilable):
+    help = "Archive les biens et baux supprimés depuis longtemps"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--jours',
+            type=int,
+            default=settings.ARCHIVAGE_DELAI_JOURS,
+            help='Ancienneté minimale de la suppression (défaut: ARCHIVAGE_DELAI_JOURS)',
+        )
+        parser.add_argument(
+            '--lot',
+            type=int,
+            default=500,
+            help='Lignes archivées par transaction (défaut: 500)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compte les lignes archivables sans rien modifier',
+        )
+
+    def handle(self, *args, **options):
+        limite = limite_archivage(options['jours'])
+        total = 0
+        for model in ORDRE:
+            nom = model._meta.verbose_name_plural
+            if options['dry_run']:
+                self.stdout.write(f"  {nom} : {archivables(model, limite).count()} ligne(s) archivable(s)")
+                continue
+
+            archivees = 0
+            dernier = 0
+            while True:
+                pks = list(
+                    archivables(model, limite).filter(pk__gt=dernier).values_list("pk", flat=True)[:options['lot']]
+                )
+                if not pks:
+                    break
+                dernier = pks[-1]
+                archivees += archiver_lot(model, pks, limite)
+            total += archivees
+            self.stdout.write(f"  {nom} : {archivees} ligne(s) archivée(s)")
+
+        if not options['dry_run']:
+            self.stdout.write(self.style.SUCCESS(f"✓ {total} ligne(s) archivée(s)"))
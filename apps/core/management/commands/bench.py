@@ -0,0 +1,205 @@
+"""
+Benchmark in-process des vues critiques (latences p50/p95, requêtes SQL, pic mémoire).
+
+Les vues sont rejouées via le client de test Django sur un jeu de données
+généré pour l'occasion, dans une transaction annulée en fin d'exécution
+et avec un cache local au processus : ni la base ni le cache partagé ne
+sont modifiés.
+
+Usage:
+    python manage.py bench
+    python manage.py bench --iterations 50 --biens 1000 --output bench_v1.json
+    python manage.py bench --scenario home --scenario api_biens_mobile
+    python manage.py bench --compare bench_v1.json bench_v2.json
+    DB_POOL_MODE=none python manage.py bench --connexions --scenario home
+"""
+import json
+import platform
+from datetime import datetime
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from apps.core import cache as cache_public
+from apps.core.benchmark import (
+    comparer,
+    creer_jeu_de_donnees,
+    mesurer_connexions,
+    mesurer_scenario,
+)
+
+# nom -> (url, rôle de l'utilisateur connecté ou None pour anonyme)
+SCENARIOS = {
+    "home": (lambda: reverse("home"), None),
+    "dashboard_admin": (lambda: reverse("dashboard"), "admin"),
+    "dashboard_bailleur": (lambda: reverse("dashboard"), "bailleur"),
+    "dashboard_locataire": (lambda: reverse("dashboard"), "locataire"),
+    "loyers_list": (lambda: reverse("loyers_list"), "admin"),
+    "grand_livre": (lambda: reverse("grand_livre"), "admin"),
+    "documents_list": (lambda: reverse("documents_list"), "admin"),
+    "api_biens_mobile": (lambda: "/api/biens/mobile/", None),
+}
+# Groupes de cache public (apps/core/cache.py) invalidés avant chaque requête :
+# sans cela, passé l'échauffement, on mesurerait des HIT et non la vue
+GROUPES_CACHE = {
+    "home": (cache_public.CATALOGUE,),
+}
+
+
+class _Rollback(Exception):
+    """Levée pour annuler la transaction du jeu de données."""
+
+
+class Command(BaseCommand):
+    help = "Mesure les latences (p50/p95), requêtes SQL et pic mémoire des vues critiques"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=30,
+            help='Nombre de requêtes mesurées par scénario (défaut: 30)',
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=3,
+            help="Requêtes d'échauffement non mesurées (défaut: 3)",
+        )
+        parser.add_argument(
+            '--biens',
+            type=int,
+            default=200,
+            help='Taille du jeu de données en nombre de biens (défaut: 200)',
+        )
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            choices=sorted(SCENARIOS),
+            help='Scénario à exécuter (répétable, défaut: tous)',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Fichier JSON de résultats (défaut: bench_AAAAMMJJ_HHMMSS.json)',
+        )
+        parser.add_argument(
+            '--connexions',
+            action='store_true',
+            help="Mesure aussi le coût d'ouverture d'une connexion (selon DB_POOL_MODE)",
+        )
+        parser.add_argument(
+            '--compare',
+            nargs=2,
+            metavar=('ANCIEN', 'NOUVEAU'),
+            help='Compare deux fichiers de résultats au lieu de lancer un benchmark',
+        )
+
+    def handle(self, *args, **options):
+        if options['compare']:
+            self._comparer(*options['compare'])
+            return
+
+        noms = options['scenario'] or list(SCENARIOS)
+        resultats = {
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "base": settings.DATABASES["default"]["ENGINE"].rsplit(".", 1)[-1],
+            "biens": options['biens'],
+            "iterations": options['iterations'],
+            "scenarios": {},
+        }
+
+        self.stdout.write(self.style.WARNING(f"Jeu de données : {options['biens']} biens"))
+        secure = bool(getattr(settings, "SECURE_SSL_REDIRECT", False))
+
+        if options['connexions']:
+            # Hors transaction : la connexion doit pouvoir être fermée et rouverte
+            resultats["connexions"] = mesure = mesurer_connexions(options['iterations'])
+            self.stdout.write(
+                f"  connexions ({mesure['mode']}) : ouverture p50={mesure['ouverture_ms']['p50']:.2f}ms, "
+                f"réutilisée p50={mesure['reutilisee_ms']['p50']:.2f}ms "
+                f"→ gain {mesure['gain_par_requete_ms']:.2f}ms/requête"
+            )
+
+        try:
+            # Cache local au processus : les pages construites sur le jeu de
+            # données annulé ne doivent pas rester dans le cache partagé (Redis)
+            with override_settings(
+                ALLOWED_HOSTS=["testserver", *settings.ALLOWED_HOSTS],
+                CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "bench"}},
+            ), transaction.atomic():
+                utilisateurs = creer_jeu_de_donnees(nb_biens=options['biens'])
+
+                for nom in noms:
+                    url_fn, role = SCENARIOS[nom]
+                    client = Client(raise_request_exception=False)
+                    if role:
+                        if utilisateurs.get(role) is None:
+                            self.stdout.write(self.style.WARNING(f"  {nom} : aucun utilisateur '{role}', ignoré"))
+                            continue
+                        client.force_login(utilisateurs[role])
+
+                    groupes = GROUPES_CACHE.get(nom)
+                    mesure = mesurer_scenario(
+                        client,
+                        url_fn(),
+                        iterations=options['iterations'],
+                        echauffement=options['warmup'],
+                        secure=secure,
+                        avant_requete=(lambda: cache_public.invalider(*groupes)) if groupes else None,
+                    )
+                    resultats["scenarios"][nom] = mesure
+                    self._afficher(nom, mesure)
+
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        output = Path(options['output'] or f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+        output.write_text(json.dumps(resultats, indent=2, ensure_ascii=False), encoding="utf-8")
+        self.stdout.write(self.style.SUCCESS(f"\n✓ Résultats écrits dans {output}"))
+
+    def _afficher(self, nom, mesure):
+        latence = mesure["latence_ms"]
+        style = self.style.SUCCESS if mesure["statut"] == 200 else self.style.ERROR
+        self.stdout.write(
+            style(
+                f"  {nom:<22} [{mesure['statut']}] "
+                f"p50={latence['p50']:.1f}ms p95={latence['p95']:.1f}ms "
+                f"requêtes={mesure['requetes']} mémoire={mesure['memoire_pic_ko']:.0f}Ko"
+            )
+        )
+
+    def _comparer(self, chemin_ancien, chemin_nouveau):
+        try:
+            ancien = json.loads(Path(chemin_ancien).read_text(encoding="utf-8"))
+            nouveau = json.loads(Path(chemin_nouveau).read_text(encoding="utf-8"))
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Lecture des résultats impossible : {e}")
+
+        self.stdout.write(f"{'Scénario':<22} {'Métrique':<16} {'Avant':>10} {'Après':>10} {'Δ %':>8}")
+        for nom, metrique, avant, apres, variation in comparer(ancien, nouveau):
+            texte = (
+                f"{nom:<22} {metrique:<16} {_fmt(avant):>10} {_fmt(apres):>10} "
+                f"{'' if variation is None else f'{variation:+.1f}':>8}"
+            )
+            if variation is not None and variation > 10:
+                self.stdout.write(self.style.ERROR(texte))
+            elif variation is not None and variation < -10:
+                self.stdout.write(self.style.SUCCESS(texte))
+            else:
+                self.stdout.write(texte)
+
+
+def _fmt(valeur):
+    if valeur is None:
+        return "—"
+    return f"{valeur:.1f}" if isinstance(valeur, float) else str(valeur)
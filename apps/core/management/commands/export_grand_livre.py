@@ -0,0 +1,39 @@
+"""
+Export du grand livre annuel au format Excel (même contenu que la vue d'export).
+
+Usage:
+    python manage.py export_grand_livre --annee 2025
+    python manage.py export_grand_livre --annee 2025 --output /tmp/gl.xlsx --profile-memory
+"""
+from datetime import date
+from pathlib import Path
+
+from apps.core.profiling import CommandeProfilable
+from apps.core.services.comptabilite import ecrire_grand_livre_excel
+
+
+class Command(CommandeProfilable):
+    help = "Exporte le grand livre d'une année au format xlsx"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--annee',
+            type=int,
+            default=date.today().year,
+            help='Année comptable (défaut: année en cours)',
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Fichier de sortie (défaut: Grand_Livre_<annee>.xlsx)',
+        )
+
+    def handle(self, *args, **options):
+        annee = options['annee']
+        output = Path(options['output'] or f"Grand_Livre_{annee}.xlsx")
+
+        ecrire_grand_livre_excel(annee, output)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ Grand livre {annee} exporté : {output} ({output.stat().st_size:,} octets)")
+        )
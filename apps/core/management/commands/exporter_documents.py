@@ -0,0 +1,52 @@
+"""
+Exporte dans un ZIP les documents de la GED (contrats, quittances, états des
+lieux), construit en flux comme l'export web : mémoire constante quel que
+soit le nombre de fichiers.
+
+Usage:
+    python manage.py exporter_documents --annee 2025 --proprietaire 12
+    python manage.py exporter_documents --type QUITTANCE --locataire 40 --output /tmp/quittances.zip
+"""
+from pathlib import Path
+
+from django.core.management.base import CommandError
+
+from apps.core.models import Document
+from apps.core.profiling import CommandeProfilable
+from apps.core.services.documents import filtrer
+from apps.core.services.export_documents import flux_zip, nom_archive
+
+
+class Command(CommandeProfilable):
+    help = "Exporte les documents de la GED dans une archive ZIP"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--annee', type=int, help='Année du document')
+        parser.add_argument(
+            '--type',
+            choices=[valeur for valeur, _ in Document.TYPE_CHOICES],
+            help='Type de document',
+        )
+        parser.add_argument('--proprietaire', type=int, help='ID du bailleur')
+        parser.add_argument('--locataire', type=int, help='ID du locataire')
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Fichier de sortie (défaut: Documents_<annee>_<type>.zip)',
+        )
+
+    def handle(self, *args, **options):
+        params = {cle: options[cle] for cle in ("annee", "type", "proprietaire", "locataire") if options[cle]}
+        documents, filtres = filtrer(Document.objects.all(), params)
+        nb = documents.count()
+        if nb == 0:
+            raise CommandError("Aucun document ne correspond à ces critères.")
+
+        output = Path(options['output'] or nom_archive(filtres))
+        with output.open("wb") as f:
+            for bloc in flux_zip(documents):
+                f.write(bloc)
+
+        self.stdout.write(
+            self.style.SUCCESS(f"✓ {nb} document(s) exporté(s) : {output} ({output.stat().st_size:,} octets)")
+        )
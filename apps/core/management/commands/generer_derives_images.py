@@ -0,0 +1,51 @@
+"""
+Génère les dérivés (WebP/JPEG redimensionnés) des photos existantes :
+rattrapage après déploiement ou changement de IMAGE_DERIVES_LARGEURS.
+Les photos dont les dérivés sont à jour sont ignorées.
+
+Usage:
+    python manage.py generer_derives_images
+    python manage.py generer_derives_images --forcer --profile-memory
+"""
+from django.db.models import Q
+
+from apps.core import cache as cache_public
+from apps.core.models import Bien, Intervention
+from apps.core.profiling import CommandeProfilable
+from apps.core.services.images import generer_derives
+
+SOURCES = (
+    (Bien.all_objects, "photo_principale"),
+    (Intervention.objects, "photo_avant"),
+    (Intervention.objects, "photo_apres"),
+)
+
+
+class Command(CommandeProfilable):
+    help = "Génère les dérivés redimensionnés des photos de biens et d'interventions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--forcer',
+            action='store_true',
+            help='Régénère même si la source n\'a pas changé (ex. nouvelle qualité)',
+        )
+
+    def handle(self, *args, **options):
+        traitees = echecs = 0
+        for manager, champ in SOURCES:
+            noms = (
+                manager.exclude(Q(**{f"{champ}__isnull": True}) | Q(**{champ: ""}))
+                .order_by()
+                .values_list(champ, flat=True)
+                .distinct()
+            )
+            for nom in noms.iterator():
+                if generer_derives(nom, forcer=options['forcer']) is None:
+                    echecs += 1
+                else:
+                    traitees += 1
+            self.stdout.write(f"  {manager.model.__name__}.{champ} : terminé")
+
+        cache_public.invalider(cache_public.CATALOGUE)
+        self.stdout.write(self.style.SUCCESS(f"✓ {traitees} photo(s) à jour, {echecs} introuvable(s) ou illisible(s)"))
@@ -6,6 +6,7 @@ Usage:
     python manage.py generer_loyers
     python manage.py generer_loyers --month 2025-06  # Pour un mois spécifique
     python manage.py generer_loyers --dry-run  # Simulation sans écriture
+    python manage.py generer_loyers --profile-memory  # Rapport mémoire (pic, allocations)
     Cette commande est pensée pour être planifiée via cron ou un scheduler (exemple)
     0 6 1 * * /path/to/venv/bin/python manage.py generer_loyers --verbosity 1
 """
@@ -13,15 +14,16 @@ import logging
 from datetime import date
 
 from dateutil.relativedelta import relativedelta
-from django.core.management.base import BaseCommand, CommandError
+from django.core.management.base import CommandError
 from django.db import transaction
 
 from apps.core.models import Bail, Loyer
+from apps.core.profiling import CommandeProfilable
 
 logger = logging.getLogger(__name__)
 
 
-class Command(BaseCommand):
+class Command(CommandeProfilable):
     help = "Génère les appels de loyer mensuels pour tous les baux actifs (optimisé avec bulk_create)"
 
     def add_arguments(self, parser):
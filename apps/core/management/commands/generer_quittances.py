@@ -0,0 +1,64 @@
+"""
+Génère en masse les quittances PDF manquantes des loyers payés.
+
+Usage:
+    python manage.py generer_quittances
+    python manage.py generer_quittances --month 2025-06 --limit 500 --profile-memory
+"""
+import logging
+
+from django.core.management.base import CommandError
+from django.db.models import Q
+
+from apps.core.models import Loyer
+from apps.core.profiling import CommandeProfilable
+from apps.core.services.quittance import attacher_quittance
+
+logger = logging.getLogger(__name__)
+
+
+class Command(CommandeProfilable):
+    help = "Génère les quittances PDF manquantes pour les loyers payés"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            type=str,
+            help='Limiter à un mois au format YYYY-MM',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Nombre maximum de quittances à générer',
+        )
+
+    def handle(self, *args, **options):
+        loyers = (
+            Loyer.objects.filter(statut="PAYE")
+            .filter(Q(quittance__isnull=True) | Q(quittance=""))
+            .select_related("bail__locataire", "bail__bien__proprietaire")
+            .order_by("periode_debut", "id")
+        )
+
+        if options['month']:
+            try:
+                year, month = map(int, options['month'].split('-'))
+            except ValueError:
+                raise CommandError("Format de mois invalide. Utilisez YYYY-MM (ex: 2025-06)")
+            loyers = loyers.filter(periode_debut__year=year, periode_debut__month=month)
+
+        if options['limit']:
+            loyers = loyers[:options['limit']]
+
+        generees = echecs = 0
+        # iterator() : on ne garde pas tous les loyers (et leurs PDF) en mémoire
+        for loyer in loyers.iterator(chunk_size=100):
+            try:
+                attacher_quittance(loyer)
+                generees += 1
+            except Exception:
+                echecs += 1
+                logger.exception("Erreur génération quittance loyer %s", loyer.pk)
+
+        style = self.style.SUCCESS if not echecs else self.style.WARNING
+        self.stdout.write(style(f"✓ {generees} quittances générées, {echecs} échecs"))
@@ -0,0 +1,70 @@
+"""
+Pré-génère le sitemap (index + sections paginées) dans le stockage des
+médias, servi tel quel par /sitemaps/<fichier> (vue sitemap_genere) sans
+reconstruire les URLs. Les médias et non les fichiers statiques : WhiteNoise
+n'indexe ces derniers qu'au démarrage, un fichier écrit ensuite resterait
+introuvable jusqu'au redémarrage.
+
+Usage:
+    python manage.py generer_sitemaps
+    python manage.py generer_sitemaps --domaine madagroupe.com
+"""
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.contrib.sitemaps.views import SitemapIndexItem
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from apps.core.sitemaps import DOSSIER, SITEMAPS
+
+
+class Command(BaseCommand):
+    help = "Écrit sitemap.xml et ses sections dans le stockage des médias"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--domaine',
+            type=str,
+            default=settings.SITE_DOMAIN,
+            help='Domaine public des URLs (défaut: SITE_DOMAIN)',
+        )
+
+    def handle(self, *args, **options):
+        site = SimpleNamespace(domain=options['domaine'], name=options['domaine'])
+        base_url = f"https://{site.domain}"
+
+        ecrits = set()
+        index = []
+        for section, classe in SITEMAPS.items():
+            sitemap = classe()
+            protocole = sitemap.protocol or "https"
+            for page in sitemap.paginator.page_range:
+                urls = sitemap.get_urls(page=page, site=site, protocol=protocole)
+                nom = f"sitemap-{section}-{page}.xml"
+                self._ecrire(f"{DOSSIER}/{nom}", render_to_string("sitemap.xml", {"urlset": urls}))
+                ecrits.add(nom)
+                lastmod = max((u["lastmod"] for u in urls if u.get("lastmod")), default=None)
+                index.append(SitemapIndexItem(base_url + reverse("sitemap_genere", args=[nom]), lastmod))
+            self.stdout.write(f"  {section} : {sitemap.paginator.count} URLs, {sitemap.paginator.num_pages} fichier(s)")
+
+        self._ecrire(f"{DOSSIER}/sitemap.xml", render_to_string("sitemap_index.xml", {"sitemaps": index}))
+        ecrits.add("sitemap.xml")
+
+        # Pages devenues superflues (catalogue réduit depuis la dernière génération)
+        if default_storage.exists(DOSSIER):
+            for nom in default_storage.listdir(DOSSIER)[1]:
+                if nom.startswith("sitemap") and nom not in ecrits:
+                    default_storage.delete(f"{DOSSIER}/{nom}")
+
+        url_index = base_url + reverse("sitemap_genere", args=["sitemap.xml"])
+        self.stdout.write(self.style.SUCCESS(f"✓ Sitemap généré : {url_index} ({len(index)} section(s))"))
+
+    @staticmethod
+    def _ecrire(chemin, contenu):
+        if default_storage.exists(chemin):
+            default_storage.delete(chemin)
+        default_storage.save(chemin, ContentFile(contenu.encode("utf-8")))
@@ -0,0 +1,59 @@
+"""
+Importe un portefeuille (locataires, biens, baux signés) depuis un classeur
+.xlsx ou un fichier .csv, comme la page "Importer un portefeuille" : tout
+est validé avant d'écrire, rien n'est créé s'il reste une erreur.
+
+Usage:
+    python manage.py importer_portefeuille portefeuille.xlsx --auteur bailleur@example.com
+    python manage.py importer_portefeuille portefeuille.csv --auteur admin --simulation
+"""
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+from django.db.models import Q
+
+from apps.core.profiling import CommandeProfilable
+from apps.core.services.import_portefeuille import importer
+
+
+class Command(CommandeProfilable):
+    help = "Importe locataires, biens et baux depuis un fichier .xlsx ou .csv"
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', type=str, help='Fichier .xlsx ou .csv (une ligne par bail)')
+        parser.add_argument(
+            '--auteur',
+            required=True,
+            help="Bailleur (ses propres biens) ou admin (colonne proprietaire) : identifiant ou e-mail",
+        )
+        parser.add_argument('--simulation', action='store_true', help='Valide le fichier sans rien créer')
+
+    def handle(self, *args, **options):
+        chemin = Path(options['fichier'])
+        if not chemin.is_file():
+            raise CommandError(f"Fichier introuvable : {chemin}")
+        User = get_user_model()
+        auteur = User.objects.filter(Q(username=options['auteur']) | Q(email__iexact=options['auteur'])).first()
+        if auteur is None:
+            raise CommandError(f"Utilisateur introuvable : {options['auteur']}")
+
+        with chemin.open("rb") as fichier:
+            rapport = importer(fichier, chemin.name, auteur, simulation=options['simulation'])
+
+        if not rapport.valide:
+            for ligne, erreurs in rapport.erreurs_par_ligne():
+                for erreur in erreurs:
+                    self.stdout.write(f"  ligne {ligne or '—'} : {erreur}")
+            raise CommandError(f"{len(rapport.erreurs)} erreur(s) : rien n'a été importé.")
+
+        verbe = "à créer" if rapport.simulation else "créé(s)"
+        self.stdout.write(f"  Baux {verbe} : {rapport.baux_crees}")
+        self.stdout.write(f"  Biens {verbe} : {rapport.biens_crees} (existants réutilisés : {rapport.biens_existants})")
+        self.stdout.write(
+            f"  Locataires {verbe} : {rapport.locataires_crees} (déjà inscrits : {rapport.locataires_existants})"
+        )
+        if rapport.simulation:
+            self.stdout.write(self.style.SUCCESS(f"✓ Fichier valide ({rapport.lignes} ligne(s)), rien n'a été créé"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✓ Import terminé : {rapport.lignes} ligne(s)"))
@@ -0,0 +1,69 @@
+"""
+(Ré)indexe la GED : une ligne Document par contrat, quittance et PDF d'état
+des lieux existants. À lancer après déploiement, ou si l'index a divergé
+(fichiers déplacés hors de l'ORM). Les signaux tiennent ensuite l'index à jour.
+
+Usage:
+    python manage.py indexer_documents
+    python manage.py indexer_documents --sans-taille --profile-memory
+"""
+from django.db.models import Exists, OuterRef, Q
+
+from apps.core.models import Bail, Document, EtatDesLieux, Loyer
+from apps.core.profiling import CommandeProfilable
+from apps.core.services.documents import document_pour, enregistrer_en_masse
+
+TAILLE_LOT = 500
+
+
+def _avec_fichier(champ):
+    return ~Q(**{f"{champ}__isnull": True}) & ~Q(**{champ: ""})
+
+
+class Command(CommandeProfilable):
+    help = "Construit ou reconstruit l'index des documents (GED)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sans-taille',
+            action='store_true',
+            help='Ne lit pas la taille des fichiers (storage distant lent)',
+        )
+
+    def handle(self, *args, **options):
+        avec_taille = not options['sans_taille']
+        sources = (
+            ("CONTRAT", Bail.objects.filter(_avec_fichier("fichier_contrat")).select_related("bien"), None),
+            ("QUITTANCE", Loyer.objects.filter(_avec_fichier("quittance")).select_related("bail__bien"), "bail"),
+            ("EDL", EtatDesLieux.objects.filter(_avec_fichier("pdf")).select_related("bail__bien"), "bail"),
+        )
+
+        total = 0
+        for type_document, queryset, acces_bail in sources:
+            lot = []
+            indexes = 0
+            for instance in queryset.order_by("pk").iterator(chunk_size=TAILLE_LOT):
+                bail = getattr(instance, acces_bail) if acces_bail else instance
+                document = document_pour(instance, bail=bail, avec_taille=avec_taille)
+                if document is None:
+                    continue
+                lot.append(document)
+                indexes += 1
+                if len(lot) >= TAILLE_LOT:
+                    enregistrer_en_masse(lot, batch_size=TAILLE_LOT)
+                    total += len(lot)
+                    lot = []
+            if lot:
+                enregistrer_en_masse(lot, batch_size=TAILLE_LOT)
+                total += len(lot)
+
+            # Sources supprimées ou sans fichier depuis la dernière indexation :
+            # anti-jointure en base plutôt qu'une liste d'ids de taille illimitée
+            orphelins = (
+                Document.objects.filter(type_document=type_document)
+                .filter(~Exists(queryset.filter(pk=OuterRef("objet_id"))))
+                .delete()[0]
+            )
+            self.stdout.write(f"  {type_document} : {indexes} indexé(s), {orphelins} retiré(s)")
+
+        self.stdout.write(self.style.SUCCESS(f"✓ {total} document(s) indexé(s)"))
@@ -0,0 +1,68 @@
+"""
+Partitionnement par année de Loyer, Transaction et HistoriqueRelance
+(PostgreSQL uniquement, voir apps/core/partitions.py).
+
+Usage:
+    python manage.py partitions                     # état des partitions
+    python manage.py partitions --convertir         # conversion initiale (fenêtre de maintenance)
+    python manage.py partitions --maintenir         # partitions à venir + rétention (tâche mensuelle)
+    python manage.py partitions --maintenir --retention 0
+"""
+from django.core.management.base import CommandError
+from django.db import NotSupportedError
+
+from apps.core import partitions
+from apps.core.profiling import CommandeProfilable
+
+
+class Command(CommandeProfilable):
+    help = "Partitionne par année les tables de loyers, transactions et relances (PostgreSQL)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--convertir',
+            action='store_true',
+            help='Convertit les tables ordinaires en tables partitionnées',
+        )
+        parser.add_argument(
+            '--maintenir',
+            action='store_true',
+            help='Crée les partitions à venir et détache les plus anciennes',
+        )
+        parser.add_argument(
+            '--avance',
+            type=int,
+            help="Années créées d'avance (défaut: PARTITIONS_ANNEES_AVANCE)",
+        )
+        parser.add_argument(
+            '--retention',
+            type=int,
+            help='Années conservées attachées, 0 = sans limite (défaut: PARTITIONS_RETENTION_ANNEES)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options['convertir']:
+                for model, cle in partitions.modeles_partitionnes():
+                    converti = partitions.convertir(model, options['avance'])
+                    etat = "convertie" if converti else "déjà partitionnée"
+                    self.stdout.write(f"  {model._meta.db_table} ({cle}) : {etat}")
+
+            if options['maintenir']:
+                bilan = partitions.maintenir(options['avance'], options['retention'])
+                for table, detail in bilan.items():
+                    self.stdout.write(
+                        f"  {table} : créées {detail['creees'] or '-'}, détachées {detail['detachees'] or '-'}"
+                    )
+
+            for model, cle in partitions.modeles_partitionnes():
+                if partitions.est_partitionnee(model):
+                    annees = partitions.annees_partitions(model)
+                    etendue = f"{annees[0]}–{annees[-1]}" if annees else "aucune année"
+                    self.stdout.write(f"  {model._meta.db_table} : partitions {etendue} + défaut")
+                else:
+                    self.stdout.write(f"  {model._meta.db_table} : non partitionnée")
+        except NotSupportedError as exc:
+            raise CommandError(str(exc))
+
+        self.stdout.write(self.style.SUCCESS("✓ Partitions à jour"))
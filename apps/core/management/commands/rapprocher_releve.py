@@ -0,0 +1,54 @@
+"""
+Rapproche un relevé Wave ou Orange Money (export .csv / .xlsx de
+l'opérateur) avec les loyers ouverts : transactions créées et loyers mis à
+jour en masse, lignes incertaines placées dans la file de vérification
+(admin : "Lignes de relevé à vérifier"). Réimporter un relevé est sans effet.
+
+Usage:
+    python manage.py rapprocher_releve wave_juin.csv --provider WAVE --auteur admin
+    python manage.py rapprocher_releve om_juin.xlsx --provider OM --simulation
+"""
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import CommandError
+
+from apps.core.profiling import CommandeProfilable
+from apps.core.services.rapprochement import PROVIDERS, rapprocher
+
+
+class Command(CommandeProfilable):
+    help = "Rapproche un relevé Wave / Orange Money avec les loyers"
+
+    def add_arguments(self, parser):
+        parser.add_argument('fichier', type=str, help="Relevé .csv ou .xlsx exporté par l'opérateur")
+        parser.add_argument('--provider', required=True, choices=PROVIDERS, help='Opérateur du relevé')
+        parser.add_argument('--auteur', help="Identifiant de l'administrateur enregistré sur les transactions")
+        parser.add_argument('--simulation', action='store_true', help='Affiche le résultat sans rien écrire')
+
+    def handle(self, *args, **options):
+        chemin = Path(options['fichier'])
+        if not chemin.is_file():
+            raise CommandError(f"Fichier introuvable : {chemin}")
+        auteur = None
+        if options['auteur']:
+            auteur = get_user_model().objects.filter(username=options['auteur']).first()
+            if auteur is None:
+                raise CommandError(f"Utilisateur introuvable : {options['auteur']}")
+
+        with chemin.open("rb") as fichier:
+            rapport = rapprocher(
+                fichier, chemin.name, options['provider'], auteur=auteur, simulation=options['simulation']
+            )
+
+        for ligne, erreur in rapport.erreurs:
+            self.stdout.write(f"  ligne {ligne or '—'} : {erreur}")
+        self.stdout.write(f"  Lignes lues : {rapport.lignes}")
+        self.stdout.write(f"  Rapprochées : {rapport.rapprochees} ({rapport.montant_rapproche:,} FCFA)")
+        self.stdout.write(f"  À vérifier : {rapport.a_revoir}")
+        self.stdout.write(f"  Déjà importées : {rapport.deja_importees}")
+        self.stdout.write(f"  Ignorées (débits) : {rapport.ignorees}")
+        if rapport.simulation:
+            self.stdout.write(self.style.SUCCESS("✓ Simulation terminée, rien n'a été écrit"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"✓ Relevé {chemin.name} rapproché"))
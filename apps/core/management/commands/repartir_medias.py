@@ -0,0 +1,200 @@
+"""
+Déplace les fichiers déposés avant le découpage en sous-répertoires
+(apps/core/medias.py) vers leur chemin réparti et réécrit les chemins en
+base, par lots.
+
+Reprenable : les lignes déjà traitées ne correspondent plus au filtre
+(chemin déjà réparti), et les anciens fichiers ne sont supprimés qu'une
+fois le lot enregistré. Une copie laissée par un lot interrompu est
+réutilisée si son contenu est identique (même empreinte SHA-256).
+
+Usage:
+    python manage.py repartir_medias --dry-run
+    python manage.py repartir_medias --lot 1000 --champ core.Loyer.quittance
+"""
+import hashlib
+import logging
+
+from django.apps import apps
+from django.core.management.base import CommandError
+from django.db import models, transaction
+from django.db.models import Case, Q, Value, When
+from django.utils import timezone
+
+from apps.core import cache as cache_public
+from apps.core.medias import CheminReparti
+from apps.core.models import Bien, Document, Televersement
+from apps.core.profiling import CommandeProfilable
+from apps.core.services.images import supprimer_derives
+from apps.core.tasks import generer_derives_image
+
+logger = logging.getLogger(__name__)
+
+# Tables qui recopient des chemins de fichiers
+COPIES = ((Document, "fichier"), (Televersement, "fichier"))
+# Réponses en cache contenant des URLs de fichiers (accueil mobile du locataire)
+LOCATAIRE = {
+    "core.Bail": "locataire_id",
+    "core.Loyer": "bail__locataire_id",
+    "core.EtatDesLieux": "bail__locataire_id",
+    "core.Intervention": "locataire_id",
+}
+
+
+def champs_repartis():
+    for model in apps.get_models():
+        for champ in model._meta.concrete_fields:
+            if isinstance(champ, models.FileField) and isinstance(champ.upload_to, CheminReparti):
+                yield model, champ
+
+
+def _empreinte(storage, nom):
+    empreinte = hashlib.sha256()
+    with storage.open(nom, "rb") as fichier:
+        for morceau in fichier.chunks():
+            empreinte.update(morceau)
+    return empreinte.hexdigest()
+
+
+class Command(CommandeProfilable):
+    help = "Range les fichiers existants dans l'arborescence répartie (AAAA/MM/hash)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lot',
+            type=int,
+            default=500,
+            help='Nombre de lignes traitées par transaction (défaut: 500)',
+        )
+        parser.add_argument(
+            '--champ',
+            type=str,
+            help='Limiter à un champ, ex. core.Loyer.quittance',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Compte les fichiers à déplacer sans rien modifier',
+        )
+
+    def handle(self, *args, **options):
+        champs = [
+            (model, champ) for model, champ in champs_repartis()
+            if not options['champ'] or options['champ'] == f"{model._meta.label}.{champ.name}"
+        ]
+        if not champs:
+            raise CommandError(f"Champ inconnu ou non réparti : {options['champ']}")
+
+        total = 0
+        for model, champ in champs:
+            a_deplacer = (
+                model._base_manager
+                .exclude(Q(**{f"{champ.name}__isnull": True}) | Q(**{champ.name: ""}))
+                .exclude(**{f"{champ.name}__regex": champ.upload_to.motif})
+                .order_by("pk")
+            )
+            libelle = f"{model._meta.label}.{champ.name}"
+            if options['dry_run']:
+                self.stdout.write(f"  {libelle} : {a_deplacer.count()} fichier(s) à déplacer")
+                continue
+
+            deplaces = manquants = 0
+            dernier = None
+            while True:
+                lot = a_deplacer if dernier is None else a_deplacer.filter(pk__gt=dernier)
+                lot = list(lot.only("pk", champ.name)[:options['lot']])
+                if not lot:
+                    break
+                dernier = lot[-1].pk
+                nb, absents = self._deplacer_lot(model, champ, lot)
+                deplaces += nb
+                manquants += absents
+            total += deplaces
+            self.stdout.write(f"  {libelle} : {deplaces} déplacé(s), {manquants} introuvable(s)")
+
+        if not options['dry_run']:
+            cache_public.invalider(cache_public.CATALOGUE)
+            self.stdout.write(self.style.SUCCESS(f"✓ {total} fichier(s) réparti(s)"))
+
+    def _deplacer_lot(self, model, champ, lot):
+        storage = champ.storage
+        deplacements = {}
+        modifies = []
+        manquants = 0
+        for objet in lot:
+            fichier = getattr(objet, champ.name)
+            ancien = fichier.name
+            if ancien not in deplacements:
+                if not storage.exists(ancien):
+                    manquants += 1
+                    continue
+                deplacements[ancien] = self._copier(storage, champ.upload_to, ancien)
+            fichier.name = deplacements[ancien]
+            modifies.append(objet)
+
+        if not modifies:
+            return 0, manquants
+
+        # bulk_update : pas de signaux (ni réindexation, ni nouveaux dérivés).
+        # Ni auto_now : updated_at est posé à la main pour la synchronisation mobile
+        maintenant = timezone.now()
+        champs = [champ.name]
+        if any(c.name == "updated_at" for c in model._meta.concrete_fields):
+            champs.append("updated_at")
+            for objet in modifies:
+                objet.updated_at = maintenant
+        with transaction.atomic():
+            model._base_manager.bulk_update(modifies, champs)
+            for copie, nom in COPIES:
+                copie.objects.filter(**{f"{nom}__in": deplacements}).update(**{
+                    nom: Case(
+                        *[When(**{nom: ancien}, then=Value(nouveau)) for ancien, nouveau in deplacements.items()],
+                        default=nom,
+                    ),
+                    "updated_at": maintenant,
+                })
+
+        # Après commit seulement : un lot interrompu garde ses anciens fichiers,
+        # et les pages en cache sont invalidées avant que leurs URLs ne cassent
+        groupes = self._groupes_cache(model, [objet.pk for objet in modifies])
+        cache_public.invalider(*groupes)
+        encore_utilises = set(
+            model._base_manager.filter(**{f"{champ.name}__in": deplacements}).values_list(champ.name, flat=True)
+        )
+        for ancien, nouveau in deplacements.items():
+            if ancien in encore_utilises:
+                continue
+            storage.delete(ancien)
+            if isinstance(champ, models.ImageField):
+                supprimer_derives(ancien, storage)
+                try:
+                    generer_derives_image.delay(nouveau, groupes)
+                except Exception:
+                    # `manage.py generer_derives_images` rattrapera
+                    logger.exception("Impossible de planifier les dérivés de %s.", nouveau)
+        return len(modifies), manquants
+
+    def _groupes_cache(self, model, pks):
+        if model is Bien:
+            return [cache_public.CATALOGUE]
+        chemin = LOCATAIRE.get(model._meta.label)
+        if chemin is None:
+            return []
+        locataires = model._base_manager.filter(pk__in=pks).values_list(chemin, flat=True).distinct()
+        return [cache_public.groupe_locataire(locataire_id) for locataire_id in locataires if locataire_id]
+
+    def _copier(self, storage, upload_to, ancien):
+        try:
+            date = storage.get_modified_time(ancien)
+        except (NotImplementedError, OSError):
+            date = None
+        nouveau = upload_to.chemin(ancien, date)
+        # Copie d'un lot interrompu, et non un autre fichier du même nom
+        if (
+            storage.exists(nouveau)
+            and storage.size(nouveau) == storage.size(ancien)
+            and _empreinte(storage, nouveau) == _empreinte(storage, ancien)
+        ):
+            return nouveau
+        with storage.open(ancien, "rb") as source:
+            return storage.save(nouveau, source)
@@ -0,0 +1,134 @@
+"""
+Faux opérateur de paiement : rejoue une rafale de notifications signées
+(format Wave ou Orange Money) contre le webhook, pour mesurer le débit de
+réception. Un événement par loyer ouvert (montant = reste à payer), plus
+une part de doublons renvoyés avec le même id, comme le font les opérateurs
+quand la réponse tarde.
+
+Le serveur (runserver, gunicorn) et les workers Celery tournent à côté ; la
+base ciblée doit être celle du serveur, avec le même secret
+(WAVE_WEBHOOK_SECRET / OM_WEBHOOK_SECRET). Les loyers sont réellement
+crédités : à réserver aux bases de test.
+
+Usage:
+    python manage.py simuler_webhooks --nombre 500 --concurrence 20
+    python manage.py simuler_webhooks --provider OM --doublons 0.3 --url http://127.0.0.1:8000
+"""
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.core.benchmark import resumer
+from apps.core.models import Loyer
+from apps.core.services.rapprochement import OUVERTS
+from apps.core.services.webhooks import ENTETES_SIGNATURE, PROVIDERS, signer
+
+
+def _evenement(provider, loyer):
+    """Corps d'une notification de paiement réussi pour `loyer`."""
+    quand = timezone.now().isoformat()
+    transaction_id = f"SIM-{uuid.uuid4().hex[:16].upper()}"
+    if provider == "WAVE":
+        return {
+            "id": f"EV_{uuid.uuid4().hex}",
+            "type": "checkout.session.completed",
+            "data": {
+                "id": f"cos-{uuid.uuid4().hex[:12]}",
+                "transaction_id": transaction_id,
+                "amount": str(loyer.reste_a_payer),
+                "currency": "XOF",
+                "client_reference": loyer.reference_paiement,
+                "payment_status": "succeeded",
+                "when_completed": quand,
+            },
+        }
+    return {
+        "id": f"om-{uuid.uuid4().hex}",
+        "status": "SUCCESS",
+        "txnid": transaction_id,
+        "amount": loyer.reste_a_payer,
+        "order_id": loyer.reference_paiement,
+        "customer_msisdn": "221770000000",
+        "date": quand,
+    }
+
+
+class Command(BaseCommand):
+    help = "Rejoue une rafale de notifications de paiement signées contre le webhook"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--provider', choices=PROVIDERS, default="WAVE", help='Format des notifications (défaut: WAVE)')
+        parser.add_argument('--nombre', type=int, default=200, help="Nombre d'événements distincts (défaut: 200)")
+        parser.add_argument('--concurrence', type=int, default=10, help='Requêtes simultanées (défaut: 10)')
+        parser.add_argument('--doublons', type=float, default=0.1, help='Part des événements renvoyés une seconde fois (défaut: 0.1)')
+        parser.add_argument('--url', default="http://127.0.0.1:8000", help='Adresse du serveur (défaut: http://127.0.0.1:8000)')
+        parser.add_argument('--timeout', type=float, default=10.0, help='Délai maximal par requête, en secondes (défaut: 10)')
+
+    def handle(self, *args, **options):
+        provider = options['provider']
+        if not settings.PAIEMENT_WEBHOOK_SECRETS.get(provider):
+            raise CommandError(f"Secret webhook non configuré pour {provider}.")
+        if not 0 <= options['doublons'] <= 1:
+            raise CommandError("--doublons doit être compris entre 0 et 1.")
+
+        loyers = list(Loyer.objects.filter(statut__in=OUVERTS).order_by("pk")[: options['nombre']])
+        if not loyers:
+            raise CommandError("Aucun loyer ouvert à payer.")
+        if len(loyers) < options['nombre']:
+            self.stdout.write(self.style.WARNING(f"Seulement {len(loyers)} loyer(s) ouvert(s)."))
+
+        corps = [json.dumps(_evenement(provider, loyer)).encode() for loyer in loyers]
+        envois = corps + random.sample(corps, round(len(corps) * options['doublons']))
+        random.shuffle(envois)
+
+        url = options['url'].rstrip("/") + reverse("api-webhook-paiement", args=[provider.lower()])
+        entete = ENTETES_SIGNATURE[provider]
+
+        def envoyer(donnees):
+            requete = urllib.request.Request(
+                url,
+                data=donnees,
+                method="POST",
+                headers={"Content-Type": "application/json", entete: signer(provider, donnees)},
+            )
+            debut = time.perf_counter()
+            try:
+                with urllib.request.urlopen(requete, timeout=options['timeout']) as reponse:
+                    statut, doublon = reponse.status, json.load(reponse).get("doublon")
+            except urllib.error.HTTPError as exc:
+                statut, doublon = exc.code, None
+            except (urllib.error.URLError, OSError):
+                statut, doublon = "erreur réseau", None
+            return statut, doublon, (time.perf_counter() - debut) * 1000
+
+        self.stdout.write(
+            f"{len(envois)} requête(s) ({len(corps)} événements, {len(envois) - len(corps)} doublons) "
+            f"vers {url}, concurrence {options['concurrence']}"
+        )
+        debut = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrence']) as executeur:
+            resultats = list(executeur.map(envoyer, envois))
+        duree = time.perf_counter() - debut
+
+        statuts = Counter(statut for statut, _, _ in resultats)
+        resume = resumer([ms for _, _, ms in resultats])
+        self.stdout.write(
+            f"  {len(envois) / duree:.1f} req/s en {duree:.2f}s ; "
+            f"latence p50={resume['p50']:.1f}ms p95={resume['p95']:.1f}ms max={resume['max']:.1f}ms"
+        )
+        self.stdout.write("  statuts : " + ", ".join(f"{statut}={nb}" for statut, nb in sorted(statuts.items(), key=str)))
+        self.stdout.write(f"  doublons reconnus : {sum(1 for _, doublon, _ in resultats if doublon)}")
+        if statuts.get(200) == len(envois):
+            self.stdout.write(self.style.SUCCESS("Toutes les notifications ont été acceptées."))
+        else:
+            self.stdout.write(self.style.ERROR("Certaines notifications ont été refusées."))
@@ -0,0 +1,43 @@
+"""
+Arborescence des fichiers déposés (FileField / ImageField).
+
+Un upload_to fixe ("quittances/") met tous les fichiers d'un type dans un
+seul répertoire : avec des centaines de milliers de quittances, listings,
+sauvegardes et résolutions d'inodes deviennent lents. CheminReparti range
+chaque fichier par mois de dépôt puis par préfixe de hash du nom :
+
+    quittances/2025/06/ab/quittance_412.pdf
+
+soit au plus 256 sous-répertoires par mois. Les fichiers déposés avant ce
+découpage sont déplacés par `manage.py repartir_medias`.
+"""
+import hashlib
+import re
+from pathlib import PurePosixPath
+
+from django.utils import timezone
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class CheminReparti:
+    def __init__(self, prefixe):
+        self.prefixe = prefixe.strip("/")
+
+    def __call__(self, instance, filename):
+        return self.chemin(filename)
+
+    def __eq__(self, other):
+        return isinstance(other, CheminReparti) and self.prefixe == other.prefixe
+
+    def chemin(self, filename, date=None):
+        """Chemin réparti de `filename` (mois de `date`, par défaut maintenant)."""
+        date = date or timezone.now()
+        nom = PurePosixPath(filename).name
+        repartition = hashlib.md5(nom.encode()).hexdigest()[:2]
+        return f"{self.prefixe}/{date:%Y/%m}/{repartition}/{nom}"
+
+    @property
+    def motif(self):
+        """Regex des chemins déjà répartis (filtre `__regex` de repartir_medias)."""
+        return rf"^{re.escape(self.prefixe)}/[0-9]{{4}}/[0-9]{{2}}/[0-9a-f]{{2}}/"
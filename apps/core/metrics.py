@@ -0,0 +1,244 @@
+"""
+Registre de métriques léger (compteurs et histogrammes) exposé au format texte Prometheus.
+
+Les valeurs sont stockées dans un backend choisi par METRICS_BACKEND :
+- "memory" : dictionnaire du processus courant (développement, tests) ;
+- "redis"  : hash Redis partagé, sûr pour plusieurs workers Gunicorn / Celery.
+
+Si METRICS_ENABLED est faux, toutes les opérations sont des no-op.
+Une erreur du backend n'interrompt jamais le code instrumenté.
+"""
+import functools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+DUREE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+TAILLE_BUCKETS = (10_000, 50_000, 100_000, 500_000, 1_000_000, 5_000_000, 20_000_000)
+
+_SEPARATEUR = "\t"
+
+
+# ============================================================================
+# BACKENDS
+# ============================================================================
+
+class NullBackend:
+    def incr(self, metrique, champ, valeurs):
+        pass
+
+    def lire(self, metrique):
+        return {}
+
+
+class MemoryBackend:
+    """Valeurs en mémoire, propres au processus."""
+
+    def __init__(self):
+        self._donnees = {}
+        self._verrou = threading.Lock()
+
+    def incr(self, metrique, champ, valeurs):
+        with self._verrou:
+            table = self._donnees.setdefault(metrique, {})
+            for suffixe, valeur in valeurs:
+                cle = f"{champ}{_SEPARATEUR}{suffixe}"
+                table[cle] = table.get(cle, 0) + valeur
+
+    def lire(self, metrique):
+        with self._verrou:
+            return dict(self._donnees.get(metrique, {}))
+
+
+class RedisBackend:
+    """Un hash Redis par métrique ; HINCRBYFLOAT est atomique entre processus."""
+
+    def __init__(self, url, prefixe="mada:metrics"):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._prefixe = prefixe
+
+    def incr(self, metrique, champ, valeurs):
+        pipe = self._client.pipeline(transaction=False)
+        for suffixe, valeur in valeurs:
+            pipe.hincrbyfloat(f"{self._prefixe}:{metrique}", f"{champ}{_SEPARATEUR}{suffixe}", valeur)
+        pipe.execute()
+
+    def lire(self, metrique):
+        brut = self._client.hgetall(f"{self._prefixe}:{metrique}")
+        return {k.decode(): float(v) for k, v in brut.items()}
+
+
+_backend = None
+_backend_verrou = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_verrou:
+            if _backend is None:
+                if not getattr(settings, "METRICS_ENABLED", False):
+                    _backend = NullBackend()
+                elif getattr(settings, "METRICS_BACKEND", "memory") == "redis":
+                    _backend = RedisBackend(settings.METRICS_REDIS_URL)
+                else:
+                    _backend = MemoryBackend()
+    return _backend
+
+
+def reinitialiser_backend():
+    """Force la relecture des settings (tests)."""
+    global _backend
+    _backend = None
+
+
+# ============================================================================
+# MÉTRIQUES
+# ============================================================================
+
+REGISTRE = {}
+
+
+class _Metrique:
+    type_prometheus = None
+
+    def __init__(self, nom, description, labels=()):
+        self.nom = nom
+        self.description = description
+        self.labels = tuple(labels)
+        REGISTRE[nom] = self
+
+    def _champ(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError(f"{self.nom} attend les labels {self.labels}, reçu {tuple(labels)}")
+        return json.dumps([str(labels[l]) for l in self.labels], ensure_ascii=False)
+
+    def _incr(self, labels, valeurs):
+        try:
+            get_backend().incr(self.nom, self._champ(labels), valeurs)
+        except ValueError:
+            raise
+        except Exception:
+            logger.debug("Métrique %s non enregistrée", self.nom, exc_info=True)
+
+
+class Counter(_Metrique):
+    type_prometheus = "counter"
+
+    def inc(self, montant=1, **labels):
+        self._incr(labels, [("total", montant)])
+
+
+class Histogram(_Metrique):
+    type_prometheus = "histogram"
+
+    def __init__(self, nom, description, labels=(), buckets=DUREE_BUCKETS):
+        super().__init__(nom, description, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, valeur, **labels):
+        # On n'incrémente qu'un seul bucket ; le cumul est fait à l'exposition
+        borne = next((b for b in self.buckets if valeur <= b), "+Inf")
+        self._incr(labels, [(f"le={borne}", 1), ("sum", valeur), ("count", 1)])
+
+    @contextmanager
+    def time(self, **labels):
+        debut = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - debut, **labels)
+
+
+# ============================================================================
+# EXPOSITION
+# ============================================================================
+
+def _format_labels(noms, valeurs, extra=None):
+    paires = list(zip(noms, valeurs))
+    if extra:
+        paires.append(extra)
+    if not paires:
+        return ""
+    echappe = [(n, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for n, v in paires]
+    return "{" + ",".join(f'{n}="{v}"' for n, v in echappe) + "}"
+
+
+def _nombre(valeur):
+    return str(int(valeur)) if float(valeur).is_integer() else repr(float(valeur))
+
+
+def exposer():
+    """Retourne toutes les métriques du registre au format texte Prometheus 0.0.4."""
+    backend = get_backend()
+    lignes = []
+
+    for nom, metrique in sorted(REGISTRE.items()):
+        famille = f"{nom}_total" if isinstance(metrique, Counter) else nom
+        lignes.append(f"# HELP {famille} {metrique.description}")
+        lignes.append(f"# TYPE {famille} {metrique.type_prometheus}")
+
+        series = {}
+        for cle, valeur in backend.lire(nom).items():
+            champ, suffixe = cle.rsplit(_SEPARATEUR, 1)
+            series.setdefault(champ, {})[suffixe] = valeur
+
+        for champ, valeurs in sorted(series.items()):
+            labels = json.loads(champ)
+            if isinstance(metrique, Histogram):
+                cumul = 0
+                for borne in (*metrique.buckets, "+Inf"):
+                    cumul += valeurs.get(f"le={borne}", 0)
+                    lignes.append(
+                        f"{nom}_bucket{_format_labels(metrique.labels, labels, ('le', borne))} {_nombre(cumul)}"
+                    )
+                lignes.append(f"{nom}_sum{_format_labels(metrique.labels, labels)} {_nombre(valeurs.get('sum', 0))}")
+                lignes.append(f"{nom}_count{_format_labels(metrique.labels, labels)} {_nombre(valeurs.get('count', 0))}")
+            else:
+                lignes.append(f"{famille}{_format_labels(metrique.labels, labels)} {_nombre(valeurs.get('total', 0))}")
+
+    return "\n".join(lignes) + "\n"
+
+
+# ============================================================================
+# MÉTRIQUES DE L'APPLICATION
+# ============================================================================
+
+TACHES = Counter("mada_taches", "Exécutions de tâches Celery par statut", labels=("tache", "statut"))
+TACHES_DUREE = Histogram("mada_taches_duree_secondes", "Durée des tâches Celery", labels=("tache",))
+RELANCES = Counter("mada_relances", "Relances de paiement traitées", labels=("statut",))
+PDF_DUREE = Histogram("mada_pdf_rendu_secondes", "Durée de rendu WeasyPrint", labels=("document",))
+EXCEL_TAILLE = Histogram(
+    "mada_export_excel_octets", "Taille des exports Excel", labels=("export",), buckets=TAILLE_BUCKETS
+)
+VUES_DUREE = Histogram("mada_vues_duree_secondes", "Latence des vues HTTP", labels=("vue", "methode", "statut"))
+
+
+def mesurer_tache(nom):
+    """Décorateur de tâche : compte succès/échecs et mesure la durée."""
+
+    def decorateur(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            debut = time.perf_counter()
+            statut = "succes"
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                statut = "echec"
+                raise
+            finally:
+                TACHES_DUREE.observe(time.perf_counter() - debut, tache=nom)
+                TACHES.inc(tache=nom, statut=statut)
+
+        return wrapper
+
+    return decorateur
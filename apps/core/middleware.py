@@ -0,0 +1,233 @@
+import json
+import logging
+import random
+import sys
+import threading
+import time
+import traceback
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import routers, slow_queries
+from .metrics import VUES_DUREE
+from .profiling import (
+    chronometrer_sql,
+    demarrer_mesures,
+    instrumenter_templates,
+    terminer_mesures,
+)
+
+logger = logging.getLogger("apps.core.profiling")
+
+# Sections connues -> nom court utilisé dans l'en-tête Server-Timing
+SECTIONS_SERVER_TIMING = {
+    "templates": "tpl",
+    "pdf": "pdf",
+    "xlsx": "xlsx",
+}
+
+
+class _SurveillantPiles:
+    """
+    Thread unique (démon, démarré au premier besoin) qui photographie la pile
+    des requêtes profilées encore en cours après leur échéance. Un minuteur
+    par requête coûterait un thread OS à chacune.
+    """
+
+    INTERVALLE = 0.05  # secondes entre deux passages
+
+    def __init__(self):
+        self.en_cours = {}  # thread_id -> (échéance, capture)
+        self.verrou = threading.Lock()
+        self.thread = None
+
+    def suivre(self, delai, capture):
+        thread_id = threading.get_ident()
+        with self.verrou:
+            self.en_cours[thread_id] = (time.perf_counter() + delai, capture)
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._boucle, name="profiling-piles", daemon=True)
+                self.thread.start()
+        return thread_id
+
+    def oublier(self, thread_id):
+        with self.verrou:
+            self.en_cours.pop(thread_id, None)
+
+    def _boucle(self):
+        while True:
+            time.sleep(self.INTERVALLE)
+            self.verifier()
+
+    def verifier(self):
+        maintenant = time.perf_counter()
+        # Sous verrou : la requête ne peut pas se terminer (et son thread en
+        # servir une autre) entre le choix de la frame et sa capture
+        with self.verrou:
+            echues = [
+                (thread_id, capture) for thread_id, (echeance, capture) in self.en_cours.items()
+                if maintenant >= echeance and "pile" not in capture
+            ]
+            if not echues:
+                return
+            frames = sys._current_frames()
+            for thread_id, capture in echues:
+                frame = frames.get(thread_id)
+                if frame is not None:
+                    capture["pile"] = "".join(traceback.format_stack(frame))
+
+
+_surveillant = _SurveillantPiles()
+
+
+class ProfilingMiddleware:
+    """
+    Mesure, pour une fraction des requêtes (PROFILING_SAMPLE_RATE) :
+    - nombre et durée des requêtes SQL,
+    - temps de rendu des templates, génération PDF / Excel,
+    - durée totale de la vue.
+
+    Les valeurs sont renvoyées dans l'en-tête `Server-Timing` et journalisées
+    en une ligne JSON (logger "apps.core.profiling"). Au-delà de
+    PROFILING_SLOW_MS, la pile du thread est capturée pendant l'exécution
+    (par un thread de surveillance partagé) et jointe au journal.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.taux = float(getattr(settings, "PROFILING_SAMPLE_RATE", 1.0))
+        self.seuil_lent_ms = float(getattr(settings, "PROFILING_SLOW_MS", 1000))
+        instrumenter_templates()
+
+    def __call__(self, request):
+        if self.taux < 1 and random.random() >= self.taux:
+            return self.get_response(request)
+
+        capture = {}
+        jeton = demarrer_mesures()
+        debut = time.perf_counter()
+        thread_id = _surveillant.suivre(self.seuil_lent_ms / 1000, capture)
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(chronometrer_sql))
+                response = self.get_response(request)
+        finally:
+            _surveillant.oublier(thread_id)
+            total_ms = (time.perf_counter() - debut) * 1000
+            mesures = terminer_mesures(jeton)
+
+        response["Server-Timing"] = self._server_timing(mesures, total_ms)
+        self._journaliser(request, response, mesures, total_ms, capture.get("pile"))
+        return response
+
+    @staticmethod
+    def _server_timing(mesures, total_ms):
+        parties = [f'db;dur={mesures["db_ms"]:.1f};desc="{mesures["db_requetes"]} requetes"']
+        for section, duree in mesures["sections"].items():
+            nom = SECTIONS_SERVER_TIMING.get(section, section)
+            parties.append(f"{nom};dur={duree:.1f}")
+        parties.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(parties)
+
+    def _journaliser(self, request, response, mesures, total_ms, pile):
+        match = getattr(request, "resolver_match", None)
+        ligne = {
+            "methode": request.method,
+            "chemin": request.path,
+            "vue": match.view_name if match else None,
+            "statut": response.status_code,
+            "total_ms": round(total_ms, 1),
+            "db_requetes": mesures["db_requetes"],
+            "db_ms": round(mesures["db_ms"], 1),
+            **{f"{section}_ms": round(duree, 1) for section, duree in mesures["sections"].items()},
+        }
+
+        if total_ms >= self.seuil_lent_ms:
+            ligne["lente"] = True
+            if pile:
+                ligne["pile"] = pile
+            logger.warning(json.dumps(ligne, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(ligne, ensure_ascii=False))
+
+
+class MetricsMiddleware:
+    """Alimente l'histogramme de latence des vues (METRICS_ENABLED)."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        debut = time.perf_counter()
+        response = self.get_response(request)
+        match = getattr(request, "resolver_match", None)
+        VUES_DUREE.observe(
+            time.perf_counter() - debut,
+            # url_name plutôt que le chemin : cardinalité bornée
+            vue=(match.view_name if match else "non_resolue"),
+            methode=request.method,
+            statut=response.status_code,
+        )
+        return response
+
+
+class SlowQueryContextMiddleware:
+    """Associe les requêtes SQL lentes capturées à la vue qui les a émises."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        jeton = slow_queries.definir_contexte(f"chemin:{request.path}"[:200])
+        try:
+            return self.get_response(request)
+        finally:
+            slow_queries.reinitialiser_contexte(jeton)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # Remplacé dans le même contexte ; le jeton de __call__ restaure l'état initial
+        slow_queries.definir_contexte(f"vue:{request.resolver_match.view_name}")
+
+
+class ReplicaSessionMiddleware:
+    """
+    Lecture-après-écriture avec la réplique : après une écriture, la session
+    lit sur le primaire pendant REPLICA_STICKY_SECONDS (délai de réplication).
+    À placer après SessionMiddleware.
+    """
+
+    CLE_SESSION = "_db_derniere_ecriture"
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.delai = float(getattr(settings, "REPLICA_STICKY_SECONDS", 10))
+
+    def __call__(self, request):
+        if routers.alias_replica() is None:
+            return self.get_response(request)
+
+        # Sans cookie de session, rien à relire : ne pas marquer la session
+        # comme consultée (Vary: Cookie) pour les appels anonymes (webhooks)
+        recente = False
+        if request.session.session_key is not None:
+            derniere = request.session.get(self.CLE_SESSION)
+            recente = derniere is not None and time.time() - derniere < self.delai
+
+        jeton, etat = routers.demarrer_requete(forcer_primaire=recente)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.terminer_requete(jeton)
+
+        if etat["ecriture"] and self._session_a_suivre(request):
+            request.session[self.CLE_SESSION] = time.time()
+        return response
+
+    @staticmethod
+    def _session_a_suivre(request):
+        # Pas de nouvelle ligne de session pour un visiteur anonyme qui écrit
+        user = getattr(request, "user", None)
+        return request.session.session_key is not None or (user is not None and user.is_authenticated)
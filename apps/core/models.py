@@ -1,12 +1,20 @@
+import uuid
 from datetime import date, timedelta
 from decimal import Decimal
 
 from django.conf import settings
-from django.db import models
+from django.contrib.postgres.fields import BigIntegerRangeField, DateRangeField, RangeOperators
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, router, transaction
+from django.db.models import F, Func, Value
+from django.db.models.functions import Upper
 from django.utils import timezone
 from django.utils.text import slugify
 from django.urls import reverse
 
+from .contraintes import ExclusionPostgres
+from .medias import CheminReparti
+
 
 # ================== SOFT DELETE GLOBALE ==================
 
@@ -20,6 +28,10 @@ class SoftDeleteManager(models.Manager):
         return super().get_queryset()
 
 
+# Condition des index partiels des modèles à soft delete
+VIVANTS = models.Q(deleted_at__isnull=True)
+
+
 class SoftDeleteModel(models.Model):
     deleted_at = models.DateTimeField(null=True, blank=True)
 
@@ -33,11 +45,18 @@ class SoftDeleteModel(models.Model):
 
     def delete(self, using=None, keep_parents=False):
         self.deleted_at = timezone.now()
-        self.save(update_fields=["deleted_at"])
+        self.save(update_fields=self._champs_suppression())
 
     def restore(self):
         self.deleted_at = None
-        self.save(update_fields=["deleted_at"])
+        self.save(update_fields=self._champs_suppression())
+
+    def _champs_suppression(self):
+        # updated_at (auto_now) n'est écrit que s'il figure dans update_fields
+        champs = ["deleted_at"]
+        if any(f.name == "updated_at" for f in self._meta.concrete_fields):
+            champs.append("updated_at")
+        return champs
 
 
 # ================== QUERYSET & MANAGER BIEN ==================
@@ -51,6 +70,7 @@ class BienQuerySet(models.QuerySet):
         return (
             self.filter(est_actif=True)
             .exclude(
+                baux__deleted_at__isnull=True,
                 baux__est_signe=True,
                 baux__date_debut__lte=aujourd_hui,
                 baux__date_fin__gte=aujourd_hui,
@@ -64,6 +84,7 @@ class BienQuerySet(models.QuerySet):
         return (
             self.filter(
                 est_actif=True,
+                baux__deleted_at__isnull=True,
                 baux__est_signe=True,
                 baux__date_debut__lte=aujourd_hui,
                 baux__date_fin__gte=aujourd_hui,
@@ -141,7 +162,7 @@ class Bien(SoftDeleteModel):  # <--- héritage SoftDeleteModel
         related_name="biens_possedes",
     )
     photo_principale = models.ImageField(
-        upload_to="biens/",
+        upload_to=CheminReparti("biens/"),
         blank=True,
         null=True,
     )
@@ -161,8 +182,21 @@ class Bien(SoftDeleteModel):  # <--- héritage SoftDeleteModel
     class Meta:
         verbose_name = "Bien Immobilier"
         verbose_name_plural = "Biens Immobiliers"
+        # Index partiels (VIVANTS) : toutes ces recherches passent par
+        # Bien.objects (deleted_at IS NULL), les lignes supprimées n'y
+        # figurent pas et ne les alourdissent pas
         indexes = [
-            models.Index(fields=["est_actif", "created_at"]),
+            models.Index(fields=["est_actif", "created_at"], name="bien_actif_idx", condition=VIVANTS),
+            # Liste "Mes biens" du bailleur
+            models.Index(fields=["proprietaire", "-created_at"], name="bien_proprietaire_idx", condition=VIVANTS),
+            # Filtres du catalogue API (ville insensible à la casse, type, loyer)
+            models.Index(
+                Upper("ville"), "type_bien", "loyer_ref", name="bien_ville_type_loyer_idx", condition=VIVANTS
+            ),
+            models.Index(fields=["loyer_ref"], name="bien_loyer_idx", condition=VIVANTS),
+            models.Index(fields=["nb_pieces", "surface"], name="bien_pieces_surface_idx", condition=VIVANTS),
+            # Ordre de la pagination par curseur
+            models.Index(fields=["-created_at", "-id"], name="bien_curseur_idx", condition=VIVANTS),
         ]
 
     def get_absolute_url(self):
@@ -205,6 +239,13 @@ class Bien(SoftDeleteModel):  # <--- héritage SoftDeleteModel
 
 # ===================== MODEL BAIL =====================
 
+CONTRAINTE_CHEVAUCHEMENT = "bail_sans_chevauchement"
+# Champs dont la modification relance full_clean() (dates, signature, bien)
+CHAMPS_VALIDES_BAIL = {
+    "bien", "bien_id", "locataire", "locataire_id", "date_debut", "date_fin",
+    "est_signe", "deleted_at", "montant_loyer", "montant_charges", "depot_garantie", "jour_paiement",
+}
+
 class Bail(SoftDeleteModel):  # <--- héritage SoftDeleteModel
     """Contrat de location liant un bien et un locataire."""
 
@@ -239,20 +280,48 @@ class Bail(SoftDeleteModel):  # <--- héritage SoftDeleteModel
     # État du dossier
     est_signe = models.BooleanField(default=False)
     fichier_contrat = models.FileField(
-        upload_to="baux_signes/",
+        upload_to=CheminReparti("baux_signes/"),
         blank=True,
         null=True,
         help_text="PDF signé",
     )
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Bail / Contrat"
         verbose_name_plural = "Baux"
         ordering = ["-date_debut"]
         indexes = [
-            models.Index(fields=["bien", "est_signe", "date_fin"]),
+            # Occupation d'un bien, bail actif d'un locataire (index partiels, voir Bien)
+            models.Index(fields=["bien", "est_signe", "date_fin"], name="bail_bien_signe_idx", condition=VIVANTS),
+            models.Index(
+                fields=["locataire", "est_signe", "date_fin"], name="bail_locataire_signe_idx", condition=VIVANTS
+            ),
+            # Synchronisation mobile (changements depuis un curseur)
+            models.Index(fields=["locataire", "updated_at"], name="bail_sync_idx"),
+        ]
+        constraints = [
+            # Pas deux baux signés (non supprimés) sur un même bien à des dates qui se
+            # chevauchent, bornes incluses comme dans clean(). L'égalité sur le bien
+            # passe par int8range(bien, bien) && ... : GiST natif, sans btree_gist.
+            ExclusionPostgres(
+                name=CONTRAINTE_CHEVAUCHEMENT,
+                expressions=[
+                    (
+                        Func(F("bien"), F("bien"), Value("[]"), function="int8range",
+                             output_field=BigIntegerRangeField()),
+                        RangeOperators.OVERLAPS,
+                    ),
+                    (
+                        Func(F("date_debut"), F("date_fin"), Value("[]"), function="daterange",
+                             output_field=DateRangeField()),
+                        RangeOperators.OVERLAPS,
+                    ),
+                ],
+                condition=models.Q(est_signe=True, deleted_at__isnull=True),
+            ),
         ]
 
     def __str__(self) -> str:
@@ -272,26 +341,49 @@ class Bail(SoftDeleteModel):  # <--- héritage SoftDeleteModel
 
         # Empêcher la création de baux qui se chevauchent (si signé)
         if self.est_signe:
-            chevauchements = Bail.objects.filter(
-                bien=self.bien,
-                est_signe=True,
-                date_debut__lte=self.date_fin,
-                date_fin__gte=self.date_debut,
-            ).exclude(pk=self.pk)
-
-            if chevauchements.exists():
-                raise ValidationError(
-                    f"Ce bien a déjà un bail actif pour cette période. "
-                    f"Bail existant : {chevauchements.first()}"
-                )
-
-    def save(self, *args, **kwargs):
+            existant = self.chevauchements().first()
+            if existant is not None:
+                raise self.erreur_chevauchement(existant)
+
+    def chevauchements(self):
+        """Baux signés du même bien dont les dates recouvrent celles-ci."""
+        return Bail.objects.filter(
+            bien_id=self.bien_id,
+            est_signe=True,
+            date_debut__lte=self.date_fin,
+            date_fin__gte=self.date_debut,
+        ).exclude(pk=self.pk)
+
+    def erreur_chevauchement(self, existant=None):
+        from django.core.exceptions import ValidationError
+
+        message = "Ce bien a déjà un bail actif pour cette période."
+        if existant is not None:
+            message += f" Bail existant : {existant}"
+        return ValidationError(message)
+
+    def save(self, *args, valider=True, **kwargs):
         """
         Aucune logique de mise à jour de disponibilité.
         La propriété calculée sur Bien gère tout automatiquement.
+
+        full_clean() (dont la requête de chevauchement) n'est exécuté que si
+        `valider` et si la sauvegarde touche un champ validé. valider=False
+        sert aux traitements en masse : sous PostgreSQL, la contrainte
+        d'exclusion garantit quand même la règle, y compris entre deux
+        signatures concurrentes, et sa violation devient la même ValidationError.
         """
-        self.full_clean()
-        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if valider and (update_fields is None or CHAMPS_VALIDES_BAIL.intersection(update_fields)):
+            self.full_clean()
+        try:
+            # Point de sauvegarde : la transaction appelante reste utilisable
+            with transaction.atomic(using=kwargs.get("using") or router.db_for_write(Bail, instance=self)):
+                super().save(*args, **kwargs)
+        except IntegrityError as exc:
+            if CONTRAINTE_CHEVAUCHEMENT not in str(exc):
+                raise
+            raise self.erreur_chevauchement(self.chevauchements().first()) from exc
 
 
 # ===================== MODEL LOYER =====================
@@ -325,16 +417,20 @@ class Loyer(models.Model):
     )
     date_paiement = models.DateTimeField(null=True, blank=True)
     quittance = models.FileField(
-        upload_to="quittances/",
+        upload_to=CheminReparti("quittances/"),
         null=True,
         blank=True,
     )
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Loyer / Échéance"
         verbose_name_plural = "Loyers"
         unique_together = ("bail", "periode_debut")
+        indexes = [
+            models.Index(fields=["bail", "updated_at"], name="loyer_sync_idx"),
+        ]
 
     def __str__(self):
         return f"{self.bail.locataire.username} - {self.periode_debut.strftime('%B %Y')}"
@@ -343,6 +439,11 @@ class Loyer(models.Model):
     def reste_a_payer(self) -> int:
         return int(self.montant_du - self.montant_verse)
 
+    @property
+    def reference_paiement(self) -> str:
+        """À indiquer en motif d'un paiement mobile : rapprochement automatique des relevés."""
+        return f"LOY{self.pk}"
+
     @property
     def est_en_retard(self) -> bool:
         return self.statut != "PAYE" and date.today() > self.date_echeance
@@ -362,7 +463,7 @@ class Loyer(models.Model):
             self.statut = "PARTIEL"
             self.date_paiement = None
 
-        self.save(update_fields=["montant_verse", "statut", "date_paiement"])
+        self.save(update_fields=["montant_verse", "statut", "date_paiement", "updated_at"])
         if self.statut == "PAYE":
             from apps.core.services.quittance import attacher_quittance
 
@@ -373,7 +474,7 @@ class Loyer(models.Model):
             return
         if date.today() > self.date_echeance:
             self.statut = "RETARD"
-            self.save(update_fields=["statut"])
+            self.save(update_fields=["statut", "updated_at"])
 
 
 # ===================== MODEL ANNONCE =====================
@@ -453,12 +554,12 @@ class Intervention(models.Model):
         default="NOUVEAU",
     )
     photo_avant = models.ImageField(
-        upload_to="interventions/avant/",
+        upload_to=CheminReparti("interventions/avant/"),
         null=True,
         blank=True,
     )
     photo_apres = models.ImageField(
-        upload_to="interventions/apres/",
+        upload_to=CheminReparti("interventions/apres/"),
         null=True,
         blank=True,
     )
@@ -469,6 +570,9 @@ class Intervention(models.Model):
         verbose_name = "Intervention"
         verbose_name_plural = "Interventions"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["locataire", "updated_at"], name="intervention_sync_idx"),
+        ]
 
     def __str__(self):
         return f"{self.objet} - {self.get_statut_display()}"
@@ -497,7 +601,7 @@ class EtatDesLieux(models.Model):
     signature_bailleur = models.BooleanField(default=False)
     signature_locataire = models.BooleanField(default=False)
     pdf = models.FileField(
-        upload_to="edl/",
+        upload_to=CheminReparti("edl/"),
         blank=True,
         null=True,
         help_text="PDF de l'état des lieux signé.",
@@ -550,10 +654,13 @@ class Transaction(models.Model):
         ("REGUL", "Régularisation Charges"),
     ]
 
+    # db_constraint=False : Loyer peut être partitionné par année
+    # (apps/core/partitions.py), PostgreSQL refuse alors une FK sur son id seul
     loyer = models.ForeignKey(
         Loyer,
         on_delete=models.CASCADE,
         related_name="transactions",
+        db_constraint=False,
     )
     montant = models.DecimalField(max_digits=10, decimal_places=0)
     provider = models.CharField(max_length=10, choices=PROVIDERS)
@@ -568,7 +675,7 @@ class Transaction(models.Model):
         default="LOYER",
     )
     preuve_paiement = models.FileField(
-        upload_to="preuves/",
+        upload_to=CheminReparti("preuves/"),
         null=True,
         blank=True,
     )
@@ -588,6 +695,10 @@ class Transaction(models.Model):
         ordering = ["-created_at"]
         verbose_name = "Transaction"
         verbose_name_plural = "Transactions"
+        indexes = [
+            # Idempotence des imports de relevés (référence opérateur déjà enregistrée ?)
+            models.Index(fields=["provider", "reference_externe"], name="transaction_reference_idx"),
+        ]
 
     def __str__(self):
         return f"{self.provider} - {self.montant} FCFA ({self.get_statut_display()})"
@@ -596,6 +707,130 @@ class Transaction(models.Model):
         return "Validée" if self.est_validee else "En attente"
 
 
+# ===================== RELEVÉS MOBILE MONEY =====================
+
+class LigneReleve(models.Model):
+    """
+    Ligne d'un relevé Wave / Orange Money que le rapprochement automatique
+    n'a pas pu attribuer à un loyer (apps/core/services/rapprochement.py).
+    File de vérification : l'administrateur choisit le loyer dans l'admin.
+    """
+    MOTIF_CHOICES = [
+        ("AMBIGU", "Plusieurs loyers possibles"),
+        ("AUCUN", "Aucun loyer trouvé"),
+        ("MONTANT", "Montant supérieur au reste à payer"),
+        ("DEJA_PAYE", "Loyer déjà payé"),
+    ]
+    STATUT_CHOICES = [
+        ("A_REVOIR", "À vérifier"),
+        ("RAPPROCHEE", "Rapprochée"),
+        ("IGNOREE", "Ignorée"),
+    ]
+
+    provider = models.CharField(max_length=10, choices=Transaction.PROVIDERS)
+    reference_externe = models.CharField(max_length=100)
+    date_operation = models.DateTimeField()
+    montant = models.DecimalField(max_digits=10, decimal_places=0)
+    telephone = models.CharField(max_length=30, blank=True)
+    libelle = models.CharField(max_length=255, blank=True)
+    fichier = models.CharField(max_length=255, blank=True, help_text="Relevé d'origine")
+    motif = models.CharField(max_length=10, choices=MOTIF_CHOICES)
+    candidats = models.JSONField(default=list, blank=True, help_text="IDs des loyers possibles")
+    statut = models.CharField(max_length=10, choices=STATUT_CHOICES, default="A_REVOIR")
+    # db_constraint=False : Loyer et Transaction peuvent être partitionnés (voir Transaction.loyer)
+    loyer = models.ForeignKey(
+        Loyer,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="lignes_releve",
+        db_constraint=False,
+        help_text="Loyer à créditer (choisi lors de la vérification)",
+    )
+    transaction = models.OneToOneField(
+        Transaction,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="ligne_releve",
+        db_constraint=False,
+    )
+    traite_par = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="lignes_releve_traitees",
+    )
+    traite_le = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["statut", "-date_operation"]
+        verbose_name = "Ligne de relevé à vérifier"
+        verbose_name_plural = "Lignes de relevé à vérifier"
+        constraints = [
+            # Réimporter un relevé ne crée pas de doublon
+            models.UniqueConstraint(fields=["provider", "reference_externe"], name="ligne_releve_reference_uniq"),
+        ]
+        indexes = [
+            models.Index(fields=["statut", "date_operation"], name="ligne_releve_statut_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_provider_display()} {self.reference_externe} - {self.montant} FCFA"
+
+
+class EvenementPaiement(models.Model):
+    """
+    Notification de paiement reçue d'un opérateur (webhook), stockée telle
+    quelle avant d'être traitée en tâche de fond (apps/core/services/webhooks.py).
+    (provider, cle_idempotence) unique : une notification renvoyée n'est
+    enregistrée et appliquée qu'une fois.
+    """
+    STATUT_CHOICES = [
+        ("RECU", "Reçu"),
+        ("TRAITE", "Traité"),
+        ("A_REVOIR", "À vérifier"),
+        ("IGNORE", "Ignoré"),
+        ("ECHEC", "Échec"),
+    ]
+
+    provider = models.CharField(max_length=10, choices=Transaction.PROVIDERS)
+    cle_idempotence = models.CharField(max_length=100, help_text="Identifiant de l'événement chez l'opérateur")
+    type_evenement = models.CharField(max_length=100, blank=True)
+    corps = models.TextField(help_text="Corps brut de la requête (signé)")
+    statut = models.CharField(max_length=10, choices=STATUT_CHOICES, default="RECU")
+    tentatives = models.PositiveSmallIntegerField(default=0)
+    erreur = models.TextField(blank=True)
+    # db_constraint=False : Transaction peut être partitionnée (apps/core/partitions.py)
+    transaction = models.OneToOneField(
+        Transaction,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="evenement_paiement",
+        db_constraint=False,
+    )
+    recu_le = models.DateTimeField(auto_now_add=True)
+    traite_le = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-recu_le"]
+        verbose_name = "Notification de paiement"
+        verbose_name_plural = "Notifications de paiement"
+        constraints = [
+            models.UniqueConstraint(fields=["provider", "cle_idempotence"], name="evenement_paiement_cle_uniq"),
+        ]
+        indexes = [
+            # Reprise des événements en attente ou en échec
+            models.Index(fields=["statut", "recu_le"], name="evenement_paiement_statut_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_provider_display()} {self.cle_idempotence} ({self.get_statut_display()})"
+
+
 # ===================== MODEL DÉPENSE =====================
 
 class Depense(models.Model):
@@ -636,7 +871,7 @@ class Depense(models.Model):
     )
 
     justificatif = models.FileField(
-        upload_to="depenses/justificatifs/",
+        upload_to=CheminReparti("depenses/justificatifs/"),
         null=True,
         blank=True,
     )
@@ -661,10 +896,12 @@ class HistoriqueRelance(models.Model):
         ("AUTRE", "Autre"),
     ]
 
+    # db_constraint=False : voir Transaction.loyer
     loyer = models.ForeignKey(
         Loyer,
         on_delete=models.CASCADE,
         related_name="relances",
+        db_constraint=False,
     )
     date_envoi = models.DateTimeField(auto_now_add=True)
     canal = models.CharField(
@@ -682,3 +919,263 @@ class HistoriqueRelance(models.Model):
 
     def __str__(self):
         return f"Relance {self.canal} pour loyer {self.loyer_id} ({self.date_envoi:%Y-%m-%d %H:%M})"
+
+
+# ===================== MODEL REQUÊTE LENTE =====================
+
+class RequeteLente(models.Model):
+    """
+    Requête SQL ayant dépassé SLOW_QUERY_MS, avec son plan d'exécution.
+    Table circulaire : la tâche purger_requetes_lentes ne conserve que les
+    SLOW_QUERY_MAX_ROWS dernières captures.
+    """
+
+    empreinte = models.CharField(
+        max_length=40,
+        db_index=True,
+        help_text="Hash du SQL normalisé (valeurs littérales retirées)",
+    )
+    sql = models.TextField()
+    duree_ms = models.FloatField()
+    plan = models.TextField(blank=True)
+    contexte = models.CharField(
+        max_length=200,
+        blank=True,
+        help_text="Vue, tâche ou commande à l'origine de la requête",
+    )
+    base = models.CharField(max_length=50, default="default")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Requête lente"
+        verbose_name_plural = "Requêtes lentes"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.duree_ms:.0f} ms - {self.sql[:80]}"
+
+
+# ===================== SUPPRESSIONS (SYNCHRONISATION MOBILE) =====================
+
+class Suppression(models.Model):
+    """
+    Trace (tombstone) d'un objet supprimé ou retiré de la vue d'un locataire,
+    pour que l'application mobile l'efface lors de la synchronisation.
+    """
+
+    TYPE_CHOICES = [
+        ("bail", "Bail"),
+        ("loyer", "Loyer"),
+        ("intervention", "Intervention"),
+    ]
+
+    type_objet = models.CharField(max_length=20, choices=TYPE_CHOICES)
+    objet_id = models.PositiveBigIntegerField()
+    locataire = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="suppressions",
+    )
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        verbose_name = "Suppression (sync)"
+        verbose_name_plural = "Suppressions (sync)"
+        indexes = [
+            models.Index(fields=["locataire", "deleted_at"], name="suppression_sync_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.type_objet} #{self.objet_id} ({self.deleted_at:%Y-%m-%d %H:%M})"
+
+
+# ===================== TÉLÉVERSEMENTS REPRENABLES =====================
+
+class Televersement(models.Model):
+    """
+    Envoi d'un document par morceaux (protocole inspiré de tus, voir
+    apps/core/services/televersement.py). Les morceaux reçus sont stockés
+    sous televersements/<id>/ puis assemblés dans `fichier`, à l'emplacement
+    du champ cible, une fois `recu` égal à `taille`.
+    """
+
+    CIBLE_CHOICES = [
+        ("bail.fichier_contrat", "Contrat de bail signé"),
+        ("edl.pdf", "État des lieux signé"),
+        ("depense.justificatif", "Justificatif de dépense"),
+        ("transaction.preuve_paiement", "Preuve de paiement"),
+        ("profil.cni_scan", "Scan CNI / Passeport"),
+    ]
+    STATUT_CHOICES = [
+        ("EN_COURS", "En cours"),
+        ("TERMINE", "Terminé"),
+        ("ANNULE", "Annulé"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    utilisateur = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="televersements",
+    )
+    cible = models.CharField(max_length=40, choices=CIBLE_CHOICES)
+    nom_original = models.CharField(max_length=255)
+    type_mime = models.CharField(max_length=100)
+    taille = models.PositiveBigIntegerField(help_text="Taille totale annoncée (octets)")
+    recu = models.PositiveBigIntegerField(default=0, help_text="Octets reçus (offset du prochain morceau)")
+    statut = models.CharField(max_length=10, choices=STATUT_CHOICES, default="EN_COURS")
+    fichier = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="Chemin du document assemblé dans le storage",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Téléversement"
+        verbose_name_plural = "Téléversements"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["statut", "updated_at"], name="televersement_purge_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.nom_original} ({self.recu}/{self.taille} octets, {self.get_statut_display()})"
+
+
+# ===================== GED : INDEX DES DOCUMENTS =====================
+
+class Document(models.Model):
+    """
+    Index des documents disponibles (contrats signés, quittances, états des
+    lieux), tenu à jour par signaux dès qu'un fichier est attaché
+    (apps/core/services/documents.py). La GED lit cette seule table au lieu
+    de filtrer les fichiers non vides de trois modèles.
+    """
+
+    TYPE_CHOICES = [
+        ("CONTRAT", "Contrat de bail"),
+        ("QUITTANCE", "Quittance de loyer"),
+        ("EDL", "État des lieux"),
+    ]
+
+    type_document = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    # Bail, Loyer ou EtatDesLieux selon type_document
+    objet_id = models.PositiveBigIntegerField()
+    fichier = models.CharField(max_length=255)
+    taille = models.PositiveBigIntegerField(null=True, blank=True, help_text="Octets")
+    date_document = models.DateField(help_text="Début du bail, période de la quittance ou date de l'EDL")
+    bail = models.ForeignKey(Bail, on_delete=models.CASCADE, related_name="documents")
+    bien = models.ForeignKey(Bien, on_delete=models.CASCADE, related_name="documents")
+    proprietaire = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="documents_bailleur",
+    )
+    locataire = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="documents_locataire",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Document"
+        verbose_name_plural = "Documents"
+        ordering = ["-date_document", "-id"]
+        constraints = [
+            models.UniqueConstraint(fields=["type_document", "objet_id"], name="document_unique_objet"),
+        ]
+        indexes = [
+            # Une requête indexée par rôle : admin, bailleur, locataire
+            models.Index(fields=["-date_document", "-id"], name="document_date_idx"),
+            models.Index(fields=["proprietaire", "-date_document", "-id"], name="document_bailleur_idx"),
+            models.Index(fields=["locataire", "-date_document", "-id"], name="document_locataire_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.get_type_document_display()} #{self.objet_id} ({self.date_document:%Y-%m-%d})"
+
+    def get_absolute_url(self):
+        vues = {"CONTRAT": "download_contrat", "QUITTANCE": "download_quittance", "EDL": "download_edl"}
+        return reverse(vues[self.type_document], args=[self.objet_id])
+
+
+class ExportDocuments(models.Model):
+    """
+    Archive ZIP de documents de la GED préparée en tâche de fond quand la
+    sélection est trop volumineuse pour être envoyée en direct
+    (apps/core/services/export_documents.py). `filtres` : ceux de la GED.
+    """
+
+    STATUT_CHOICES = [
+        ("EN_ATTENTE", "En attente"),
+        ("EN_COURS", "En cours"),
+        ("TERMINE", "Terminé"),
+        ("ECHEC", "Échec"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    utilisateur = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="exports_documents",
+    )
+    filtres = models.JSONField(default=dict, blank=True)
+    statut = models.CharField(max_length=10, choices=STATUT_CHOICES, default="EN_ATTENTE")
+    nb_documents = models.PositiveIntegerField(null=True, blank=True)
+    fichier = models.CharField(max_length=255, blank=True, help_text="Chemin de l'archive dans le storage")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Export de documents"
+        verbose_name_plural = "Exports de documents"
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["utilisateur", "-created_at"], name="export_doc_utilisateur_idx"),
+            models.Index(fields=["updated_at"], name="export_doc_purge_idx"),
+        ]
+
+    def __str__(self):
+        return f"Export {self.pk} ({self.get_statut_display()})"
+
+    def get_absolute_url(self):
+        return reverse("download_export_documents", args=[self.pk])
+
+
+# ===================== ARCHIVES DES LIGNES SUPPRIMÉES =====================
+
+class ArchiveSuppression(models.Model):
+    """
+    Ligne supprimée (soft delete) depuis longtemps, sortie de sa table par
+    `manage.py archiver_supprimes` pour garder tables et index vivants
+    compacts. `donnees` : sérialisation Django complète de la ligne,
+    restaurable avec apps.core.services.archivage.restaurer().
+    """
+
+    objet_id = models.PositiveBigIntegerField(unique=True)
+    donnees = models.JSONField(encoder=DjangoJSONEncoder)
+    deleted_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        abstract = True
+        ordering = ["-deleted_at"]
+
+    def __str__(self):
+        return f"{self._meta.verbose_name} #{self.objet_id} (supprimé le {self.deleted_at:%Y-%m-%d})"
+
+
+class BienArchive(ArchiveSuppression):
+    class Meta(ArchiveSuppression.Meta):
+        verbose_name = "Bien archivé"
+        verbose_name_plural = "Biens archivés"
+
+
+class BailArchive(ArchiveSuppression):
+    class Meta(ArchiveSuppression.Meta):
+        verbose_name = "Bail archivé"
+        verbose_name_plural = "Baux archivés"
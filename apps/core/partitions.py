@@ -0,0 +1,328 @@
+"""
+Partitionnement par année (PostgreSQL, partitionnement déclaratif RANGE)
+des tables qui grossissent avec le temps : Loyer, Transaction,
+HistoriqueRelance.
+
+    core_loyer                 table partitionnée (PARTITION BY RANGE periode_debut)
+    ├── core_loyer_2024        FOR VALUES FROM ('2024-01-01') TO ('2025-01-01')
+    ├── core_loyer_2025
+    ├── ...                    créées d'avance par maintenir() (tâche Celery mensuelle)
+    └── core_loyer_defaut      DEFAULT : dates hors des années créées
+
+Les requêtes filtrées sur la clé (periode_debut, created_at__year du grand
+livre, date_envoi) ne lisent que la partition de la période. Côté Django
+rien ne change : la clé primaire en base devient (id, clé) car PostgreSQL
+l'exige, mais `id` reste unique (séquence) et sert de pk au modèle. Une
+table partitionnée ne pouvant être référencée par une clé étrangère sur
+`id` seul, les FK vers Loyer sont déclarées db_constraint=False.
+
+Conversion des tables existantes : opération de migration
+PartitionnerParAnnee ou `manage.py partitions --convertir`.
+Rétention : maintenir() détache (sans les supprimer) les partitions plus
+anciennes que PARTITIONS_RETENTION_ANNEES ; elles restent des tables
+autonomes (core_loyer_2014...) à sauvegarder puis supprimer. Les FK sans
+contrainte ne protégeant rien, une année encore référencée (paiement tardif
+d'un vieux loyer, ligne de relevé...) reste attachée jusqu'au détachement
+des lignes qui y pointent.
+"""
+import logging
+import re
+from datetime import date, datetime
+
+from django.apps import apps as registre
+from django.conf import settings
+from django.db import NotSupportedError, connections, models, router, transaction
+from django.db.migrations.operations.base import Operation
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# modèle -> colonne de partitionnement
+CLES = {
+    "core.Loyer": "periode_debut",
+    "core.Transaction": "created_at",
+    "core.HistoriqueRelance": "date_envoi",
+}
+
+
+def modeles_partitionnes():
+    return [(registre.get_model(label), cle) for label, cle in CLES.items()]
+
+
+def _connexion(model):
+    connexion = connections[router.db_for_write(model)]
+    if connexion.vendor != "postgresql":
+        raise NotSupportedError("Partitionnement disponible uniquement sous PostgreSQL.")
+    return connexion
+
+
+def _bornes(champ, annee):
+    """Littéraux SQL [début, fin) de l'année `annee` pour la colonne `champ`."""
+    if isinstance(champ, models.DateTimeField):
+        # Années du fuseau du projet, comme les filtres __year de Django
+        debut, fin = (timezone.make_aware(datetime(a, 1, 1)).isoformat() for a in (annee, annee + 1))
+    else:
+        debut, fin = date(annee, 1, 1).isoformat(), date(annee + 1, 1, 1).isoformat()
+    return f"'{debut}'", f"'{fin}'"
+
+
+def _annee(valeur):
+    if isinstance(valeur, datetime):
+        return timezone.localtime(valeur).year if timezone.is_aware(valeur) else valeur.year
+    return valeur.year
+
+
+def nom_partition(table, annee):
+    return f"{table}_{annee}"
+
+
+def est_partitionnee(model):
+    with _connexion(model).cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [model._meta.db_table])
+        ligne = cursor.fetchone()
+    return ligne is not None and ligne[0] == "p"
+
+
+def annees_partitions(model):
+    """Années des partitions attachées à la table de `model`."""
+    table = model._meta.db_table
+    with _connexion(model).cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT enfant.relname FROM pg_inherits
+            JOIN pg_class enfant ON enfant.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            """,
+            [table],
+        )
+        noms = [nom for (nom,) in cursor.fetchall()]
+    prefixe = f"{table}_"
+    return sorted(int(nom[len(prefixe):]) for nom in noms if nom[len(prefixe):].isdigit())
+
+
+def creer_partition(model, annee):
+    """
+    Crée la partition `annee` si elle n'existe pas. Les lignes de cette année
+    tombées entre-temps dans la partition DEFAULT y sont déplacées.
+    Retourne True si la partition a été créée.
+    """
+    connexion = _connexion(model)
+    table = model._meta.db_table
+    cle = model._meta.get_field(CLES[model._meta.label]).column
+    partition, defaut = nom_partition(table, annee), f"{table}_defaut"
+    debut, fin = _bornes(model._meta.get_field(CLES[model._meta.label]), annee)
+    q = connexion.ops.quote_name
+
+    with transaction.atomic(using=connexion.alias), connexion.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s) IS NOT NULL", [partition])
+        if cursor.fetchone()[0]:
+            return False
+        dans_defaut = f"{q(cle)} >= {debut} AND {q(cle)} < {fin}"
+        cursor.execute(f"SELECT EXISTS (SELECT 1 FROM {q(defaut)} WHERE {dans_defaut})")
+        if cursor.fetchone()[0]:
+            cursor.execute(f"ALTER TABLE {q(table)} DETACH PARTITION {q(defaut)}")
+            cursor.execute(f"CREATE TABLE {q(partition)} PARTITION OF {q(table)} FOR VALUES FROM ({debut}) TO ({fin})")
+            cursor.execute(
+                f"WITH deplacees AS (DELETE FROM {q(defaut)} WHERE {dans_defaut} RETURNING *) "
+                f"INSERT INTO {q(table)} SELECT * FROM deplacees"
+            )
+            cursor.execute(f"ALTER TABLE {q(table)} ATTACH PARTITION {q(defaut)} DEFAULT")
+        else:
+            cursor.execute(f"CREATE TABLE {q(partition)} PARTITION OF {q(table)} FOR VALUES FROM ({debut}) TO ({fin})")
+    logger.info("Partition %s créée.", partition)
+    return True
+
+
+def detacher_partition(model, annee):
+    """Détache la partition `annee` : elle devient une table autonome, données intactes."""
+    connexion = _connexion(model)
+    table = model._meta.db_table
+    q = connexion.ops.quote_name
+    with connexion.cursor() as cursor:
+        cursor.execute(f"ALTER TABLE {q(table)} DETACH PARTITION {q(nom_partition(table, annee))}")
+    logger.info("Partition %s détachée.", nom_partition(table, annee))
+
+
+def references(model, annee):
+    """
+    Tables dont des lignes (attachées) pointent encore vers la partition
+    `annee` de `model`. La détacher les laisserait sur des ids introuvables.
+    """
+    cle = CLES[model._meta.label]
+    alias = router.db_for_write(model)
+    return [
+        relation.related_model._meta.db_table
+        for relation in model._meta.related_objects
+        if relation.one_to_many
+        and relation.related_model._base_manager.using(alias)
+        .filter(**{f"{relation.field.name}__{cle}__year": annee})
+        .exists()
+    ]
+
+
+def convertir(model, annees_avance=None):
+    """
+    Transforme la table ordinaire de `model` en table partitionnée par année
+    (copie des lignes, des index et des FK sortantes). Verrou exclusif sur la
+    table pendant la copie : à lancer pendant une fenêtre de maintenance.
+    Retourne False si la table est déjà partitionnée.
+    """
+    if est_partitionnee(model):
+        return False
+    annees_avance = settings.PARTITIONS_ANNEES_AVANCE if annees_avance is None else annees_avance
+    connexion = _connexion(model)
+    table = model._meta.db_table
+    ancienne = f"{table}_avant_partition"
+    champ_cle = model._meta.get_field(CLES[model._meta.label])
+    cle = champ_cle.column
+    pk = model._meta.pk.column
+    q = connexion.ops.quote_name
+
+    with transaction.atomic(using=connexion.alias), connexion.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {q(table)} IN ACCESS EXCLUSIVE MODE")
+
+        # Index et FK sortantes, recréés après la copie (les noms se libèrent avec l'ancienne table)
+        cursor.execute(
+            """
+            SELECT pg_get_indexdef(ix.indexrelid), ix.indisunique,
+                   ARRAY(SELECT a.attname FROM pg_attribute a
+                         WHERE a.attrelid = ix.indrelid AND a.attnum = ANY(ix.indkey))
+            FROM pg_index ix
+            WHERE ix.indrelid = to_regclass(%s) AND NOT ix.indisprimary
+            """,
+            [table],
+        )
+        index = cursor.fetchall()
+        cursor.execute(
+            """
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = to_regclass(%s) AND contype = 'f'
+            """,
+            [table],
+        )
+        cles_etrangeres = cursor.fetchall()
+        cursor.execute(f"SELECT MIN({q(cle)}) FROM {q(table)}")
+        plus_ancienne = cursor.fetchone()[0]
+
+        cursor.execute(f"ALTER TABLE {q(table)} RENAME TO {q(ancienne)}")
+        cursor.execute(
+            f"CREATE TABLE {q(table)} (LIKE {q(ancienne)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+            f"PARTITION BY RANGE ({q(cle)})"
+        )
+        # La clé de partitionnement doit faire partie de la clé primaire
+        cursor.execute(f"ALTER TABLE {q(table)} ADD PRIMARY KEY ({q(pk)}, {q(cle)})")
+        cursor.execute(f"CREATE TABLE {q(table + '_defaut')} PARTITION OF {q(table)} DEFAULT")
+
+        annee_courante = timezone.localdate().year
+        premiere = min(_annee(plus_ancienne), annee_courante) if plus_ancienne else annee_courante
+        for annee in range(premiere, annee_courante + annees_avance + 1):
+            debut, fin = _bornes(champ_cle, annee)
+            cursor.execute(
+                f"CREATE TABLE {q(nom_partition(table, annee))} PARTITION OF {q(table)} "
+                f"FOR VALUES FROM ({debut}) TO ({fin})"
+            )
+
+        cursor.execute(f"INSERT INTO {q(table)} SELECT * FROM {q(ancienne)}")
+        # CASCADE : supprime aussi les FK entrantes (impossibles vers une table partitionnée)
+        cursor.execute(f"DROP TABLE {q(ancienne)} CASCADE")
+
+        # Séquence plutôt qu'une colonne d'identité (non gérée sur les tables
+        # partitionnées avant PostgreSQL 17), au nom de l'ancienne, supprimée avec sa table
+        sequence = f"{table}_{pk}_seq"
+        cursor.execute(f"CREATE SEQUENCE {q(sequence)} OWNED BY {q(table)}.{q(pk)}")
+        cursor.execute(f"ALTER TABLE {q(table)} ALTER COLUMN {q(pk)} SET DEFAULT nextval('{sequence}'::regclass)")
+        cursor.execute(f"SELECT setval('{sequence}'::regclass, COALESCE((SELECT MAX({q(pk)}) FROM {q(table)}), 1))")
+
+        for definition, unique, colonnes in index:
+            if unique and cle not in colonnes:
+                logger.warning("%s : index unique sans %s ignoré (%s).", table, cle, definition)
+                continue
+            # "CREATE INDEX x ON public.<ancienne> USING ..." -> même index sur la nouvelle table
+            cursor.execute(re.sub(rf' ON (\S+\.)?"?{re.escape(ancienne)}"? ', f" ON {q(table)} ", definition, count=1))
+        for nom, definition in cles_etrangeres:
+            cursor.execute(f"ALTER TABLE {q(table)} ADD CONSTRAINT {q(nom)} {definition}")
+
+    logger.info("Table %s partitionnée par année (%s).", table, cle)
+    return True
+
+
+def maintenir(annees_avance=None, retention=None):
+    """
+    Crée les partitions jusqu'à l'année courante + `annees_avance` et
+    détache celles antérieures à l'année courante - `retention` (0 : jamais)
+    qui ne sont plus référencées. Sans effet hors PostgreSQL ou sur une table
+    non convertie.
+    Retourne {table: {"creees": [...], "detachees": [...]}}.
+    """
+    annees_avance = settings.PARTITIONS_ANNEES_AVANCE if annees_avance is None else annees_avance
+    retention = settings.PARTITIONS_RETENTION_ANNEES if retention is None else retention
+    annee_courante = timezone.localdate().year
+    modeles = [
+        model for model, _ in modeles_partitionnes()
+        if connections[router.db_for_write(model)].vendor == "postgresql" and est_partitionnee(model)
+    ]
+    bilan = {}
+    for model in modeles:
+        creees = [
+            annee for annee in range(annee_courante, annee_courante + annees_avance + 1)
+            if creer_partition(model, annee)
+        ]
+        bilan[model._meta.db_table] = {"creees": creees, "detachees": []}
+    if not retention:
+        return bilan
+
+    # CLES liste les tables référencées avant celles qui les référencent : en
+    # remontant, les transactions et relances d'une année sont détachées avant
+    # que ses loyers soient examinés, dans le même passage
+    for model in reversed(modeles):
+        for annee in annees_partitions(model):
+            if annee >= annee_courante - retention:
+                continue
+            referencee_par = references(model, annee)
+            if referencee_par:
+                logger.warning(
+                    "Partition %s conservée : encore référencée par %s.",
+                    nom_partition(model._meta.db_table, annee), ", ".join(referencee_par),
+                )
+                continue
+            detacher_partition(model, annee)
+            bilan[model._meta.db_table]["detachees"].append(annee)
+    return bilan
+
+
+class PartitionnerParAnnee(Operation):
+    """
+    Opération de migration : convertit la table d'un modèle de CLES en table
+    partitionnée par année (sans effet hors PostgreSQL). L'état des modèles
+    ne change pas.
+
+        operations = [PartitionnerParAnnee("Loyer")]
+    """
+
+    reversible = False
+    atomic = True
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+    def state_forwards(self, app_label, state):
+        pass
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        # Modèle réel (et non historique) : convertir() lit CLES et Meta
+        convertir(registre.get_model(app_label, self.model_name))
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        raise NotSupportedError("Le partitionnement d'une table n'est pas réversible automatiquement.")
+
+    def describe(self):
+        return f"Partitionne la table de {self.model_name} par année"
+
+    @property
+    def migration_name_fragment(self):
+        return f"partitionner_{self.model_name.lower()}"
+
+    def deconstruct(self):
+        return self.__class__.__name__, [self.model_name], {}
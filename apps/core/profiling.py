@@ -0,0 +1,259 @@
+"""
+Chronométrage par requête HTTP et profilage mémoire des commandes / tâches.
+
+Le middleware ProfilingMiddleware ouvre une "session de mesure" (ContextVar) ;
+le code métier y ajoute ses sections via `chronometre("pdf")`, sans rien
+savoir du middleware. Hors requête profilée, chronometre() ne coûte presque rien.
+"""
+import functools
+import gc
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+logger = logging.getLogger(__name__)
+
+_mesures = ContextVar("mesures_requete", default=None)
+
+
+def demarrer_mesures():
+    """Ouvre une session de mesure et retourne le jeton permettant de la fermer."""
+    return _mesures.set({"sections": {}, "db_requetes": 0, "db_ms": 0.0})
+
+
+def terminer_mesures(jeton):
+    """Ferme la session de mesure et retourne les valeurs collectées."""
+    mesures = _mesures.get()
+    _mesures.reset(jeton)
+    return mesures
+
+
+def mesures_courantes():
+    return _mesures.get()
+
+
+def ajouter_duree(section, duree_ms):
+    mesures = _mesures.get()
+    if mesures is not None:
+        mesures["sections"][section] = mesures["sections"].get(section, 0.0) + duree_ms
+
+
+@contextmanager
+def chronometre(section):
+    """Ajoute la durée du bloc à la section `section` de la requête en cours."""
+    if _mesures.get() is None:
+        yield
+        return
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        ajouter_duree(section, (time.perf_counter() - debut) * 1000)
+
+
+def chronometrer_sql(execute, sql, params, many, context):
+    """Execute wrapper (connection.execute_wrapper) comptant les requêtes SQL."""
+    mesures = _mesures.get()
+    if mesures is None:
+        return execute(sql, params, many, context)
+    debut = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        mesures["db_requetes"] += 1
+        mesures["db_ms"] += (time.perf_counter() - debut) * 1000
+
+
+_templates_instrumentes = False
+
+
+def instrumenter_templates():
+    """
+    Enveloppe le rendu des templates Django (render(), render_to_string())
+    dans chronometre("templates"). Idempotent.
+    Les {% include %} passent par le moteur interne et ne sont pas comptés deux fois.
+    """
+    global _templates_instrumentes
+    if _templates_instrumentes:
+        return
+
+    from django.template.backends.django import Template
+
+    rendu_original = Template.render
+
+    def render(self, context=None, request=None):
+        with chronometre("templates"):
+            return rendu_original(self, context, request)
+
+    Template.render = render
+    _templates_instrumentes = True
+
+
+# ============================================================================
+# PROFILAGE MÉMOIRE (commandes et tâches)
+# ============================================================================
+
+def _rss_ko():
+    """RSS courante en Ko (/proc sous Linux, sinon pic via getrusage)."""
+    try:
+        with open("/proc/self/status") as f:
+            for ligne in f:
+                if ligne.startswith("VmRSS:"):
+                    return int(ligne.split()[1])
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class ProfilMemoire:
+    """
+    Context manager : pic tracemalloc, principaux sites d'allocation et
+    variation de RSS, écrits dans un rapport JSON (MEMORY_PROFILE_DIR).
+
+        with ProfilMemoire("generer_loyers") as profil:
+            ...
+        profil.rapport["pic_ko"], profil.chemin
+    """
+
+    # Profils ouverts : tracemalloc (et son pic) est global au processus
+    _ouverts = []
+
+    def __init__(self, nom, nb_sites=15):
+        self.nom = nom
+        self.nb_sites = nb_sites
+        self.rapport = None
+        self.chemin = None
+
+    def __enter__(self):
+        gc.collect()
+        self._proprietaire = not tracemalloc.is_tracing()
+        self._pic_masque = 0
+        if self._proprietaire:
+            tracemalloc.start()
+            self._taille_debut, self._cliche_debut = 0, None
+        else:
+            # Profil imbriqué (commande lancée par une tâche profilée) : mesuré
+            # depuis l'entrée, sans perdre le pic des profils englobants
+            self._taille_debut, pic = tracemalloc.get_traced_memory()
+            for englobant in ProfilMemoire._ouverts:
+                englobant._pic_masque = max(englobant._pic_masque, pic)
+            tracemalloc.reset_peak()
+            self._cliche_debut = self._cliche()
+        ProfilMemoire._ouverts.append(self)
+        self._rss_debut = _rss_ko()
+        self._debut = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duree = time.perf_counter() - self._debut
+        ProfilMemoire._ouverts.remove(self)
+        _, pic = tracemalloc.get_traced_memory()
+        pic = max(pic, self._pic_masque) - self._taille_debut
+        cliche = self._cliche()
+        if self._cliche_debut is None:
+            sites = [(stat.traceback[0], stat.size, stat.count) for stat in cliche.statistics("lineno")]
+        else:
+            sites = sorted(
+                (
+                    (stat.traceback[0], stat.size_diff, stat.count_diff)
+                    for stat in cliche.compare_to(self._cliche_debut, "lineno")
+                    if stat.size_diff > 0
+                ),
+                key=lambda site: site[1],
+                reverse=True,
+            )
+        if self._proprietaire:
+            tracemalloc.stop()
+        rss_fin = _rss_ko()
+
+        self.rapport = {
+            "nom": self.nom,
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "duree_s": round(duree, 3),
+            "succes": exc_type is None,
+            "pic_ko": round(pic / 1024, 1),
+            "rss_debut_ko": self._rss_debut,
+            "rss_fin_ko": rss_fin,
+            "rss_delta_ko": rss_fin - self._rss_debut,
+            "sites": [
+                {
+                    "fichier": str(cadre.filename),
+                    "ligne": cadre.lineno,
+                    "taille_ko": round(taille / 1024, 1),
+                    "allocations": nombre,
+                }
+                for cadre, taille, nombre in sites[: self.nb_sites]
+            ],
+        }
+        try:
+            self.chemin = self._ecrire()
+        except OSError:
+            logger.warning("Rapport mémoire %s non écrit", self.nom, exc_info=True)
+        return False
+
+    @staticmethod
+    def _cliche():
+        return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+    def _ecrire(self):
+        dossier = Path(getattr(settings, "MEMORY_PROFILE_DIR", settings.BASE_DIR / "profils_memoire"))
+        dossier.mkdir(parents=True, exist_ok=True)
+        chemin = dossier / f"{self.nom}_{datetime.now():%Y%m%d_%H%M%S}_{os.getpid()}.json"
+        chemin.write_text(json.dumps(self.rapport, indent=2, ensure_ascii=False), encoding="utf-8")
+        return chemin
+
+
+class CommandeProfilable(BaseCommand):
+    """BaseCommand avec l'option --profile-memory (rapport ProfilMemoire par exécution)."""
+
+    def create_parser(self, prog_name, subcommand, **kwargs):
+        parser = super().create_parser(prog_name, subcommand, **kwargs)
+        parser.add_argument(
+            '--profile-memory',
+            action='store_true',
+            help='Mesure le pic mémoire et les sites d\'allocation (rapport JSON)',
+        )
+        return parser
+
+    def execute(self, *args, **options):
+        if not options.get("profile_memory"):
+            return super().execute(*args, **options)
+
+        nom = self.__module__.rsplit(".", 1)[-1]
+        with ProfilMemoire(f"commande_{nom}") as profil:
+            resultat = super().execute(*args, **options)
+
+        rapport = profil.rapport
+        self.stdout.write(
+            f"🧠 Mémoire : pic {rapport['pic_ko']:,.0f} Ko, RSS {rapport['rss_delta_ko']:+,} Ko"
+            f" → {profil.chemin}"
+        )
+        return resultat
+
+
+def profiler_memoire_tache(fn):
+    """
+    Décorateur de tâche Celery : produit un rapport ProfilMemoire par exécution
+    lorsque MEMORY_PROFILE_TASKS est actif (sans coût sinon).
+    """
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not getattr(settings, "MEMORY_PROFILE_TASKS", False):
+            return fn(*args, **kwargs)
+        with ProfilMemoire(f"tache_{fn.__name__}"):
+            return fn(*args, **kwargs)
+
+    return wrapper
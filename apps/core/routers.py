@@ -0,0 +1,73 @@
+"""
+Routage des lectures de reporting vers la réplique PostgreSQL.
+
+Les lectures ne partent vers la réplique que dans un bloc explicitement
+marqué `utiliser_replica()` (vues et services de reporting) ; tout le reste,
+y compris les écritures, reste sur "default".
+
+Cohérence lecture-après-écriture :
+- dès qu'une écriture a lieu dans la requête, les lectures suivantes de la
+  même requête repassent sur le primaire ;
+- ReplicaSessionMiddleware mémorise l'heure de la dernière écriture en
+  session et force le primaire pendant REPLICA_STICKY_SECONDS.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+_replica = ContextVar("lecture_replica", default=False)
+_etat_requete = ContextVar("etat_replica_requete", default=None)
+
+
+def alias_replica():
+    alias = getattr(settings, "REPLICA_DB_ALIAS", "replica")
+    return alias if alias in settings.DATABASES else None
+
+
+@contextmanager
+def utiliser_replica():
+    """
+    Context manager / décorateur : les lectures du bloc vont sur la réplique.
+
+        @utiliser_replica()
+        def grand_livre(request): ...
+    """
+    jeton = _replica.set(True)
+    try:
+        yield
+    finally:
+        _replica.reset(jeton)
+
+
+def demarrer_requete(forcer_primaire=False):
+    """Ouvre l'état d'une requête HTTP ; retourne (jeton, etat)."""
+    etat = {"ecriture": False, "forcer_primaire": forcer_primaire}
+    return _etat_requete.set(etat), etat
+
+
+def terminer_requete(jeton):
+    _etat_requete.reset(jeton)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica.get():
+            return None
+        etat = _etat_requete.get()
+        if etat is not None and (etat["ecriture"] or etat["forcer_primaire"]):
+            return "default"
+        return alias_replica()
+
+    def db_for_write(self, model, **hints):
+        etat = _etat_requete.get()
+        if etat is not None:
+            etat["ecriture"] = True
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Même données de part et d'autre : relations autorisées entre primaire et réplique
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
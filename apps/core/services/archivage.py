@@ -0,0 +1,79 @@
+"""
+Archivage des lignes supprimées (soft delete) depuis longtemps.
+
+Bien et Bail gardent leurs lignes supprimées (deleted_at) : les index
+partiels les ignorent déjà, mais elles pèsent toujours sur la table. Au-delà
+de ARCHIVAGE_DELAI_JOURS, une ligne est sérialisée dans sa table d'archive
+(BienArchive, BailArchive) puis réellement supprimée.
+
+Seules les lignes dont plus rien ne dépend sont archivées : un bail avec
+des loyers, états des lieux ou dépenses (historique comptable) reste en
+place, de même qu'un bien encore référencé par un bail, une annonce, une
+intervention ou une dépense. Les baux passent en premier : un bien dont le
+dernier bail vient d'être archivé le devient à son tour.
+"""
+import logging
+from datetime import timedelta
+
+from django.core import serializers
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from apps.core.models import Bail, BailArchive, Bien, BienArchive
+
+logger = logging.getLogger(__name__)
+
+ARCHIVES = {Bail: BailArchive, Bien: BienArchive}
+# Relations inverses qui empêchent l'archivage
+BLOQUANTS = {
+    Bail: ("loyers", "etats_des_lieux", "depenses_imputables"),
+    Bien: ("baux", "annonces", "interventions", "depenses"),
+}
+ORDRE = (Bail, Bien)
+
+
+def archivables(model, limite):
+    """Lignes de `model` supprimées avant `limite` et dont rien ne dépend."""
+    lignes = model.all_objects.filter(deleted_at__lt=limite)
+    for relation in BLOQUANTS[model]:
+        champ = model._meta.get_field(relation)
+        dependants = champ.related_model._base_manager.filter(**{champ.field.name: OuterRef("pk")})
+        lignes = lignes.filter(~Exists(dependants))
+    return lignes.order_by("pk")
+
+
+def limite_archivage(jours):
+    return timezone.now() - timedelta(days=jours)
+
+
+def archiver_lot(model, pks, limite):
+    """
+    Archive les lignes `pks` de `model` (re-vérifiées sous verrou) et les
+    supprime de la table vivante. Retourne le nombre de lignes archivées.
+    """
+    with transaction.atomic():
+        objets = list(archivables(model, limite).filter(pk__in=pks).select_for_update(of=("self",)))
+        if not objets:
+            return 0
+        ARCHIVES[model].objects.bulk_create([
+            ARCHIVES[model](objet_id=objet.pk, donnees=donnees, deleted_at=objet.deleted_at)
+            for objet, donnees in zip(objets, serializers.serialize("python", objets))
+        ])
+        # Suppression réelle : les lignes de l'index GED suivent en cascade
+        model.all_objects.filter(pk__in=[objet.pk for objet in objets]).delete()
+    return len(objets)
+
+
+def restaurer(archive):
+    """
+    Réinsère la ligne archivée (toujours marquée supprimée : .restore()
+    pour la remettre en service) et retire l'archive. Un bail ne peut être
+    restauré qu'une fois son bien revenu dans la table.
+    """
+    with transaction.atomic():
+        ligne = next(serializers.deserialize("python", [archive.donnees]))
+        ligne.save()
+        archive.delete()
+    logger.info("%s #%s restauré depuis les archives.", type(ligne.object).__name__, ligne.object.pk)
+    return ligne.object
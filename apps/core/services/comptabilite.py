@@ -0,0 +1,56 @@
+import openpyxl
+from openpyxl.styles import Font, PatternFill, Alignment
+
+from apps.core.models import Depense, Transaction
+from apps.core.routers import utiliser_replica
+
+
+@utiliser_replica()
+def ecrire_grand_livre_excel(annee, destination):
+    """
+    Écrit le grand livre de l'année (recettes validées + dépenses) au format xlsx
+    dans `destination` (HttpResponse, fichier ouvert ou chemin).
+    """
+    recettes = (
+        Transaction.objects.filter(est_validee=True, created_at__year=annee)
+        .select_related("loyer__bail__bien", "loyer__bail__locataire")
+    )
+    depenses = Depense.objects.filter(date_paiement__year=annee).select_related("bien")
+
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = f"Grand Livre {annee}"
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="10B981", end_color="10B981", fill_type="solid")
+    center_align = Alignment(horizontal="center")
+    currency_fmt = '#,##0 "FCFA"'
+
+    headers = ["Date", "Type", "Libellé / Tiers", "Bien concerné", "Recette (Crédit)", "Dépense (Débit)"]
+    ws.append(headers)
+
+    for cell in ws[1]:
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = center_align
+
+    # Recettes
+    for r in recettes:
+        libelle = f"Loyer {r.loyer.periode_debut.strftime('%m/%Y')} - {r.loyer.bail.locataire.get_full_name()}"
+        ws.append([r.created_at.date(), "RECETTE", libelle, r.loyer.bail.bien.titre, r.montant, 0])
+
+    # Dépenses
+    for d in depenses:
+        ws.append([d.date_paiement, "DEPENSE", f"{d.get_type_depense_display()} : {d.libelle}", d.bien.titre, 0, d.montant])
+
+    # Formats monétaires colonnes E/F
+    for row in ws.iter_rows(min_row=2, min_col=5, max_col=6):
+        for cell in row:
+            cell.number_format = currency_fmt
+
+    # Largeurs colonnes
+    widths = [15, 15, 48, 30, 22, 22]
+    for i, w in enumerate(widths, start=1):
+        ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
+
+    wb.save(destination)
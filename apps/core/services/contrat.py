@@ -4,7 +4,8 @@ from django.conf import settings
 from django.core.files.base import ContentFile
 from django.template.loader import render_to_string
 from django.utils import timezone
-from weasyprint import HTML
+
+from .pdf import html_vers_pdf
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +28,7 @@ def generer_contrat_bail_pdf(bail):
 
     html_string = render_to_string('documents/contrat_bail.html', context)
 
-    # base_url aide à résoudre les liens relatifs si besoin
-    pdf_bytes = HTML(string=html_string, base_url=str(settings.BASE_DIR)).write_pdf()
+    pdf_bytes = html_vers_pdf(html_string, document="contrat")
 
     nom_fichier = f"Bail_{bail.id}_{bail.locataire.last_name}.pdf"
     return pdf_bytes, nom_fichier
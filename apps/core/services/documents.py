@@ -0,0 +1,123 @@
+"""
+Index de la GED (modèle Document).
+
+Chaque source (contrat du bail, quittance du loyer, PDF de l'état des lieux)
+a au plus une ligne Document, créée ou mise à jour par signaux dès que son
+fichier change (signals.py), et recalculable en masse par
+`manage.py indexer_documents`. Bailleur, locataire et bien sont recopiés
+depuis le bail : la GED de chaque rôle est une seule requête indexée.
+"""
+import logging
+
+from apps.core.models import Bail, Document, EtatDesLieux, Loyer
+from apps.core.permissions import is_admin, is_bailleur, is_locataire
+
+logger = logging.getLogger(__name__)
+
+# modèle -> (type_document, champ fichier, champ date, accès au bail)
+SOURCES = {
+    Bail: ("CONTRAT", "fichier_contrat", "date_debut", None),
+    Loyer: ("QUITTANCE", "quittance", "periode_debut", "bail"),
+    EtatDesLieux: ("EDL", "pdf", "date_realisation", "bail"),
+}
+CHAMPS_MAJ = ["fichier", "taille", "date_document", "bail", "bien", "proprietaire", "locataire"]
+
+
+def documents_visibles(user):
+    """Documents accessibles à `user` selon son rôle (GED, exports)."""
+    if is_admin(user):
+        return Document.objects.all()
+    if is_bailleur(user):
+        return Document.objects.filter(proprietaire=user)
+    if is_locataire(user):
+        return Document.objects.filter(locataire=user)
+    return Document.objects.none()
+
+
+def filtrer(documents, params):
+    """
+    Applique les filtres de la GED (type, annee, proprietaire, locataire)
+    lus dans `params` (QueryDict ou dict). Retourne (queryset, filtres retenus).
+    """
+    filtres = {}
+    type_document = params.get("type", "")
+    if type_document in dict(Document.TYPE_CHOICES):
+        documents = documents.filter(type_document=type_document)
+        filtres["type"] = type_document
+    for cle, lookup in (
+        ("annee", "date_document__year"),
+        ("proprietaire", "proprietaire_id"),
+        ("locataire", "locataire_id"),
+    ):
+        valeur = str(params.get(cle) or "")
+        if valeur.isdigit():
+            documents = documents.filter(**{lookup: int(valeur)})
+            filtres[cle] = valeur
+    return documents, filtres
+
+
+def taille_fichier(fieldfile):
+    try:
+        return fieldfile.size
+    except (OSError, ValueError):
+        # Fichier référencé mais absent du storage : indexé quand même
+        logger.warning("GED : taille illisible pour %s.", fieldfile.name)
+        return None
+
+
+def document_pour(instance, bail=None, avec_taille=True):
+    """
+    Document (non sauvegardé) correspondant à `instance`, ou None si elle
+    n'a pas de fichier (ou si c'est un bail supprimé).
+    `bail` doit avoir son bien chargé (select_related) pour éviter une requête.
+    """
+    type_document, champ, champ_date, acces_bail = SOURCES[type(instance)]
+    fichier = getattr(instance, champ)
+    if not fichier:
+        return None
+    bail = bail or (getattr(instance, acces_bail) if acces_bail else instance)
+    if bail.deleted_at and type_document == "CONTRAT":
+        return None
+    return Document(
+        type_document=type_document,
+        objet_id=instance.pk,
+        fichier=fichier.name,
+        taille=taille_fichier(fichier) if avec_taille else None,
+        date_document=getattr(instance, champ_date),
+        bail_id=bail.pk,
+        bien_id=bail.bien_id,
+        proprietaire_id=bail.bien.proprietaire_id,
+        locataire_id=bail.locataire_id,
+    )
+
+
+def indexer(instance):
+    type_document = SOURCES[type(instance)][0]
+    document = document_pour(instance)
+    if document is None:
+        Document.objects.filter(type_document=type_document, objet_id=instance.pk).delete()
+        return None
+    Document.objects.update_or_create(
+        type_document=type_document,
+        objet_id=instance.pk,
+        defaults={
+            champ.attname: getattr(document, champ.attname)
+            for champ in map(Document._meta.get_field, CHAMPS_MAJ)
+        },
+    )
+    return document
+
+
+def desindexer(instance):
+    Document.objects.filter(type_document=SOURCES[type(instance)][0], objet_id=instance.pk).delete()
+
+
+def enregistrer_en_masse(documents, batch_size=500):
+    """Upsert par lots (une requête par lot) sur la contrainte (type_document, objet_id)."""
+    return Document.objects.bulk_create(
+        documents,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=["type_document", "objet_id"],
+        update_fields=CHAMPS_MAJ,
+    )
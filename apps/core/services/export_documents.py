@@ -0,0 +1,167 @@
+"""
+Export ZIP des documents de la GED (comptables : "toutes les quittances et
+contrats 2025 du bailleur X").
+
+L'archive est construite à la volée : chaque fichier est relu par blocs
+depuis le storage et compressé directement dans le flux de sortie (ZIP en
+mode non « seekable », tailles et CRC écrits après chaque fichier). Ni
+l'archive ni les documents ne sont gardés en mémoire ou sur disque :
+
+- petite sélection : flux_zip() alimente une StreamingHttpResponse ;
+- grosse sélection (> EXPORT_DOCUMENTS_SEUIL_DIRECT documents) : une tâche
+  Celery écrit le même flux dans le storage (ExportDocuments) et l'utilisateur
+  reçoit un lien de téléchargement.
+"""
+import io
+import logging
+import zipfile
+from datetime import timedelta
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.mail import send_mail
+from django.utils import timezone
+from django.utils.text import slugify
+
+from apps.core.models import ExportDocuments
+from apps.core.services.documents import documents_visibles, filtrer
+
+logger = logging.getLogger(__name__)
+
+TAILLE_BLOC = 64 * 1024
+DOSSIERS = {"CONTRAT": "contrats", "QUITTANCE": "quittances", "EDL": "etats-des-lieux"}
+
+
+class _Sortie:
+    """Destination de ZipFile : garde ce qui a été écrit jusqu'au prochain vidage."""
+
+    def __init__(self):
+        self._blocs = []
+
+    def write(self, donnees):
+        self._blocs.append(bytes(donnees))
+        return len(donnees)
+
+    def flush(self):
+        pass
+
+    def vider(self):
+        donnees = b"".join(self._blocs)
+        self._blocs.clear()
+        return donnees
+
+
+def nom_dans_archive(document):
+    """2025/quittances/villa-cocody_2025-06_412.pdf (objet_id : noms uniques)."""
+    extension = PurePosixPath(document.fichier).suffix or ".pdf"
+    return (
+        f"{document.date_document.year}/{DOSSIERS[document.type_document]}/"
+        f"{slugify(document.bien.titre) or 'bien'}_{document.date_document:%Y-%m}_{document.objet_id}{extension}"
+    )
+
+
+def nom_archive(filtres):
+    """Nom du fichier ZIP proposé au téléchargement."""
+    parties = ["Documents"] + [filtres[cle] for cle in ("annee", "type") if cle in filtres]
+    return "_".join(parties) + ".zip"
+
+
+def flux_zip(documents):
+    """
+    Générateur des octets du ZIP de `documents` (queryset Document).
+    Les fichiers introuvables dans le storage sont listés dans MANQUANTS.txt.
+    """
+    sortie = _Sortie()
+    manquants = []
+    # Niveau 1 : les PDF sont déjà compressés, inutile de payer plus de CPU
+    with zipfile.ZipFile(sortie, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=1) as archive:
+        documents = documents.select_related("bien").order_by("date_document", "id")
+        for document in documents.iterator(chunk_size=200):
+            try:
+                source = default_storage.open(document.fichier, "rb")
+            except OSError:
+                logger.warning("Export GED : fichier introuvable %s.", document.fichier)
+                manquants.append(document.fichier)
+                continue
+            with source, archive.open(nom_dans_archive(document), "w", force_zip64=True) as destination:
+                for bloc in source.chunks(TAILLE_BLOC):
+                    destination.write(bloc)
+                    donnees = sortie.vider()
+                    if donnees:
+                        yield donnees
+        if manquants:
+            archive.writestr("MANQUANTS.txt", "\n".join(manquants) + "\n")
+    yield sortie.vider()
+
+
+class _LecteurFlux(io.RawIOBase):
+    """Lecture d'un itérable d'octets comme un fichier (pour storage.save)."""
+
+    def __init__(self, blocs):
+        self._blocs = iter(blocs)
+        self._reste = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, tampon):
+        while not self._reste:
+            self._reste = next(self._blocs, None)
+            if self._reste is None:
+                self._reste = b""
+                return 0
+        taille = min(len(tampon), len(self._reste))
+        tampon[:taille] = self._reste[:taille]
+        self._reste = self._reste[taille:]
+        return taille
+
+
+def selection(utilisateur, params):
+    """Documents visibles par `utilisateur` après filtres : (queryset, filtres)."""
+    return filtrer(documents_visibles(utilisateur), params)
+
+
+def executer(export):
+    """Construit l'archive de `export` dans le storage et prévient l'utilisateur."""
+    documents, _ = selection(export.utilisateur, export.filtres)
+    export.statut = "EN_COURS"
+    export.nb_documents = documents.count()
+    export.save(update_fields=["statut", "nb_documents", "updated_at"])
+
+    try:
+        chemin = f"exports/documents/{export.pk}.zip"
+        with _LecteurFlux(flux_zip(documents)) as flux:
+            export.fichier = default_storage.save(chemin, File(io.BufferedReader(flux, buffer_size=1024 * 1024)))
+    except Exception:
+        export.statut = "ECHEC"
+        export.save(update_fields=["statut", "updated_at"])
+        raise
+
+    export.statut = "TERMINE"
+    export.save(update_fields=["statut", "fichier", "updated_at"])
+
+    if export.utilisateur.email:
+        send_mail(
+            "Votre export de documents est prêt",
+            f"Bonjour,\n\nL'archive de vos {export.nb_documents} document(s) est disponible pendant "
+            f"{settings.EXPORT_DOCUMENTS_EXPIRATION_HEURES} heures :\n"
+            f"https://{settings.SITE_DOMAIN}{export.get_absolute_url()}\n\nMADA IMMO",
+            settings.DEFAULT_FROM_EMAIL,
+            [export.utilisateur.email],
+            fail_silently=True,
+        )
+    return export
+
+
+def purger():
+    """Supprime les archives expirées. Retourne le nombre d'exports supprimés."""
+    limite = timezone.now() - timedelta(hours=settings.EXPORT_DOCUMENTS_EXPIRATION_HEURES)
+    nb = 0
+    for export in ExportDocuments.objects.filter(updated_at__lt=limite).iterator():
+        if export.fichier and default_storage.exists(export.fichier):
+            default_storage.delete(export.fichier)
+        export.delete()
+        nb += 1
+    return nb
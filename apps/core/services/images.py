@@ -0,0 +1,197 @@
+"""
+Dérivés redimensionnés des photos (biens, interventions).
+
+Pour une photo "biens/salon.jpg", generer_derives() écrit dans le storage :
+
+    derives/biens/salon.jpg/320.webp, 320.jpg, 640.webp, ...
+    derives/biens/salon.jpg/manifeste.json
+
+Le manifeste contient l'empreinte (sha1) de la source : une photo déjà
+traitée n'est redécodée que si son contenu a changé. Les templates et l'API
+lisent le manifeste via le cache (manifeste()) ; tant qu'il n'existe pas,
+ils retombent sur la photo d'origine.
+"""
+import hashlib
+import io
+import json
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+# Marqueur "pas de manifeste" en cache (évite de relire le storage à chaque rendu)
+_ABSENT = {}
+
+
+def _dossier(nom):
+    return f"derives/{nom}"
+
+
+def _cle_cache(nom):
+    return "images:derives:" + hashlib.md5(nom.encode()).hexdigest()
+
+
+def _charger_manifeste(nom, storage):
+    chemin = f"{_dossier(nom)}/manifeste.json"
+    if not storage.exists(chemin):
+        return None
+    with storage.open(chemin) as f:
+        return json.load(f)
+
+
+def manifeste(nom, storage=None):
+    """Manifeste des dérivés de `nom` (None si pas encore générés)."""
+    if not nom:
+        return None
+    cle = _cle_cache(nom)
+    donnees = cache.get(cle)
+    if donnees is None:
+        donnees = _charger_manifeste(nom, storage or default_storage)
+        if donnees is None:
+            cache.set(cle, _ABSENT, settings.IMAGE_DERIVES_CACHE_ABSENT)
+        else:
+            cache.set(cle, donnees, None)
+    return donnees or None
+
+
+def manifestes(noms):
+    """Comme manifeste() pour plusieurs photos, en une lecture de cache (listes)."""
+    noms = {nom for nom in noms if nom}
+    trouves = cache.get_many([_cle_cache(nom) for nom in noms])
+    resultat = {}
+    for nom in noms:
+        donnees = trouves.get(_cle_cache(nom))
+        resultat[nom] = manifeste(nom) if donnees is None else (donnees or None)
+    return resultat
+
+
+def urls_derives(manifeste_photo, storage=None, request=None):
+    """
+    {"webp": {"320": url, ...}, "jpeg": {...}} à partir d'un manifeste,
+    ou None. URLs absolues si `request` est fourni (comme les FileField DRF).
+    """
+    if not manifeste_photo:
+        return None
+    storage = storage or default_storage
+    urls = {}
+    for format_image, fichiers in manifeste_photo["fichiers"].items():
+        urls[format_image] = {}
+        for largeur, chemin in sorted(fichiers.items(), key=lambda item: int(item[0])):
+            url = storage.url(chemin)
+            urls[format_image][largeur] = request.build_absolute_uri(url) if request is not None else url
+    return urls
+
+
+def srcset(urls, format_image):
+    """Valeur d'attribut srcset : "url 320w, url 640w, ..." ("" si absent)."""
+    if not urls or format_image not in urls:
+        return ""
+    return ", ".join(f"{url} {largeur}w" for largeur, url in urls[format_image].items())
+
+
+def derives(fieldfile, request=None):
+    """URLs des dérivés d'un ImageField (None si vide ou pas encore générés)."""
+    if not fieldfile:
+        return None
+    return urls_derives(manifeste(fieldfile.name, fieldfile.storage), fieldfile.storage, request)
+
+
+def supprimer_derives(nom, storage=None):
+    """Supprime les dérivés de `nom` (photo supprimée ou déplacée)."""
+    storage = storage or default_storage
+    existant = _charger_manifeste(nom, storage)
+    if existant:
+        for fichiers in existant["fichiers"].values():
+            for chemin in fichiers.values():
+                if storage.exists(chemin):
+                    storage.delete(chemin)
+        storage.delete(f"{_dossier(nom)}/manifeste.json")
+    cache.delete(_cle_cache(nom))
+
+
+def _encoder(image, format_image):
+    tampon = io.BytesIO()
+    if format_image == "webp":
+        image.save(tampon, "WEBP", quality=settings.IMAGE_DERIVES_QUALITE, method=4)
+    else:
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        image.save(tampon, "JPEG", quality=settings.IMAGE_DERIVES_QUALITE, optimize=True, progressive=True)
+    return tampon.getvalue()
+
+
+def generer_derives(nom, storage=None, forcer=False):
+    """
+    Génère les dérivés de la photo `nom` et son manifeste.
+    Retourne le manifeste, ou None si la source est absente ou illisible.
+    """
+    storage = storage or default_storage
+    if not storage.exists(nom):
+        logger.warning("Dérivés : source %s introuvable.", nom)
+        return None
+
+    with storage.open(nom) as f:
+        contenu = f.read()
+    empreinte = hashlib.sha1(contenu).hexdigest()
+    largeurs = sorted(settings.IMAGE_DERIVES_LARGEURS, reverse=True)
+
+    existant = _charger_manifeste(nom, storage)
+    if (
+        not forcer
+        and existant
+        and existant["empreinte"] == empreinte
+        and existant["largeurs"] == sorted(largeurs)
+    ):
+        cache.set(_cle_cache(nom), existant, None)
+        return existant
+
+    try:
+        image = Image.open(io.BytesIO(contenu))
+        # JPEG : décodage directement à une échelle réduite (1/2, 1/4, 1/8)
+        image.draft("RGB", (largeurs[0], largeurs[0]))
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except (OSError, Image.DecompressionBombError):
+        logger.exception("Dérivés : image illisible %s.", nom)
+        return None
+
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+
+    # Pas d'agrandissement : les largeurs supérieures à l'original sont
+    # ramenées à la largeur de l'original (une seule fois)
+    largeurs_utiles = sorted({min(largeur, image.width) for largeur in largeurs}, reverse=True)
+
+    dossier = _dossier(nom)
+    fichiers = {format_image: {} for format_image in settings.IMAGE_DERIVES_FORMATS}
+    courante = image
+    for largeur in largeurs_utiles:
+        # Du plus grand au plus petit : chaque réduction part de la précédente
+        if courante.width != largeur:
+            hauteur = max(1, round(courante.height * largeur / courante.width))
+            courante = courante.resize((largeur, hauteur), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for format_image in fichiers:
+            chemin = f"{dossier}/{largeur}.{EXTENSIONS[format_image]}"
+            if storage.exists(chemin):
+                storage.delete(chemin)
+            storage.save(chemin, ContentFile(_encoder(courante, format_image)))
+            fichiers[format_image][str(largeur)] = chemin
+
+    donnees = {
+        "source": nom,
+        "empreinte": empreinte,
+        "largeurs": sorted(largeurs),
+        "fichiers": fichiers,
+    }
+    chemin_manifeste = f"{dossier}/manifeste.json"
+    if storage.exists(chemin_manifeste):
+        storage.delete(chemin_manifeste)
+    storage.save(chemin_manifeste, ContentFile(json.dumps(donnees).encode()))
+    cache.set(_cle_cache(nom), donnees, None)
+    return donnees
@@ -0,0 +1,383 @@
+"""
+Import en masse d'un portefeuille (locataires, biens, baux) depuis un
+classeur .xlsx ou un fichier .csv : une ligne par bail, mêmes colonnes que
+le formulaire de création unifiée (voir docs/import_portefeuille.md).
+
+Tout le fichier est validé avant la moindre écriture, par ensembles : une
+requête pour les propriétaires, une pour les locataires déjà inscrits, une
+pour les biens existants et une pour leurs baux signés (chevauchements).
+S'il reste une erreur, rien n'est créé et le rapport liste les lignes à
+corriger. Sinon, tout est créé par bulk_create dans une seule transaction,
+sans hachage de mot de passe ni full_clean() ligne à ligne ; les contrats
+PDF et les e-mails d'activation des comptes partent en tâches Celery.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from apps.core import cache as cache_public
+from apps.core.forms import LigneImportForm
+from apps.core.models import CONTRAINTE_CHEVAUCHEMENT, Annonce, Bail, Bien
+from apps.core.permissions import is_admin
+from apps.core.services.tableur import lire_lignes
+from apps.core.tasks import generer_contrat_bail, inviter_locataires
+
+logger = logging.getLogger(__name__)
+User = get_user_model()
+
+# En-têtes acceptés en plus des noms de champs (sans accents, en minuscules)
+ALIAS = {
+    "prenom": "first_name",
+    "nom": "last_name",
+    "cni": "cni_numero",
+    "titre": "titre_bien",
+    "bien": "titre_bien",
+    "type": "type_bien",
+    "pieces": "nb_pieces",
+    "debut": "date_debut",
+    "fin": "date_fin",
+    "loyer": "montant_loyer",
+    "charges": "montant_charges",
+    "depot": "depot_garantie",
+    "caution": "depot_garantie",
+    "jour": "jour_paiement",
+}
+# Une même description de bien sur plusieurs lignes doit rester cohérente
+CARACTERISTIQUES_BIEN = ("type_bien", "ville", "surface", "nb_pieces")
+
+
+class RapportImport:
+    """Résultat d'un import : erreurs par ligne (numéros du tableur) et compteurs."""
+
+    def __init__(self):
+        self.lignes = 0
+        self.erreurs = []  # (numéro de ligne ou None, message)
+        self.locataires_crees = 0
+        self.locataires_existants = 0
+        self.biens_crees = 0
+        self.biens_existants = 0
+        self.baux_crees = 0
+        self.simulation = False
+
+    @property
+    def valide(self):
+        return not self.erreurs
+
+    def erreur(self, ligne, message):
+        self.erreurs.append((ligne, message))
+
+    def erreurs_par_ligne(self):
+        par_ligne = defaultdict(list)
+        for ligne, message in self.erreurs:
+            par_ligne[ligne].append(message)
+        return sorted(par_ligne.items(), key=lambda item: (item[0] is not None, item[0] or 0))
+
+
+# ===================== VALIDATION =====================
+
+def _cle_bien(proprietaire_id, titre, adresse):
+    return proprietaire_id, titre.strip().lower(), " ".join(adresse.lower().split())
+
+
+def _proprietaires(lignes, auteur, rapport):
+    """Numéro de ligne -> id du propriétaire (1 requête pour tout le fichier)."""
+    if not is_admin(auteur):
+        identifiants = {auteur.username.lower(), (auteur.email or "").lower()}
+        resultat = {}
+        for numero, cd in lignes.items():
+            if cd["proprietaire"] and cd["proprietaire"] not in identifiants:
+                rapport.erreur(numero, "Vous ne pouvez importer que vos propres biens (colonne proprietaire).")
+            resultat[numero] = auteur.pk
+        return resultat
+
+    # Administrateur : colonne proprietaire = e-mail ou identifiant d'un bailleur
+    demandes = {cd["proprietaire"] for cd in lignes.values() if cd["proprietaire"]}
+    trouves = {}
+    candidats = (
+        User.objects.alias(email_min=Lower("email"), username_min=Lower("username"))
+        .filter(Q(email_min__in=demandes) | Q(username_min__in=demandes))
+        .annotate(est_bailleur=Exists(Group.objects.filter(user=OuterRef("pk"), name__in=("BAILLEUR", "ADMIN"))))
+        .values("pk", "email", "username", "est_bailleur")
+    )
+    for utilisateur in candidats:
+        for identifiant in (utilisateur["username"].lower(), (utilisateur["email"] or "").lower()):
+            if identifiant in demandes:
+                trouves[identifiant] = utilisateur
+
+    resultat = {}
+    for numero, cd in lignes.items():
+        if not cd["proprietaire"]:
+            resultat[numero] = auteur.pk
+            continue
+        utilisateur = trouves.get(cd["proprietaire"])
+        if utilisateur is None:
+            rapport.erreur(numero, f"Propriétaire « {cd['proprietaire']} » introuvable.")
+        elif not utilisateur["est_bailleur"]:
+            rapport.erreur(numero, f"« {cd['proprietaire']} » n'est pas un bailleur.")
+        else:
+            resultat[numero] = utilisateur["pk"]
+    return resultat
+
+
+def _locataires(lignes, proprietaires, rapport):
+    """
+    (locataires existants {email: id}, nouveaux {email: numéro de la ligne
+    qui les décrit}). Un même locataire peut figurer sur plusieurs lignes.
+    """
+    emails = {cd["email"] for cd in lignes.values()}
+    existants = {}
+    for utilisateur in (
+        User.objects.alias(email_min=Lower("email"), username_min=Lower("username"))
+        .filter(Q(email_min__in=emails) | Q(username_min__in=emails))
+        .values("pk", "email", "username")
+    ):
+        for identifiant in (utilisateur["username"].lower(), (utilisateur["email"] or "").lower()):
+            if identifiant in emails:
+                existants[identifiant] = utilisateur["pk"]
+
+    nouveaux = {}
+    for numero, cd in lignes.items():
+        email = cd["email"]
+        if email in existants:
+            if existants[email] == proprietaires.get(numero):
+                rapport.erreur(numero, "Le locataire ne peut pas être le propriétaire du bien.")
+            continue
+        premiere = nouveaux.setdefault(email, numero)
+        autre = lignes[premiere]
+        if (cd["first_name"], cd["last_name"]) != (autre["first_name"], autre["last_name"]):
+            rapport.erreur(numero, f"{email} est déjà décrit ligne {premiere} avec un autre nom.")
+    return existants, nouveaux
+
+
+def _caracteristiques(cd):
+    return (cd["type_bien"], cd["ville"] or "Dakar", cd["surface"], cd["nb_pieces"] or 1)
+
+
+def _biens(lignes, proprietaires, rapport):
+    """
+    (clé du bien par ligne, biens existants {clé: id}, nouveaux {clé: numéro}).
+    Un bien (propriétaire, titre, adresse) déjà en base est réutilisé ; décrit
+    sur plusieurs lignes, il n'est créé qu'une fois.
+    """
+    cles = {
+        numero: _cle_bien(proprietaires[numero], cd["titre_bien"], cd["adresse"])
+        for numero, cd in lignes.items()
+        if numero in proprietaires
+    }
+    existants = {
+        _cle_bien(bien["proprietaire_id"], bien["titre"], bien["adresse"]): bien["pk"]
+        for bien in Bien.objects.filter(proprietaire_id__in=set(proprietaires.values())).values(
+            "pk", "proprietaire_id", "titre", "adresse"
+        )
+    }
+    nouveaux = {}
+    for numero, cle in cles.items():
+        if cle in existants:
+            continue
+        premiere = nouveaux.setdefault(cle, numero)
+        if _caracteristiques(lignes[numero]) != _caracteristiques(lignes[premiere]):
+            rapport.erreur(numero, f"Bien « {lignes[numero]['titre_bien']} » décrit différemment ligne {premiere}.")
+    return cles, existants, nouveaux
+
+
+def _chevauchements(lignes, cles, biens_existants, rapport):
+    """
+    Baux signés qui se chevauchent (bornes incluses, comme Bail.clean()) :
+    entre lignes du fichier et avec les baux en base, en un tri par bien.
+    """
+    periodes = defaultdict(list)
+    for numero, cle in cles.items():
+        periodes[cle].append((lignes[numero]["date_debut"], lignes[numero]["date_fin"], numero))
+
+    cle_par_bien = {pk: cle for cle, pk in biens_existants.items() if cle in periodes}
+    for bail in Bail.objects.filter(bien_id__in=cle_par_bien, est_signe=True).values("bien_id", "date_debut", "date_fin"):
+        periodes[cle_par_bien[bail["bien_id"]]].append((bail["date_debut"], bail["date_fin"], None))
+
+    for liste in periodes.values():
+        liste.sort(key=lambda periode: (periode[0], periode[1]))
+        courante = liste[0]
+        for periode in liste[1:]:
+            if periode[0] <= courante[1]:
+                # L'erreur va à la ligne du fichier (un bail en base ne se corrige pas ici)
+                numero, autre = (periode[2], courante) if periode[2] is not None else (courante[2], periode)
+                if numero is not None:
+                    origine = f"la ligne {autre[2]}" if autre[2] is not None else "un bail existant"
+                    rapport.erreur(
+                        numero,
+                        f"Chevauche {origine} (du {autre[0]:%d/%m/%Y} au {autre[1]:%d/%m/%Y}).",
+                    )
+            if periode[1] > courante[1]:
+                courante = periode
+
+
+def _valider(brutes, auteur, rapport):
+    lignes = {}
+    for numero, donnees in brutes:
+        form = LigneImportForm(donnees)
+        if form.is_valid():
+            lignes[numero] = form.cleaned_data
+        else:
+            for champ, messages in form.errors.items():
+                for message in messages:
+                    rapport.erreur(numero, message if champ == "__all__" else f"{champ} : {message}")
+
+    proprietaires = _proprietaires(lignes, auteur, rapport)
+    locataires_existants, locataires_nouveaux = _locataires(lignes, proprietaires, rapport)
+    cles, biens_existants, biens_nouveaux = _biens(lignes, proprietaires, rapport)
+    _chevauchements(lignes, cles, biens_existants, rapport)
+
+    rapport.locataires_existants = len(set(locataires_existants.values()))
+    rapport.locataires_crees = len(locataires_nouveaux)
+    rapport.biens_existants = len({cle for cle in cles.values() if cle in biens_existants})
+    rapport.biens_crees = len(biens_nouveaux)
+    rapport.baux_crees = len(lignes)
+    return {
+        "lignes": lignes,
+        "proprietaires": proprietaires,
+        "cles": cles,
+        "locataires_existants": locataires_existants,
+        "locataires_nouveaux": locataires_nouveaux,
+        "biens_existants": biens_existants,
+        "biens_nouveaux": biens_nouveaux,
+    }
+
+
+# ===================== CRÉATION =====================
+
+def _creer(plan):
+    lignes = plan["lignes"]
+
+    # 1) Locataires : mot de passe inutilisable (pas de hachage), défini
+    # par le locataire via le lien d'activation envoyé par inviter_locataires
+    comptes = []
+    for email, numero in plan["locataires_nouveaux"].items():
+        compte = User(
+            username=email, email=email, first_name=lignes[numero]["first_name"], last_name=lignes[numero]["last_name"]
+        )
+        compte.set_unusable_password()
+        comptes.append(compte)
+    comptes = User.objects.bulk_create(comptes)
+    # Remplace le signal de création du profil (bulk_create n'en émet pas)
+    UserProfile.objects.bulk_create([
+        UserProfile(
+            user_id=compte.pk,
+            telephone=lignes[plan["locataires_nouveaux"][compte.email]]["telephone"] or None,
+            cni_numero=lignes[plan["locataires_nouveaux"][compte.email]]["cni_numero"],
+        )
+        for compte in comptes
+    ])
+    locataires = {**plan["locataires_existants"], **{compte.email: compte.pk for compte in comptes}}
+    groupe, _ = Group.objects.get_or_create(name="LOCATAIRE")
+    groupe.user_set.add(*set(locataires.values()))
+
+    # 2) Biens
+    nouveaux = []
+    for cle, numero in plan["biens_nouveaux"].items():
+        cd = lignes[numero]
+        nouveaux.append(Bien(
+            proprietaire_id=plan["proprietaires"][numero],
+            titre=cd["titre_bien"],
+            type_bien=cd["type_bien"],
+            adresse=cd["adresse"],
+            ville=cd["ville"] or "Dakar",
+            surface=cd["surface"],
+            nb_pieces=cd["nb_pieces"] or 1,
+            loyer_ref=cd["montant_loyer"],
+            charges_ref=cd["montant_charges"] or 0,
+            description=cd["description"],
+            est_actif=True,
+        ))
+    nouveaux = Bien.objects.bulk_create(nouveaux)
+    biens = {**plan["biens_existants"], **dict(zip(plan["biens_nouveaux"], (bien.pk for bien in nouveaux)))}
+
+    # 3) Baux signés (déjà validés : pas de full_clean() ligne à ligne ; sous
+    # PostgreSQL la contrainte d'exclusion couvre les signatures concurrentes)
+    baux = Bail.objects.bulk_create([
+        Bail(
+            bien_id=biens[plan["cles"][numero]],
+            locataire_id=locataires[cd["email"]],
+            date_debut=cd["date_debut"],
+            date_fin=cd["date_fin"],
+            montant_loyer=cd["montant_loyer"],
+            montant_charges=cd["montant_charges"] or 0,
+            depot_garantie=cd["depot_garantie"],
+            jour_paiement=cd["jour_paiement"] or 5,
+            est_signe=True,
+        )
+        for numero, cd in lignes.items()
+    ])
+
+    # Effets des signaux post_save de Bail, en une requête chacun
+    biens_reutilises = {biens[cle] for cle in plan["cles"].values() if cle in plan["biens_existants"]}
+    Annonce.objects.filter(bien_id__in=biens_reutilises, statut="PUBLIE").update(
+        statut="ARCHIVE", updated_at=timezone.now()
+    )
+    groupes = [cache_public.CATALOGUE] + [cache_public.groupe_locataire(pk) for pk in set(locataires.values())]
+    baux_ids = [bail.pk for bail in baux]
+    comptes_ids = [compte.pk for compte in comptes]
+
+    def apres_commit():
+        cache_public.invalider(*groupes)
+        for bail_id in baux_ids:
+            generer_contrat_bail.delay(bail_id)
+        if comptes_ids:
+            inviter_locataires.delay(comptes_ids)
+
+    transaction.on_commit(apres_commit)
+
+
+def importer(fichier, nom, auteur, simulation=False):
+    """
+    Importe le portefeuille décrit par `fichier` (.xlsx ou .csv, binaire)
+    pour `auteur` (bailleur : ses propres biens ; admin : colonne proprietaire).
+    Tout ou rien : le moindre problème laisse la base intacte.
+    """
+    rapport = RapportImport()
+    rapport.simulation = simulation
+    try:
+        brutes = list(lire_lignes(fichier, nom, ALIAS))
+    except ValidationError as exc:
+        rapport.erreur(None, exc.messages[0])
+        return rapport
+    except Exception:
+        logger.exception("Import portefeuille : fichier %s illisible.", nom)
+        rapport.erreur(None, "Fichier illisible : enregistrez-le au format .xlsx ou .csv (UTF-8).")
+        return rapport
+
+    rapport.lignes = len(brutes)
+    if not brutes:
+        rapport.erreur(None, "Aucune ligne à importer.")
+        return rapport
+    if len(brutes) > settings.IMPORT_PORTEFEUILLE_MAX_LIGNES:
+        rapport.erreur(None, f"Fichier limité à {settings.IMPORT_PORTEFEUILLE_MAX_LIGNES} lignes : découpez-le.")
+        return rapport
+
+    plan = _valider(brutes, auteur, rapport)
+    if not rapport.valide or simulation:
+        return rapport
+
+    try:
+        with transaction.atomic():
+            _creer(plan)
+    except IntegrityError as exc:
+        # Modification concurrente entre la validation et l'écriture
+        logger.warning("Import portefeuille annulé : %s", exc)
+        if CONTRAINTE_CHEVAUCHEMENT in str(exc):
+            rapport.erreur(None, "Un bail signé entre-temps chevauche une ligne du fichier. Rien n'a été créé.")
+        else:
+            rapport.erreur(None, "Des données ont changé pendant l'import. Rien n'a été créé : relancez-le.")
+    else:
+        logger.info(
+            "Import portefeuille par %s : %s bail(s), %s bien(s) et %s locataire(s) créés.",
+            auteur.pk, rapport.baux_crees, rapport.biens_crees, rapport.locataires_crees,
+        )
+    return rapport
@@ -0,0 +1,12 @@
+from django.conf import settings
+from weasyprint import HTML
+
+from apps.core.metrics import PDF_DUREE
+from apps.core.profiling import chronometre
+
+
+def html_vers_pdf(html_string, document="autre"):
+    """Convertit un document HTML en PDF (WeasyPrint), chronométré dans la section 'pdf'."""
+    with chronometre("pdf"), PDF_DUREE.time(document=document):
+        # base_url aide à résoudre les liens relatifs (logo, images statiques)
+        return HTML(string=html_string, base_url=str(settings.BASE_DIR)).write_pdf()
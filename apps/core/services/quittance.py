@@ -1,8 +1,8 @@
-from django.conf import settings
 from django.core.files.base import ContentFile
 from django.template.loader import render_to_string
 from django.utils import timezone
-from weasyprint import HTML
+
+from .pdf import html_vers_pdf
 
 
 def generer_quittance_pdf(loyer):
@@ -16,8 +16,7 @@ def generer_quittance_pdf(loyer):
         },
     )
 
-    # Base URL est important pour charger les images statiques (logo)
-    pdf_bytes = HTML(string=html_string, base_url=str(settings.BASE_DIR)).write_pdf()
+    pdf_bytes = html_vers_pdf(html_string, document="quittance")
 
     filename = (
         f"Quittance_{loyer.periode_debut.strftime('%Y-%m')}"
@@ -31,5 +30,5 @@ def attacher_quittance(loyer):
     pdf_content, filename = generer_quittance_pdf(loyer)
     # save=False évite une double sauvegarde inutile
     loyer.quittance.save(filename, ContentFile(pdf_content), save=False)
-    loyer.save(update_fields=["quittance"])
+    loyer.save(update_fields=["quittance", "updated_at"])
     return filename
\ No newline at end of file
@@ -0,0 +1,409 @@
+"""
+Rapprochement en masse des relevés Wave / Orange Money avec les loyers.
+
+Un relevé exporté par l'opérateur (.csv ou .xlsx) compte des milliers de
+lignes : aucune requête par ligne. Les loyers ouverts sont chargés une fois
+et indexés en mémoire par identifiant et par téléphone du locataire, puis
+chaque ligne (de la plus ancienne à la plus récente) est attribuée :
+
+1. par la référence LOY<id> (Loyer.reference_paiement) lue dans le motif ;
+2. par téléphone + montant égal au reste à payer : un seul loyer, ou un
+   seul loyer dont la période contient la date de l'opération ;
+3. par téléphone seul : un seul loyer ouvert pour ce numéro et un montant
+   inférieur au reste (paiement partiel).
+
+Les lignes attribuées deviennent des Transaction validées et les loyers
+sont mis à jour en deux requêtes (bulk_create, bulk_update). Les autres
+vont dans la file LigneReleve, vérifiée dans l'admin. Un relevé réimporté
+ne crée rien en double : la référence opérateur est déjà connue.
+"""
+import logging
+import re
+from collections import defaultdict
+from datetime import date, datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.core import cache as cache_public
+from apps.core.models import LigneReleve, Loyer, Transaction
+from apps.core.services.tableur import lire_lignes
+from apps.core.tasks import attacher_quittances
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ("WAVE", "OM")
+# En-têtes des exports Wave et Orange Money (normalisés, voir tableur.py)
+ALIAS = {
+    "transaction_id": "reference",
+    "id_transaction": "reference",
+    "id": "reference",
+    "ref": "reference",
+    "reference_transaction": "reference",
+    "date_operation": "date",
+    "date_heure": "date",
+    "timestamp": "date",
+    "date_de_la_transaction": "date",
+    "amount": "montant",
+    "montant_fcfa": "montant",
+    "montant_xof": "montant",
+    "counterparty_phone": "telephone",
+    "counterparty_mobile": "telephone",
+    "numero": "telephone",
+    "numero_expediteur": "telephone",
+    "expediteur": "telephone",
+    "msisdn": "telephone",
+    "phone": "telephone",
+    "note": "libelle",
+    "motif": "libelle",
+    "description": "libelle",
+    "message": "libelle",
+}
+FORMATS_DATE = (
+    "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d",
+    "%d/%m/%Y %H:%M:%S", "%d/%m/%Y %H:%M", "%d/%m/%Y",
+)
+# Numéros comparés sur leurs 9 derniers chiffres (sans indicatif 221)
+CHIFFRES_TELEPHONE = 9
+REFERENCE = re.compile(r"\bLOY\s*-?\s*(\d+)\b", re.IGNORECASE)
+OUVERTS = ("A_PAYER", "PARTIEL", "RETARD")
+
+
+class RapportRapprochement:
+    def __init__(self):
+        self.lignes = 0
+        self.rapprochees = 0
+        self.montant_rapproche = Decimal(0)
+        self.a_revoir = 0
+        self.deja_importees = 0
+        self.ignorees = 0  # débits, montants nuls
+        self.erreurs = []  # (numéro de ligne ou None, message)
+        self.simulation = False
+
+    def erreur(self, ligne, message):
+        self.erreurs.append((ligne, message))
+
+
+class _LoyerOuvert:
+    """Loyer ouvert en mémoire ; montant_verse suit les lignes déjà attribuées."""
+
+    __slots__ = ("pk", "locataire_id", "montant_du", "montant_verse", "periode_debut", "periode_fin")
+
+    def __init__(self, ligne):
+        self.pk = ligne["pk"]
+        self.locataire_id = ligne["bail__locataire_id"]
+        self.montant_du = ligne["montant_du"]
+        self.montant_verse = ligne["montant_verse"]
+        self.periode_debut = ligne["periode_debut"]
+        self.periode_fin = ligne["periode_fin"]
+
+    @property
+    def reste(self):
+        return self.montant_du - self.montant_verse
+
+
+# ===================== LECTURE DU RELEVÉ =====================
+
+def normaliser_telephone(valeur):
+    chiffres = re.sub(r"\D", "", str(valeur or ""))
+    return chiffres[-CHIFFRES_TELEPHONE:] if len(chiffres) >= CHIFFRES_TELEPHONE else ""
+
+
+def montant_fcfa(valeur):
+    if isinstance(valeur, (int, Decimal)):
+        return Decimal(valeur)
+    if isinstance(valeur, float):
+        return Decimal(round(valeur))
+    texte = re.sub(r"[^\d,.\-]", "", str(valeur or ""))
+    # FCFA sans centimes : "90 000", "90.000" ou "90,000" valent 90000
+    texte = re.sub(r"[.,](?=\d{3}(?!\d))", "", texte).replace(",", ".")
+    try:
+        return Decimal(texte).quantize(Decimal(1))
+    except InvalidOperation:
+        raise ValueError(f"Montant illisible : {valeur}")
+
+
+def date_operation(valeur):
+    if isinstance(valeur, datetime):
+        moment = valeur
+    elif isinstance(valeur, date):
+        moment = datetime.combine(valeur, time())
+    elif valeur and parse_datetime(str(valeur)):
+        # ISO 8601 des API opérateurs (2025-06-03T10:00:00Z)
+        moment = parse_datetime(str(valeur))
+    else:
+        for format_date in FORMATS_DATE:
+            try:
+                moment = datetime.strptime(str(valeur), format_date)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ValueError(f"Date illisible : {valeur}")
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def _lire(fichier, nom, rapport):
+    """Lignes de crédit du relevé : dicts reference, date, montant, telephone, libelle."""
+    lignes = []
+    for numero, donnees in lire_lignes(fichier, nom, ALIAS):
+        rapport.lignes += 1
+        reference = str(donnees.get("reference") or "").strip()
+        try:
+            montant = montant_fcfa(donnees.get("montant"))
+            moment = date_operation(donnees.get("date"))
+        except ValueError as exc:
+            rapport.erreur(numero, str(exc))
+            continue
+        if not reference:
+            rapport.erreur(numero, "Référence de l'opération manquante.")
+            continue
+        if montant <= 0:
+            rapport.ignorees += 1
+            continue
+        lignes.append({
+            "numero": numero,
+            "reference": reference[:100],
+            "date": moment,
+            "montant": montant,
+            "telephone": str(donnees.get("telephone") or "")[:30],
+            "libelle": str(donnees.get("libelle") or "")[:255],
+        })
+    return sorted(lignes, key=lambda ligne: ligne["date"])
+
+
+# ===================== ATTRIBUTION EN MÉMOIRE =====================
+
+def _index():
+    """Loyers ouverts : {id: loyer} et {téléphone: [loyers]} en une requête."""
+    par_id = {}
+    par_telephone = defaultdict(list)
+    for ligne in Loyer.objects.filter(statut__in=OUVERTS, bail__deleted_at__isnull=True).values(
+        "pk", "montant_du", "montant_verse", "periode_debut", "periode_fin", "bail__locataire_id",
+        "bail__locataire__phone_number", "bail__locataire__profile__telephone",
+    ):
+        loyer = _LoyerOuvert(ligne)
+        par_id[loyer.pk] = loyer
+        telephones = {
+            normaliser_telephone(ligne["bail__locataire__phone_number"]),
+            normaliser_telephone(ligne["bail__locataire__profile__telephone"]),
+        }
+        for telephone in telephones - {""}:
+            par_telephone[telephone].append(loyer)
+    return par_id, par_telephone
+
+
+def _attribuer(ligne, par_id, par_telephone, references_payees):
+    """(loyer, None, None) si la ligne est attribuée, sinon (None, motif, candidats)."""
+    montant = ligne["montant"]
+    trouvee = REFERENCE.search(f"{ligne['libelle']} {ligne['reference']}")
+    if trouvee:
+        pk = int(trouvee.group(1))
+        if pk in par_id:
+            loyer = par_id[pk]
+            return (loyer, None, None) if montant <= loyer.reste else (None, "MONTANT", [pk])
+        if pk in references_payees:
+            return None, "DEJA_PAYE", [pk]
+
+    candidats = [loyer for loyer in par_telephone.get(normaliser_telephone(ligne["telephone"]), ()) if loyer.reste > 0]
+    if not candidats:
+        return None, "AUCUN", []
+
+    exacts = [loyer for loyer in candidats if loyer.reste == montant]
+    if len(exacts) > 1:
+        jour = timezone.localtime(ligne["date"]).date()
+        exacts = [loyer for loyer in exacts if loyer.periode_debut <= jour <= loyer.periode_fin] or exacts
+    if len(exacts) == 1:
+        return exacts[0], None, None
+    if not exacts and len(candidats) == 1:
+        loyer = candidats[0]
+        return (loyer, None, None) if montant < loyer.reste else (None, "MONTANT", [loyer.pk])
+    return None, "AMBIGU", sorted(loyer.pk for loyer in (exacts or candidats))
+
+
+# ===================== ÉCRITURE EN MASSE =====================
+
+def _ligne_a_revoir(ligne, provider, nom, motif, candidats):
+    return LigneReleve(
+        provider=provider,
+        reference_externe=ligne["reference"],
+        date_operation=ligne["date"],
+        montant=ligne["montant"],
+        telephone=ligne["telephone"],
+        libelle=ligne["libelle"],
+        fichier=nom[:255],
+        motif=motif,
+        candidats=candidats,
+    )
+
+
+def _enregistrer(attribuees, a_revoir, provider, nom, auteur, rapport):
+    with transaction.atomic():
+        # Verrou puis relecture : un paiement enregistré depuis le chargement
+        # (espèces, autre import) est pris en compte, et deux imports du même
+        # relevé ne créditent pas deux fois les mêmes lignes
+        actuels = {
+            loyer.pk: loyer
+            for loyer in Loyer.objects.select_for_update().filter(pk__in={loyer.pk for _, loyer in attribuees})
+        }
+        deja = set(
+            Transaction.objects.filter(
+                provider=provider, reference_externe__in=[ligne["reference"] for ligne, _ in attribuees]
+            ).values_list("reference_externe", flat=True)
+        )
+
+        maintenant = timezone.now()
+        transactions = []
+        modifies = {}
+        locataires = set()
+        for ligne, ouvert in attribuees:
+            if ligne["reference"] in deja:
+                rapport.deja_importees += 1
+                continue
+            loyer = actuels[ouvert.pk]
+            if loyer.statut == "PAYE" or ligne["montant"] > loyer.reste_a_payer:
+                motif = "DEJA_PAYE" if loyer.statut == "PAYE" else "MONTANT"
+                a_revoir.append(_ligne_a_revoir(ligne, provider, nom, motif, [loyer.pk]))
+                continue
+            # Même calcul que Loyer.enregistrer_paiement, daté de l'opération
+            loyer.montant_verse += ligne["montant"]
+            if loyer.montant_verse >= loyer.montant_du:
+                loyer.montant_verse = loyer.montant_du
+                loyer.statut = "PAYE"
+                loyer.date_paiement = ligne["date"]
+            else:
+                loyer.statut = "PARTIEL"
+                loyer.date_paiement = None
+            loyer.updated_at = maintenant
+            modifies[loyer.pk] = loyer
+            locataires.add(ouvert.locataire_id)
+            transactions.append(Transaction(
+                loyer_id=loyer.pk,
+                montant=ligne["montant"],
+                provider=provider,
+                reference_externe=ligne["reference"],
+                type_flux="LOYER",
+                est_validee=True,
+                auteur=auteur,
+            ))
+            rapport.rapprochees += 1
+            rapport.montant_rapproche += ligne["montant"]
+
+        Transaction.objects.bulk_create(transactions, batch_size=1000)
+        Loyer.objects.bulk_update(
+            modifies.values(), ["montant_verse", "statut", "date_paiement", "updated_at"], batch_size=1000
+        )
+        # ignore_conflicts : ligne déjà en file (import concurrent du même relevé)
+        LigneReleve.objects.bulk_create(a_revoir, batch_size=1000, ignore_conflicts=True)
+        rapport.a_revoir = len(a_revoir)
+
+        # bulk_update n'émet pas post_save : cache et quittances ici
+        payes = [pk for pk, loyer in modifies.items() if loyer.statut == "PAYE"]
+        groupes = [cache_public.groupe_locataire(pk) for pk in locataires]
+
+        def apres_commit():
+            if groupes:
+                cache_public.invalider(*groupes)
+            if payes:
+                attacher_quittances.delay(payes)
+
+        transaction.on_commit(apres_commit)
+
+
+def rapprocher(fichier, nom, provider, auteur=None, simulation=False):
+    """
+    Rapproche le relevé `fichier` (.csv ou .xlsx, binaire) de l'opérateur
+    `provider` (WAVE ou OM) et retourne le rapport. En simulation, rien
+    n'est écrit : le rapport donne ce qui serait rapproché ou mis en file.
+    """
+    if provider not in PROVIDERS:
+        raise ValueError(f"Opérateur inconnu : {provider}")
+    rapport = RapportRapprochement()
+    rapport.simulation = simulation
+    try:
+        lignes = _lire(fichier, nom, rapport)
+    except ValidationError as exc:
+        rapport.erreur(None, exc.messages[0])
+        return rapport
+    except Exception:
+        logger.exception("Rapprochement : relevé %s illisible.", nom)
+        rapport.erreur(None, "Relevé illisible : exportez-le au format .csv ou .xlsx.")
+        return rapport
+
+    # Lignes déjà importées (transaction ou file de vérification) : ignorées
+    references = [ligne["reference"] for ligne in lignes]
+    connues = set(
+        Transaction.objects.filter(provider=provider, reference_externe__in=references)
+        .values_list("reference_externe", flat=True)
+    ) | set(
+        LigneReleve.objects.filter(provider=provider, reference_externe__in=references)
+        .values_list("reference_externe", flat=True)
+    )
+    nouvelles = []
+    vues = set()
+    for ligne in lignes:
+        if ligne["reference"] in connues or ligne["reference"] in vues:
+            rapport.deja_importees += 1
+        else:
+            vues.add(ligne["reference"])
+            nouvelles.append(ligne)
+
+    par_id, par_telephone = _index()
+    cites = {int(m.group(1)) for ligne in nouvelles if (m := REFERENCE.search(f"{ligne['libelle']} {ligne['reference']}"))}
+    references_payees = set(Loyer.objects.filter(pk__in=cites - par_id.keys()).values_list("pk", flat=True))
+
+    attribuees = []
+    a_revoir = []
+    for ligne in nouvelles:
+        loyer, motif, candidats = _attribuer(ligne, par_id, par_telephone, references_payees)
+        if loyer is None:
+            a_revoir.append(_ligne_a_revoir(ligne, provider, nom, motif, candidats))
+        else:
+            loyer.montant_verse += ligne["montant"]
+            attribuees.append((ligne, loyer))
+
+    if simulation:
+        rapport.rapprochees = len(attribuees)
+        rapport.montant_rapproche = sum((ligne["montant"] for ligne, _ in attribuees), Decimal(0))
+        rapport.a_revoir = len(a_revoir)
+        return rapport
+
+    _enregistrer(attribuees, a_revoir, provider, nom, auteur, rapport)
+    logger.info(
+        "Relevé %s (%s) : %s ligne(s) rapprochée(s), %s à vérifier, %s déjà importée(s).",
+        nom, provider, rapport.rapprochees, rapport.a_revoir, rapport.deja_importees,
+    )
+    return rapport
+
+
+def rapprocher_ligne(ligne, auteur):
+    """
+    Vérification manuelle : crédite le loyer choisi pour une ligne de la
+    file (même chemin qu'un paiement unitaire, quittance comprise).
+    """
+    if ligne.statut != "A_REVOIR":
+        raise ValueError("Ligne déjà traitée.")
+    if ligne.loyer_id is None:
+        raise ValueError("Choisissez d'abord le loyer à créditer.")
+    with transaction.atomic():
+        loyer = Loyer.objects.select_for_update().get(pk=ligne.loyer_id)
+        if ligne.montant > loyer.reste_a_payer:
+            raise ValueError(f"Le montant ({ligne.montant}) dépasse le reste à payer ({loyer.reste_a_payer}).")
+        ligne.transaction = Transaction.objects.create(
+            loyer=loyer,
+            montant=ligne.montant,
+            provider=ligne.provider,
+            reference_externe=ligne.reference_externe,
+            type_flux="LOYER",
+            est_validee=True,
+            auteur=auteur,
+        )
+        loyer.enregistrer_paiement(ligne.montant)
+        ligne.statut = "RAPPROCHEE"
+        ligne.traite_par = auteur
+        ligne.traite_le = timezone.now()
+        ligne.save(update_fields=["transaction", "statut", "traite_par", "traite_le"])
+    return ligne
@@ -3,9 +3,11 @@ from datetime import date
 from django.db.models import Sum
 
 from apps.core.models import Bien, Loyer
+from apps.core.routers import utiliser_replica
 
 
 class DashboardService:
+    @utiliser_replica()
     def get_admin_stats(self):
         total_biens = Bien.objects.count()
         biens_occupes = Bien.objects.filter(
@@ -24,6 +26,7 @@ class DashboardService:
             'montant_impayes': impayes
         }
 
+    @utiliser_replica()
     def get_bailleur_stats(self, user):
         """
         Statistiques filtrées pour le bailleur connecté.
@@ -0,0 +1,68 @@
+"""
+Lecture ligne à ligne des fichiers importés (.xlsx via openpyxl ou .csv),
+en-têtes normalisés : minuscules, sans accents, ponctuation -> "_", puis alias
+propres à chaque import (import de portefeuille, relevés mobile money).
+"""
+import csv
+import io
+import re
+import unicodedata
+
+from django.core.exceptions import ValidationError
+from openpyxl import load_workbook
+
+FORMATS = (".xlsx", ".csv")
+
+
+def _colonne(entete, alias):
+    if entete is None:
+        return None
+    texte = unicodedata.normalize("NFKD", str(entete)).encode("ascii", "ignore").decode()
+    texte = re.sub(r"[^a-z0-9]+", "_", texte.lower()).strip("_")
+    return alias.get(texte, texte) or None
+
+
+def _valeur(valeur):
+    if isinstance(valeur, str):
+        valeur = valeur.strip()
+        return valeur or None
+    # Excel stocke 75000 en flottant : pas de décimale parasite pour les montants
+    if isinstance(valeur, float) and valeur.is_integer():
+        return int(valeur)
+    return valeur
+
+
+def _lignes(rangees, alias):
+    entete = next(rangees, None)
+    if not entete:
+        raise ValidationError("Fichier vide : la première ligne doit contenir les en-têtes de colonnes.")
+    colonnes = [_colonne(valeur, alias) for valeur in entete]
+    for numero, valeurs in enumerate(rangees, start=2):
+        donnees = {colonne: _valeur(valeur) for colonne, valeur in zip(colonnes, valeurs) if colonne}
+        if any(valeur is not None for valeur in donnees.values()):
+            yield numero, donnees
+
+
+def lire_lignes(fichier, nom, alias=None):
+    """
+    (numéro de ligne, {colonne: valeur}) pour chaque ligne non vide de
+    `fichier` (binaire), numérotées comme dans le tableur (en-têtes = 1).
+    """
+    alias = alias or {}
+    if nom.lower().endswith(".xlsx"):
+        classeur = load_workbook(fichier, read_only=True, data_only=True)
+        try:
+            yield from _lignes(classeur.active.iter_rows(values_only=True), alias)
+        finally:
+            classeur.close()
+    elif nom.lower().endswith(".csv"):
+        texte = io.TextIOWrapper(fichier, encoding="utf-8-sig", newline="")
+        debut = texte.read(4096)
+        texte.seek(0)
+        try:
+            dialecte = csv.Sniffer().sniff(debut, delimiters=";,\t")
+        except csv.Error:
+            dialecte = csv.excel
+        yield from _lignes(csv.reader(texte, dialecte), alias)
+    else:
+        raise ValidationError("Format non pris en charge : utilisez un classeur .xlsx ou un fichier .csv.")
@@ -0,0 +1,261 @@
+"""
+Téléversement reprenable de documents volumineux (inspiré de tus).
+
+    POST   /api/televersements/            {cible, nom, taille, type} -> id
+    PATCH  /api/televersements/<id>/       en-tête Upload-Offset + octets du morceau
+    HEAD   /api/televersements/<id>/       Upload-Offset : où reprendre après une coupure
+
+Chaque morceau est écrit tel quel dans le storage (televersements/<id>/<offset>),
+sans passer par le buffer d'upload de Django. Au dernier morceau, les
+morceaux sont relus à la suite et envoyés en flux au storage, à
+l'emplacement du champ cible (upload_to). Le formulaire qui attache le
+document (TeleversementMixin) reprend simplement ce chemin : aucune copie.
+"""
+import io
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from apps.core.models import Bail, Depense, EtatDesLieux, Televersement, Transaction
+
+logger = logging.getLogger(__name__)
+
+MO = 1024 * 1024
+PDF = ("application/pdf",)
+IMAGES = ("image/jpeg", "image/png", "image/webp")
+
+# Politique par champ cible : taille maximale et types acceptés.
+# "rattacher_a" : objet auquel le document est attaché dès la fin de l'envoi
+# (sinon, c'est le formulaire qui le rattache, voir TeleversementMixin)
+POLITIQUES = {
+    "bail.fichier_contrat": {"modele": Bail, "champ": "fichier_contrat", "taille_max": 20 * MO, "types": PDF},
+    "edl.pdf": {"modele": EtatDesLieux, "champ": "pdf", "taille_max": 50 * MO, "types": PDF},
+    "depense.justificatif": {
+        "modele": Depense, "champ": "justificatif", "taille_max": 15 * MO, "types": PDF + IMAGES,
+    },
+    "transaction.preuve_paiement": {
+        "modele": Transaction, "champ": "preuve_paiement", "taille_max": 10 * MO, "types": PDF + IMAGES,
+    },
+    "profil.cni_scan": {
+        "modele": UserProfile, "champ": "cni_scan", "taille_max": 10 * MO, "types": PDF + IMAGES,
+        "rattacher_a": lambda utilisateur: utilisateur.profile,
+    },
+}
+
+
+class ConflitOffset(Exception):
+    """Le morceau ne commence pas là où le serveur en est (client désynchronisé)."""
+
+    def __init__(self, recu):
+        super().__init__(f"Offset attendu : {recu}")
+        self.recu = recu
+
+
+class MorceauTropGrand(Exception):
+    pass
+
+
+def _type_reel(debut):
+    """Type MIME déduit des premiers octets (None si non reconnu)."""
+    if debut.startswith(b"%PDF-"):
+        return "application/pdf"
+    if debut.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if debut.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if debut[:4] == b"RIFF" and debut[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def _dossier_morceaux(televersement):
+    return f"televersements/{televersement.pk}"
+
+
+def creer(utilisateur, cible, nom, taille, type_mime):
+    politique = POLITIQUES.get(cible)
+    if politique is None:
+        raise ValidationError({"cible": "Champ cible inconnu."})
+    if type_mime not in politique["types"]:
+        raise ValidationError({"type": f"Type non accepté (attendu : {', '.join(politique['types'])})."})
+    if not 0 < taille <= politique["taille_max"]:
+        raise ValidationError({"taille": f"Taille maximale : {politique['taille_max'] // MO} Mo."})
+    return Televersement.objects.create(
+        utilisateur=utilisateur,
+        cible=cible,
+        nom_original=nom[:255],
+        type_mime=type_mime,
+        taille=taille,
+    )
+
+
+def _lire_morceau(flux):
+    """Copie le corps de la requête dans un fichier temporaire (mémoire jusqu'à 1 Mo)."""
+    limite = settings.TELEVERSEMENT_TAILLE_MORCEAU
+    tampon = tempfile.SpooledTemporaryFile(max_size=MO)
+    lus = 0
+    while True:
+        bloc = flux.read(64 * 1024)
+        if not bloc:
+            break
+        lus += len(bloc)
+        if lus > limite:
+            tampon.close()
+            raise MorceauTropGrand(f"Morceau limité à {limite // MO} Mo.")
+        tampon.write(bloc)
+    tampon.seek(0)
+    return tampon, lus
+
+
+def ajouter_morceau(televersement_id, utilisateur, offset, flux):
+    """
+    Écrit un morceau à `offset` et retourne le téléversement à jour
+    (assemblé si c'était le dernier). Verrou sur la ligne : deux envois
+    concurrents du même morceau ne peuvent pas être comptés deux fois.
+    """
+    tampon, longueur = _lire_morceau(flux)
+    with tampon, transaction.atomic():
+        televersement = Televersement.objects.select_for_update().get(
+            pk=televersement_id, utilisateur=utilisateur
+        )
+        if televersement.statut != "EN_COURS":
+            raise ValidationError("Téléversement terminé ou annulé.")
+        if offset != televersement.recu:
+            raise ConflitOffset(televersement.recu)
+        if longueur == 0 or televersement.recu + longueur > televersement.taille:
+            raise ValidationError("Le morceau dépasse la taille annoncée.")
+
+        if offset == 0:
+            type_reel = _type_reel(tampon.read(16))
+            tampon.seek(0)
+            if type_reel != televersement.type_mime:
+                raise ValidationError("Le contenu ne correspond pas au type annoncé.")
+
+        chemin = f"{_dossier_morceaux(televersement)}/{offset:012d}"
+        # Morceau d'une tentative précédente interrompue avant la mise à jour de `recu`
+        if default_storage.exists(chemin):
+            default_storage.delete(chemin)
+        default_storage.save(chemin, File(tampon))
+
+        televersement.recu += longueur
+        if televersement.recu == televersement.taille:
+            _assembler(televersement)
+            _rattacher(televersement, utilisateur)
+        televersement.save(update_fields=["recu", "statut", "fichier", "updated_at"])
+    return televersement
+
+
+def _rattacher(televersement, utilisateur):
+    politique = POLITIQUES[televersement.cible]
+    if "rattacher_a" not in politique:
+        return
+    objet = politique["rattacher_a"](utilisateur)
+    setattr(objet, politique["champ"], televersement.fichier)
+    champs = [politique["champ"]]
+    # Synchronisation mobile par curseur sur updated_at : le nouveau fichier doit y remonter
+    if any(champ.name == "updated_at" for champ in objet._meta.concrete_fields):
+        champs.append("updated_at")
+    objet.save(update_fields=champs)
+
+
+class _FluxMorceaux(io.RawIOBase):
+    """Lecture séquentielle des morceaux stockés, comme un seul fichier."""
+
+    def __init__(self, chemins):
+        self._chemins = iter(chemins)
+        self._courant = None
+
+    def readable(self):
+        return True
+
+    def readinto(self, tampon):
+        while True:
+            if self._courant is None:
+                chemin = next(self._chemins, None)
+                if chemin is None:
+                    return 0
+                self._courant = default_storage.open(chemin, "rb")
+            donnees = self._courant.read(len(tampon))
+            if donnees:
+                tampon[:len(donnees)] = donnees
+                return len(donnees)
+            self._courant.close()
+            self._courant = None
+
+    def close(self):
+        if self._courant is not None:
+            self._courant.close()
+        super().close()
+
+
+def _assembler(televersement):
+    politique = POLITIQUES[televersement.cible]
+    champ = politique["modele"]._meta.get_field(politique["champ"])
+    dossier = _dossier_morceaux(televersement)
+    chemins = [f"{dossier}/{nom}" for nom in sorted(default_storage.listdir(dossier)[1])]
+
+    with _FluxMorceaux(chemins) as flux:
+        document = File(io.BufferedReader(flux, buffer_size=MO), name=televersement.nom_original)
+        document.size = televersement.taille
+        nom = champ.generate_filename(politique["modele"](), televersement.nom_original)
+        televersement.fichier = champ.storage.save(nom, document, max_length=champ.max_length)
+
+    for chemin in chemins:
+        default_storage.delete(chemin)
+    televersement.statut = "TERMINE"
+
+
+def _supprimer_morceaux(televersement):
+    dossier = _dossier_morceaux(televersement)
+    if default_storage.exists(dossier):
+        for nom in default_storage.listdir(dossier)[1]:
+            default_storage.delete(f"{dossier}/{nom}")
+
+
+def annuler(televersement):
+    _supprimer_morceaux(televersement)
+    televersement.statut = "ANNULE"
+    televersement.save(update_fields=["statut", "updated_at"])
+
+
+def resoudre(utilisateur, identifiant, cible):
+    """Chemin du document terminé `identifiant` envoyé par `utilisateur` pour `cible`."""
+    try:
+        televersement = Televersement.objects.get(
+            pk=identifiant, utilisateur=utilisateur, cible=cible, statut="TERMINE"
+        )
+    except (Televersement.DoesNotExist, ValidationError, ValueError):
+        raise ValidationError("Document téléversé introuvable ou incomplet.")
+    return televersement.fichier
+
+
+def purger():
+    """
+    Supprime les envois abandonnés (morceaux compris) et les documents
+    assemblés jamais rattachés à un objet, au-delà de TELEVERSEMENT_EXPIRATION_HEURES.
+    Retourne le nombre de téléversements supprimés.
+    """
+    limite = timezone.now() - timedelta(hours=settings.TELEVERSEMENT_EXPIRATION_HEURES)
+    nb = 0
+    for televersement in Televersement.objects.filter(updated_at__lt=limite).iterator():
+        if televersement.statut == "TERMINE":
+            politique = POLITIQUES[televersement.cible]
+            # _base_manager : un bail en soft delete garde son contrat
+            rattache = politique["modele"]._base_manager.filter(
+                **{politique["champ"]: televersement.fichier}
+            ).exists()
+            if not rattache and default_storage.exists(televersement.fichier):
+                default_storage.delete(televersement.fichier)
+        else:
+            _supprimer_morceaux(televersement)
+        televersement.delete()
+        nb += 1
+    return nb
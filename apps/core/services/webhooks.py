@@ -0,0 +1,211 @@
+"""
+Notifications de paiement des opérateurs (Wave, Orange Money) : réception
+idempotente, puis application en tâche de fond.
+
+    POST /api/webhooks/paiements/<wave|om>/
+    En-tête de signature : t=<horodatage unix>,v1=<HMAC-SHA256 hex de "<t><corps>">
+
+La vue vérifie la signature, enregistre le corps brut sous la clé
+d'idempotence (id de l'événement chez l'opérateur) et répond 200 sans
+attendre. La tâche traiter_evenement_paiement crée la Transaction et appelle
+Loyer.enregistrer_paiement. La table EvenementPaiement sert de file
+durable : reprendre_evenements_paiement relance ce que Celery n'a pas
+traité (broker indisponible, worker arrêté, échec).
+
+Le loyer est désigné par la référence LOY<id> (Loyer.reference_paiement)
+transmise à l'opérateur comme référence client ; sinon, ou si le montant ne
+convient pas, le paiement rejoint la file de vérification des relevés
+(LigneReleve).
+"""
+import hashlib
+import hmac
+import json
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from apps.core.models import EvenementPaiement, LigneReleve, Loyer, Transaction
+from apps.core.services.rapprochement import REFERENCE, date_operation, montant_fcfa
+
+logger = logging.getLogger(__name__)
+
+PROVIDERS = ("WAVE", "OM")
+ENTETES_SIGNATURE = {"WAVE": "Wave-Signature", "OM": "X-Signature"}
+TYPES_PAIEMENT = {"checkout.session.completed", "merchant.payment_received", "payment.succeeded"}
+STATUTS_REUSSIS = {"succeeded", "success", "successful", "completed"}
+# Délai avant qu'un événement encore "reçu" soit considéré comme perdu par Celery
+DELAI_REPRISE = timedelta(minutes=2)
+
+
+def signer(provider, corps, horodatage=None):
+    """Valeur de l'en-tête de signature pour `corps` (octets) : tests et faux opérateur."""
+    horodatage = int(horodatage if horodatage is not None else time.time())
+    secret = settings.PAIEMENT_WEBHOOK_SECRETS[provider].encode()
+    signature = hmac.new(secret, str(horodatage).encode() + corps, hashlib.sha256).hexdigest()
+    return f"t={horodatage},v1={signature}"
+
+
+def verifier_signature(provider, corps, entete):
+    secret = settings.PAIEMENT_WEBHOOK_SECRETS.get(provider)
+    if not secret or not entete:
+        return False
+    horodatage = None
+    signatures = []
+    for partie in entete.split(","):
+        cle, _, valeur = partie.strip().partition("=")
+        if cle == "t":
+            horodatage = valeur
+        elif cle == "v1":
+            signatures.append(valeur)
+    try:
+        ecart = abs(time.time() - int(horodatage))
+    except (TypeError, ValueError):
+        return False
+    if ecart > settings.PAIEMENT_WEBHOOK_TOLERANCE_SECONDES:
+        return False
+    attendue = hmac.new(secret.encode(), horodatage.encode() + corps, hashlib.sha256).hexdigest()
+    return any(hmac.compare_digest(attendue, signature) for signature in signatures)
+
+
+def recevoir(provider, corps):
+    """
+    Enregistre l'événement (corps signé, octets) s'il est nouveau.
+    Retourne (evenement, cree) ; ValueError si le corps n'est pas du JSON.
+    """
+    donnees = json.loads(corps)
+    if not isinstance(donnees, dict):
+        raise ValueError("Objet JSON attendu.")
+    # Sans identifiant d'événement, le corps lui-même fait office de clé
+    cle = str(donnees.get("id") or "") or hashlib.sha256(corps).hexdigest()
+    return EvenementPaiement.objects.get_or_create(
+        provider=provider,
+        cle_idempotence=cle[:100],
+        defaults={"type_evenement": str(donnees.get("type") or "")[:100], "corps": corps.decode()},
+    )
+
+
+def _normaliser(donnees, cle_idempotence):
+    """
+    Champs utiles d'un événement Wave (data.*) ou Orange Money (à plat).
+    Sans identifiant de transaction ni d'événement, la clé d'idempotence
+    sert de référence externe.
+    """
+    paiement = donnees.get("data") if isinstance(donnees.get("data"), dict) else donnees
+    statut = str(paiement.get("payment_status") or paiement.get("status") or "").lower()
+    return {
+        "reussi": statut in STATUTS_REUSSIS or (not statut and donnees.get("type") in TYPES_PAIEMENT),
+        "reference_externe": str(
+            paiement.get("transaction_id") or paiement.get("txnid") or paiement.get("id") or donnees.get("id")
+            or cle_idempotence
+        )[:100],
+        "montant": montant_fcfa(paiement.get("amount") or paiement.get("montant")),
+        "reference_client": str(
+            paiement.get("client_reference") or paiement.get("order_id") or paiement.get("reference") or ""
+        ),
+        "telephone": str(paiement.get("sender_mobile") or paiement.get("customer_msisdn") or "")[:30],
+        "date": date_operation(paiement.get("when_completed") or paiement.get("date") or timezone.now()),
+    }
+
+
+def _appliquer(evenement):
+    paiement = _normaliser(json.loads(evenement.corps), evenement.cle_idempotence)
+    if not paiement["reussi"]:
+        evenement.statut = "IGNORE"
+        evenement.erreur = "Pas un paiement réussi."
+        return
+    # Verrou sur le loyer d'abord : deux notifications du même paiement
+    # (ids d'événement différents) sont appliquées l'une après l'autre
+    trouvee = REFERENCE.search(paiement["reference_client"])
+    loyer = Loyer.objects.select_for_update().filter(pk=int(trouvee.group(1))).first() if trouvee else None
+    # Même paiement déjà enregistré (autre notification, relevé importé)
+    if Transaction.objects.filter(
+        provider=evenement.provider, reference_externe=paiement["reference_externe"]
+    ).exists():
+        evenement.statut = "IGNORE"
+        evenement.erreur = "Paiement déjà enregistré."
+        return
+
+    if loyer is None:
+        motif = "AUCUN"
+    elif loyer.statut == "PAYE":
+        motif = "DEJA_PAYE"
+    elif paiement["montant"] > loyer.reste_a_payer:
+        motif = "MONTANT"
+    else:
+        motif = None
+
+    if motif:
+        LigneReleve.objects.get_or_create(
+            provider=evenement.provider,
+            reference_externe=paiement["reference_externe"],
+            defaults={
+                "date_operation": paiement["date"],
+                "montant": paiement["montant"],
+                "telephone": paiement["telephone"],
+                "libelle": f"Webhook {paiement['reference_client']}"[:255],
+                "fichier": "webhook",
+                "motif": motif,
+                "candidats": [loyer.pk] if loyer else [],
+            },
+        )
+        evenement.statut = "A_REVOIR"
+        return
+
+    evenement.transaction = Transaction.objects.create(
+        loyer=loyer,
+        montant=paiement["montant"],
+        provider=evenement.provider,
+        reference_externe=paiement["reference_externe"],
+        type_flux="LOYER",
+        est_validee=True,
+    )
+    loyer.enregistrer_paiement(paiement["montant"])
+    evenement.statut = "TRAITE"
+
+
+def traiter(evenement_id):
+    """
+    Applique un événement reçu (ou en échec). Sans effet s'il est déjà
+    traité ou en cours sur un autre worker (verrou SKIP LOCKED).
+    """
+    try:
+        with transaction.atomic():
+            evenement = (
+                EvenementPaiement.objects.select_for_update(skip_locked=True)
+                .filter(pk=evenement_id, statut__in=("RECU", "ECHEC"))
+                .first()
+            )
+            if evenement is None:
+                return None
+            evenement.erreur = ""
+            _appliquer(evenement)
+            evenement.traite_le = timezone.now()
+            evenement.save(update_fields=["statut", "erreur", "transaction", "traite_le"])
+    except Exception as exc:
+        logger.exception("Webhook paiement : échec du traitement de l'événement %s.", evenement_id)
+        EvenementPaiement.objects.filter(pk=evenement_id).update(
+            statut="ECHEC", tentatives=F("tentatives") + 1, erreur=str(exc)[:2000]
+        )
+        return None
+    return evenement
+
+
+def reprendre(limite=500):
+    """
+    Relance les événements restés "reçus" (tâche perdue) et ceux en échec
+    sous PAIEMENT_WEBHOOK_TENTATIVES_MAX. Retourne le nombre de traités.
+    """
+    en_attente = (
+        EvenementPaiement.objects.filter(
+            Q(statut="RECU", recu_le__lt=timezone.now() - DELAI_REPRISE)
+            | Q(statut="ECHEC", tentatives__lt=settings.PAIEMENT_WEBHOOK_TENTATIVES_MAX)
+        )
+        .order_by("recu_le")
+        .values_list("pk", flat=True)[:limite]
+    )
+    return sum(1 for pk in list(en_attente) if traiter(pk) is not None)
@@ -1,8 +1,19 @@
-from django.db.models.signals import post_save
+import logging
+
+from celery.signals import task_postrun, task_prerun
+from django.conf import settings
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 from django.utils import timezone
 
-from .models import Annonce, Bail
+from . import cache as cache_public
+from . import slow_queries
+from .models import Annonce, Bail, Bien, Document, EtatDesLieux, Intervention, Loyer, Suppression
+from .services import documents, images
+
+logger = logging.getLogger(__name__)
 
 @receiver(post_save, sender=Bail)
 def archive_annonces_on_signed_bail(sender, instance: Bail, created=False, update_fields=None, **kwargs):
@@ -21,3 +32,218 @@ def archive_annonces_on_signed_bail(sender, instance: Bail, created=False, updat
         statut="ARCHIVE",
         updated_at=timezone.now()
     )
+
+
+# ===================== INVALIDATION DU CACHE PUBLIC =====================
+# Les mises à jour en masse (QuerySet.update) n'émettent pas de signaux : le
+# code qui en fait sur ces modèles doit appeler cache_public.invalider().
+
+@receiver(post_save, sender=Annonce)
+@receiver(post_delete, sender=Annonce)
+@receiver(post_save, sender=Bien)
+@receiver(post_delete, sender=Bien)
+def invalider_catalogue(sender, **kwargs):
+    cache_public.invalider(cache_public.CATALOGUE)
+
+
+@receiver(post_save, sender=Bail)
+@receiver(post_delete, sender=Bail)
+def invalider_catalogue_bail(sender, instance: Bail, update_fields=None, **kwargs):
+    # Un bail non signé ne change pas la disponibilité du bien, sauf s'il vient
+    # d'être dé-signé (sauvegarde complète ou est_signe dans update_fields)
+    if not instance.est_signe and update_fields is not None and "est_signe" not in update_fields:
+        return
+    cache_public.invalider(cache_public.CATALOGUE)
+
+
+@receiver(post_save, sender=Intervention)
+@receiver(post_delete, sender=Intervention)
+@receiver(post_save, sender=Bail)
+def invalider_accueil_locataire(sender, instance, **kwargs):
+    cache_public.invalider(cache_public.groupe_locataire(instance.locataire_id))
+
+
+def _locataire_du_loyer(loyer):
+    # Sans charger le bail (ni passer par son manager filtré) ; mémorisé sur
+    # l'instance pour les autres receivers du même signal
+    bail_id, locataire_id = getattr(loyer, "_locataire_du_bail", (None, None))
+    if bail_id != loyer.bail_id:
+        locataire_id = Bail.all_objects.filter(pk=loyer.bail_id).values_list("locataire_id", flat=True).first()
+        loyer._locataire_du_bail = (loyer.bail_id, locataire_id)
+    return locataire_id
+
+
+@receiver(post_save, sender=Loyer)
+@receiver(post_delete, sender=Loyer)
+def invalider_accueil_locataire_loyer(sender, instance: Loyer, **kwargs):
+    locataire_id = _locataire_du_loyer(instance)
+    if locataire_id is not None:
+        cache_public.invalider(cache_public.groupe_locataire(locataire_id))
+
+
+# ===================== SUPPRESSIONS (SYNCHRONISATION MOBILE) =====================
+
+@receiver(post_delete, sender=Intervention)
+def tracer_suppression_intervention(sender, instance: Intervention, **kwargs):
+    Suppression.objects.create(
+        type_objet="intervention",
+        objet_id=instance.pk,
+        locataire_id=instance.locataire_id,
+    )
+
+
+@receiver(post_delete, sender=Loyer)
+def tracer_suppression_loyer(sender, instance: Loyer, **kwargs):
+    locataire_id = _locataire_du_loyer(instance)
+    if locataire_id is None:
+        return
+    Suppression.objects.create(
+        type_objet="loyer",
+        objet_id=instance.pk,
+        locataire_id=locataire_id,
+    )
+
+
+@receiver(post_delete, sender=Bail)
+def tracer_suppression_bail(sender, instance: Bail, **kwargs):
+    # Suppression définitive (admin, QuerySet.delete, archiver_lot) ; le soft
+    # delete passe par tracer_retrait_bail
+    Suppression.objects.create(
+        type_objet="bail",
+        objet_id=instance.pk,
+        locataire_id=instance.locataire_id,
+    )
+
+
+@receiver(post_save, sender=Bail)
+def tracer_retrait_bail(sender, instance: Bail, update_fields=None, **kwargs):
+    # Bail en soft delete : le bail et ses loyers disparaissent de l'application
+    if update_fields is None or "deleted_at" not in update_fields:
+        return
+
+    if instance.deleted_at:
+        loyer_ids = Loyer.objects.filter(bail=instance).values_list("pk", flat=True)
+        Suppression.objects.bulk_create(
+            [Suppression(type_objet="bail", objet_id=instance.pk, locataire_id=instance.locataire_id)]
+            + [
+                Suppression(type_objet="loyer", objet_id=pk, locataire_id=instance.locataire_id)
+                for pk in loyer_ids
+            ]
+        )
+    else:
+        # Restauration : les loyers doivent être renvoyés au prochain delta
+        Loyer.objects.filter(bail=instance).update(updated_at=timezone.now())
+
+
+# ===================== GED : INDEX DES DOCUMENTS =====================
+
+@receiver(post_save, sender=Bail)
+@receiver(post_save, sender=Loyer)
+@receiver(post_save, sender=EtatDesLieux)
+def indexer_document(sender, instance, update_fields=None, **kwargs):
+    # Ex. enregistrer_paiement (update_fields sans quittance) : rien à réindexer
+    _, champ, champ_date, _ = documents.SOURCES[sender]
+    if update_fields is not None and not {champ, champ_date, "deleted_at"} & set(update_fields):
+        return
+    documents.indexer(instance)
+
+
+@receiver(post_delete, sender=Loyer)
+@receiver(post_delete, sender=EtatDesLieux)
+def desindexer_document(sender, instance, **kwargs):
+    documents.desindexer(instance)
+
+
+@receiver(post_save, sender=Bail)
+def propager_bail_documents(sender, instance: Bail, update_fields=None, **kwargs):
+    # Bien ou locataire modifiés par formulaire : quittances et EDL du bail suivent
+    if update_fields is not None:
+        return
+    proprietaire_id = Bien.all_objects.filter(pk=instance.bien_id).values_list("proprietaire_id", flat=True).first()
+    Document.objects.filter(bail=instance).exclude(
+        bien_id=instance.bien_id, proprietaire_id=proprietaire_id, locataire_id=instance.locataire_id
+    ).update(bien_id=instance.bien_id, proprietaire_id=proprietaire_id, locataire_id=instance.locataire_id)
+
+
+@receiver(post_save, sender=Bien)
+def propager_proprietaire_documents(sender, instance: Bien, update_fields=None, **kwargs):
+    if update_fields is not None and "proprietaire" not in update_fields:
+        return
+    Document.objects.filter(bien=instance).exclude(proprietaire_id=instance.proprietaire_id).update(
+        proprietaire_id=instance.proprietaire_id
+    )
+
+
+# ===================== DÉRIVÉS DES PHOTOS =====================
+
+CHAMPS_PHOTOS = {
+    Bien: ("photo_principale",),
+    Intervention: ("photo_avant", "photo_apres"),
+}
+
+
+@receiver(pre_save, sender=Bien)
+@receiver(pre_save, sender=Intervention)
+def reperer_photos_deposees(sender, instance, **kwargs):
+    # Avant la sauvegarde, un fichier tout juste déposé n'est pas encore
+    # "committed" dans le storage : c'est la seule photo à traiter
+    instance._photos_deposees = [
+        nom_champ
+        for nom_champ in CHAMPS_PHOTOS[sender]
+        if getattr(instance, nom_champ) and not getattr(instance, nom_champ)._committed
+    ]
+    if instance.pk is None or not instance._photos_deposees:
+        return
+    # Photo remplacée : les dérivés de l'ancienne ne seraient plus jamais servis
+    anciens = sender._base_manager.filter(pk=instance.pk).values(*instance._photos_deposees).first() or {}
+    for nom_champ, ancien in anciens.items():
+        if ancien and ancien != getattr(instance, nom_champ).name:
+            storage = getattr(instance, nom_champ).storage
+            transaction.on_commit(lambda nom=ancien, storage=storage: images.supprimer_derives(nom, storage))
+
+
+def _lancer_derives(nom, groupes):
+    from .tasks import generer_derives_image
+
+    try:
+        generer_derives_image.delay(nom, groupes)
+    except Exception:
+        # Broker indisponible : la photo d'origine reste servie,
+        # `manage.py generer_derives_images` rattrapera
+        logger.exception("Impossible de planifier les dérivés de %s.", nom)
+
+
+@receiver(post_save, sender=Bien)
+@receiver(post_save, sender=Intervention)
+def planifier_derives_photos(sender, instance, **kwargs):
+    if sender is Bien:
+        groupes = [cache_public.CATALOGUE]
+    else:
+        groupes = [cache_public.groupe_locataire(instance.locataire_id)]
+    for nom_champ in getattr(instance, "_photos_deposees", ()):
+        nom = getattr(instance, nom_champ).name
+        transaction.on_commit(lambda nom=nom: _lancer_derives(nom, groupes))
+    instance._photos_deposees = []
+
+
+# ===================== REQUÊTES LENTES =====================
+
+@receiver(connection_created)
+def installer_capture_requetes_lentes(sender, connection, **kwargs):
+    if getattr(settings, "SLOW_QUERY_ENABLED", False):
+        slow_queries.installer(connection)
+
+
+_jetons_taches = {}
+
+
+@task_prerun.connect
+def contexte_sql_tache(task_id=None, task=None, **kwargs):
+    _jetons_taches[task_id] = slow_queries.definir_contexte(f"tache:{task.name}")
+
+
+@task_postrun.connect
+def fin_contexte_sql_tache(task_id=None, **kwargs):
+    jeton = _jetons_taches.pop(task_id, None)
+    if jeton is not None:
+        slow_queries.reinitialiser_contexte(jeton)
@@ -1,17 +1,51 @@
 from django.contrib.sitemaps import Sitemap
-from apps.core.models import Bien
+from django.db.models import Max, OuterRef, Subquery
+from django.urls import reverse
+
+from apps.core.models import Annonce, Bien
+
+# Sous-dossier des médias où `manage.py generer_sitemaps` écrit les fichiers
+DOSSIER = "sitemaps"
+
 
 class BienSitemap(Sitemap):
     changefreq = "daily"
     priority = 0.8
     protocol = 'https'
+    # Au-delà, l'index sitemap.xml pagine la section (?p=2, ...)
+    limit = 50000
 
     def items(self):
-        # On ne veut indexer que les biens disponibles (et non supprimés)
-        return Bien.objects.filter(is_disponible=True, deleted_at__isnull=True)
+        # Biens disponibles (et non supprimés) ayant une annonce publiée : c'est
+        # la page de l'annonce qui est indexée, Bien n'a pas de page publique.
+        annonces = Annonce.objects.filter(bien=OuterRef("pk"), statut="PUBLIE").order_by("-date_publication")
+        return (
+            Bien.objects.disponibles()
+            .annotate(
+                annonce_id=Subquery(annonces.values("pk")[:1]),
+                annonce_updated_at=Subquery(annonces.values("updated_at")[:1]),
+            )
+            .filter(annonce_id__isnull=False)
+            .only("pk", "updated_at")
+            .order_by("pk")
+        )
+
+    def location(self, obj):
+        return reverse("annonce_detail", kwargs={"pk": obj.annonce_id})
 
     def lastmod(self, obj):
-        return obj.updated_at
+        return max(obj.updated_at, obj.annonce_updated_at)
+
+    def get_latest_lastmod(self):
+        # Utilisé par l'index : agrégats SQL plutôt qu'un parcours de tous les biens
+        biens = self.items()
+        dates = [
+            biens.aggregate(m=Max("updated_at"))["m"],
+            Annonce.objects.filter(statut="PUBLIE", bien__in=biens.values("pk")).aggregate(m=Max("updated_at"))["m"],
+        ]
+        dates = [d for d in dates if d is not None]
+        return max(dates) if dates else None
+
 
 class StaticViewSitemap(Sitemap):
     priority = 0.5
@@ -22,5 +56,10 @@ class StaticViewSitemap(Sitemap):
         return ['home', 'about', 'contact', 'login']
 
     def location(self, item):
-        from django.urls import reverse
-        return reverse(item)
\ No newline at end of file
+        return reverse(item)
+
+
+SITEMAPS = {
+    "biens": BienSitemap,
+    "static": StaticViewSitemap,
+}
@@ -0,0 +1,175 @@
+"""
+Enregistrement des requêtes SQL lentes.
+
+Un execute wrapper est ajouté à chaque connexion (signal connection_created) :
+toute requête au-delà de SLOW_QUERY_MS est enregistrée dans RequeteLente avec
+son plan (EXPLAIN sur PostgreSQL, EXPLAIN QUERY PLAN sur SQLite) et le
+contexte appelant (vue, tâche Celery, commande).
+
+La capture ne doit jamais perturber la requête d'origine :
+- EXPLAIN est exécuté dans un savepoint, pour les SELECT sans verrou
+  (FOR UPDATE / FOR SHARE) uniquement ;
+- EXPLAIN (ANALYZE, BUFFERS), qui ré-exécute la requête, est réservé aux
+  tâches Celery et aux commandes, jamais pendant une requête HTTP ;
+- l'écriture se fait toujours sur "default", après le commit de la
+  transaction appelante (transaction.on_commit), dans un savepoint ;
+- la table circulaire (SLOW_QUERY_MAX_ROWS) est réduite par la tâche
+  purger_requetes_lentes, pas à chaque capture.
+
+SLOW_QUERY_EXPLAIN=False désactive complètement les plans.
+"""
+import hashlib
+import logging
+import re
+import sys
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+logger = logging.getLogger(__name__)
+
+_contexte = ContextVar("contexte_sql", default=None)
+_en_capture = ContextVar("capture_sql_en_cours", default=False)
+
+_RE_CHAINES = re.compile(r"'(?:[^']|'')*'")
+_RE_NOMBRES = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTES = re.compile(r"\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)")
+_RE_ESPACES = re.compile(r"\s+")
+_RE_VERROU = re.compile(r"\bFOR\s+(?:NO\s+KEY\s+)?(?:UPDATE|SHARE|KEY\s+SHARE)\b", re.IGNORECASE)
+
+
+def definir_contexte(nom):
+    return _contexte.set(nom)
+
+
+def reinitialiser_contexte(jeton):
+    _contexte.reset(jeton)
+
+
+def contexte_courant():
+    contexte = _contexte.get()
+    if contexte:
+        return contexte
+    # Hors requête / tâche : probablement une commande manage.py
+    if len(sys.argv) > 1 and sys.argv[0].endswith("manage.py"):
+        return f"commande:{sys.argv[1]}"
+    return ""
+
+
+def normaliser(sql):
+    """SQL sans valeurs littérales ni longueur des listes IN, pour regrouper les requêtes identiques."""
+    sql = _RE_CHAINES.sub("?", sql)
+    sql = _RE_NOMBRES.sub("?", sql)
+    sql = _RE_LISTES.sub("(...)", sql)
+    return _RE_ESPACES.sub(" ", sql).strip()
+
+
+def empreinte(sql):
+    return hashlib.sha1(normaliser(sql).encode()).hexdigest()
+
+
+def installer(connection):
+    """Ajoute le wrapper à la connexion (appelé sur connection_created)."""
+    if enregistrer_si_lente not in connection.execute_wrappers:
+        connection.execute_wrappers.append(enregistrer_si_lente)
+
+
+def enregistrer_si_lente(execute, sql, params, many, context):
+    if _en_capture.get():
+        return execute(sql, params, many, context)
+
+    debut = time.perf_counter()
+    resultat = execute(sql, params, many, context)
+    duree_ms = (time.perf_counter() - debut) * 1000
+
+    if duree_ms >= float(getattr(settings, "SLOW_QUERY_MS", 500)):
+        connection = context["connection"]
+        jeton = _en_capture.set(True)
+        try:
+            # Transaction appelante déjà condamnée : rien à y exécuter
+            if not connection.needs_rollback:
+                capture = _preparer(connection, sql, params, many, duree_ms)
+                transaction.on_commit(lambda: _enregistrer(capture), using=connection.alias)
+        except Exception:
+            # Ne jamais faire échouer la requête d'origine à cause de la capture
+            logger.warning("Capture de requête lente impossible", exc_info=True)
+        finally:
+            _en_capture.reset(jeton)
+    return resultat
+
+
+def _expliquable(sql, many):
+    return (
+        not many
+        and getattr(settings, "SLOW_QUERY_EXPLAIN", True)
+        and sql.lstrip().upper().startswith("SELECT")
+        and not _RE_VERROU.search(sql)
+    )
+
+
+def _expliquer(connection, sql, params, contexte):
+    if connection.vendor == "postgresql":
+        # ANALYZE ré-exécute la requête : hors requêtes HTTP uniquement
+        analyser = contexte.startswith(("tache:", "commande:"))
+        prefixe = "EXPLAIN (ANALYZE, BUFFERS) " if analyser else "EXPLAIN "
+    elif connection.vendor == "sqlite":
+        prefixe = "EXPLAIN QUERY PLAN "
+    else:
+        return ""
+
+    # Savepoint : un EXPLAIN en échec (timeout...) n'annule pas la transaction appelante
+    with transaction.atomic(using=connection.alias, savepoint=True), connection.cursor() as cursor:
+        cursor.execute(prefixe + sql, params)
+        return "\n".join(" ".join(str(col) for col in ligne) for ligne in cursor.fetchall())
+
+
+def _preparer(connection, sql, params, many, duree_ms):
+    """Champs de la capture ; seul le plan est calculé sur la connexion appelante."""
+    contexte = contexte_courant()
+    plan = ""
+    if _expliquable(sql, many):
+        try:
+            plan = _expliquer(connection, sql, params, contexte)
+        except Exception:
+            logger.warning("EXPLAIN impossible pour une requête lente", exc_info=True)
+    return {
+        "empreinte": empreinte(sql),
+        "sql": sql if many else _avec_parametres(sql, params),
+        "duree_ms": duree_ms,
+        "plan": plan,
+        "contexte": contexte[:200],
+        "base": connection.alias,
+    }
+
+
+def _enregistrer(capture):
+    from .models import RequeteLente
+
+    jeton = _en_capture.set(True)
+    try:
+        # Toujours sur la base principale (jamais la réplique en lecture seule)
+        with transaction.atomic(using=DEFAULT_DB_ALIAS, savepoint=True):
+            RequeteLente.objects.using(DEFAULT_DB_ALIAS).create(**capture)
+    except Exception:
+        logger.warning("Enregistrement de requête lente impossible", exc_info=True)
+    finally:
+        _en_capture.reset(jeton)
+
+
+def purger(capacite=None):
+    """Table circulaire : supprime les captures au-delà de SLOW_QUERY_MAX_ROWS. Retourne le nombre supprimé."""
+    from .models import RequeteLente
+
+    capacite = int(capacite if capacite is not None else getattr(settings, "SLOW_QUERY_MAX_ROWS", 1000))
+    qs = RequeteLente.objects.using(DEFAULT_DB_ALIAS)
+    dernier = qs.order_by("-id").values_list("id", flat=True).first()
+    if dernier is None:
+        return 0
+    return qs.filter(id__lte=dernier - capacite).delete()[0]
+
+
+def _avec_parametres(sql, params):
+    """SQL suivi de ses paramètres en commentaire (affichage admin)."""
+    return f"{sql}\n-- params: {params!r}" if params else sql
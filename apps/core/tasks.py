@@ -3,16 +3,30 @@ from datetime import timedelta
 
 from celery import shared_task
 from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.tokens import default_token_generator
 from django.core.management import call_command
 from django.core.mail import send_mail
+from django.db.models import Q
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
 
-from .models import Loyer, HistoriqueRelance
+from . import cache as cache_public
+from . import partitions, slow_queries
+from .metrics import RELANCES, mesurer_tache
+from .models import Bail, ExportDocuments, Loyer, HistoriqueRelance
+from .profiling import profiler_memoire_tache
+from .services import export_documents, televersement
+from .services.images import generer_derives
 
 logger = logging.getLogger(__name__)
 
 
 @shared_task
+@mesurer_tache("generer_loyers")
+@profiler_memoire_tache
 def generer_loyers_task():
     """Tâche Celery pour lancer la commande de génération des loyers."""
     try:
@@ -23,7 +37,142 @@ def generer_loyers_task():
         raise
 
 
+@shared_task(ignore_result=True)
+@mesurer_tache("generer_derives_image")
+def generer_derives_image(nom, groupes=()):
+    """
+    Vignettes WebP/JPEG d'une photo déposée (idempotent : rien à refaire si la
+    source n'a pas changé). `groupes` : caches à invalider pour que les pages
+    déjà en cache passent aux dérivés.
+    """
+    if generer_derives(nom) is not None and groupes:
+        cache_public.invalider(*groupes)
+
+
+@shared_task(ignore_result=True)
+@mesurer_tache("purger_televersements")
+def purger_televersements():
+    """Supprime les téléversements abandonnés ou jamais rattachés à un document."""
+    nb = televersement.purger()
+    logger.info("%s téléversement(s) expiré(s) supprimé(s).", nb)
+
+
+@shared_task(ignore_result=True)
+@mesurer_tache("exporter_documents")
+@profiler_memoire_tache
+def exporter_documents(export_id):
+    """Archive ZIP d'une sélection de la GED trop volumineuse pour un envoi direct."""
+    export = ExportDocuments.objects.select_related("utilisateur").get(pk=export_id)
+    export_documents.executer(export)
+    logger.info("Export %s : %s document(s) archivé(s).", export.pk, export.nb_documents)
+
+
+@shared_task(ignore_result=True)
+@mesurer_tache("purger_exports_documents")
+def purger_exports_documents():
+    """Supprime les archives d'export expirées."""
+    nb = export_documents.purger()
+    logger.info("%s export(s) de documents expiré(s) supprimé(s).", nb)
+
+
+@shared_task(ignore_result=True)
+@mesurer_tache("purger_requetes_lentes")
+def purger_requetes_lentes():
+    """Table circulaire des requêtes lentes : supprime les captures les plus anciennes."""
+    nb = slow_queries.purger()
+    if nb:
+        logger.info("%s requête(s) lente(s) purgée(s).", nb)
+
+
+@shared_task(ignore_result=True)
+@mesurer_tache("maintenir_partitions")
+def maintenir_partitions():
+    """Partitions annuelles à venir et détachement des plus anciennes (PostgreSQL)."""
+    for table, bilan in partitions.maintenir().items():
+        if bilan["creees"] or bilan["detachees"]:
+            logger.info("%s : partitions créées %s, détachées %s.", table, bilan["creees"], bilan["detachees"])
+
+
+@shared_task(ignore_result=True)
+@mesurer_tache("generer_contrat_bail")
+def generer_contrat_bail(bail_id):
+    """Contrat PDF d'un bail créé sans génération synchrone (import en masse)."""
+    from .services.contrat import sauvegarder_contrat
+
+    bail = Bail.objects.select_related("bien__proprietaire", "locataire").get(pk=bail_id)
+    if not bail.fichier_contrat:
+        sauvegarder_contrat(bail)
+
+
+@shared_task(ignore_result=True)
+@mesurer_tache("inviter_locataires")
+def inviter_locataires(user_ids):
+    """
+    Lien de choix du mot de passe pour les comptes créés par import (mot de
+    passe inutilisable : le formulaire "mot de passe oublié" les ignorerait).
+    """
+    User = get_user_model()
+    for locataire in User.objects.filter(pk__in=user_ids).exclude(email=""):
+        lien = reverse(
+            "password_reset_confirm",
+            kwargs={
+                "uidb64": urlsafe_base64_encode(force_bytes(locataire.pk)),
+                "token": default_token_generator.make_token(locataire),
+            },
+        )
+        send_mail(
+            "Votre espace locataire MADA IMMO",
+            f"Bonjour {locataire.first_name or locataire.username},\n\n"
+            "Votre bailleur vous a inscrit sur MADA IMMO. Choisissez votre mot de passe "
+            f"pour accéder à votre bail, vos quittances et vos paiements :\n"
+            f"https://{settings.SITE_DOMAIN}{lien}\n\n"
+            f"Votre identifiant : {locataire.username}\n\nMADA IMMO",
+            settings.DEFAULT_FROM_EMAIL,
+            [locataire.email],
+            fail_silently=True,
+        )
+
+
+@shared_task(ignore_result=True)
+@mesurer_tache("attacher_quittances")
+def attacher_quittances(loyer_ids):
+    """Quittances des loyers soldés en masse (rapprochement de relevés)."""
+    from .services.quittance import attacher_quittance
+
+    for loyer in (
+        Loyer.objects.select_related("bail__bien__proprietaire", "bail__locataire")
+        .filter(pk__in=loyer_ids, statut="PAYE")
+        .filter(Q(quittance__isnull=True) | Q(quittance=""))
+    ):
+        try:
+            attacher_quittance(loyer)
+        except Exception:
+            logger.exception("Erreur génération quittance loyer %s", loyer.pk)
+
+
+@shared_task(ignore_result=True)
+@mesurer_tache("traiter_evenement_paiement")
+def traiter_evenement_paiement(evenement_id):
+    """Applique une notification de paiement reçue par webhook."""
+    from .services import webhooks
+
+    webhooks.traiter(evenement_id)
+
+
+@shared_task(ignore_result=True)
+@mesurer_tache("reprendre_evenements_paiement")
+def reprendre_evenements_paiement():
+    """Filet de sécurité : événements de paiement non traités ou en échec."""
+    from .services import webhooks
+
+    nombre = webhooks.reprendre()
+    if nombre:
+        logger.info("%s événement(s) de paiement repris.", nombre)
+
+
 @shared_task
+@mesurer_tache("envoyer_relances_paiement")
+@profiler_memoire_tache
 def envoyer_relances_paiement():
     """
     Envoie des relances pour les loyers en retard depuis au moins 5 jours,
@@ -51,6 +200,7 @@ def envoyer_relances_paiement():
                 "Impossible d'envoyer une relance pour le loyer %s : locataire sans email.",
                 loyer.pk,
             )
+            RELANCES.inc(statut="sans_email")
             continue
 
         # 2) Vérifier la dernière relance envoyée pour ce loyer
@@ -63,6 +213,7 @@ def envoyer_relances_paiement():
                     "Relance déjà envoyée récemment pour le loyer %s, on saute.",
                     loyer.pk,
                 )
+                RELANCES.inc(statut="ignoree")
                 continue
 
         # 3) Construire le mail
@@ -97,6 +248,7 @@ def envoyer_relances_paiement():
                 loyer.pk,
                 locataire.pk,
             )
+            RELANCES.inc(statut="envoyee")
         except Exception:
             HistoriqueRelance.objects.create(
                 loyer=loyer,
@@ -108,3 +260,4 @@ def envoyer_relances_paiement():
                 "Erreur lors de l'envoi de la relance pour le loyer %s.",
                 loyer.pk,
             )
+            RELANCES.inc(statut="echec")
@@ -0,0 +1,45 @@
+"""
+Photos responsives à partir des dérivés générés en tâche de fond.
+
+    {% load photos %}
+    {% photo_responsive bien.photo_principale alt=bien.titre sizes="(min-width: 1024px) 33vw, 100vw" class="..." %}
+    <img src="{{ photo.url }}" srcset="{{ photo|srcset:'jpeg' }}" sizes="100vw">
+
+Sans dérivés (photo trop récente), on retombe sur la photo d'origine.
+"""
+from django import template
+from django.utils.html import format_html
+
+from apps.core.services import images
+
+register = template.Library()
+
+
+@register.filter
+def srcset(fieldfile, format_image="webp"):
+    return images.srcset(images.derives(fieldfile), format_image)
+
+
+@register.simple_tag
+def photo_responsive(fieldfile, alt="", sizes="100vw", loading="lazy", **attributs):
+    if not fieldfile:
+        return ""
+    attributs_img = format_html(
+        'alt="{}" loading="{}" class="{}"', alt, loading, attributs.get("class", "")
+    )
+    urls = images.derives(fieldfile)
+    if not urls:
+        return format_html('<img src="{}" {}>', fieldfile.url, attributs_img)
+
+    # src : le dérivé JPEG le plus large (fallback des navigateurs sans srcset)
+    plus_large = max(urls["jpeg"], key=int)
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" {}></picture>',
+        images.srcset(urls, "webp"),
+        sizes,
+        urls["jpeg"][plus_large],
+        images.srcset(urls, "jpeg"),
+        sizes,
+        attributs_img,
+    )
@@ -1,11 +1,84 @@
-from datetime import date
+import io
+import json
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import zipfile
+from datetime import date, datetime, timedelta
 from decimal import Decimal
+from pathlib import Path
+from unittest import mock, skipUnless
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.auth.models import AnonymousUser, Group
+from django.contrib.sessions.backends.db import SessionStore
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.db import DatabaseError, connection, connections
+from django.shortcuts import render
+from django.template import Context, Template
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+import openpyxl
+from PIL import Image
 
 # Create your tests here.
-from .models import Bail, Bien, EtatDesLieux
+from . import cache as cache_public
+from . import metrics, partitions, slow_queries
+from .benchmark import comparer, percentile, resumer
+from .forms import DepenseForm
+from .metrics import RELANCES, TACHES_DUREE
+from .middleware import ReplicaSessionMiddleware
+from .models import (
+    Annonce, Bail, BailArchive, Bien, BienArchive, Depense, Document, EtatDesLieux, EvenementPaiement, ExportDocuments,
+    LigneReleve, Loyer, RequeteLente, Suppression, Televersement, Transaction,
+)
+from .profiling import ProfilMemoire, profiler_memoire_tache
+from .routers import demarrer_requete, terminer_requete, utiliser_replica
+from .services import archivage, export_documents, images, rapprochement, webhooks
+from .services import televersement as service_televersement
+from .services.import_portefeuille import importer
+
+
+class BailTestCase(TestCase):
+    """Bailleur, locataire, bien et bail 2025 (non signé) créés une fois par classe."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.bailleur = User.objects.create_user(username="bailleur", email="bailleur@example.com", password="pass1234")
+        cls.locataire = User.objects.create_user(
+            username="locataire", email="locataire@example.com", password="pass1234", phone_number="+221 77 123 45 67"
+        )
+        cls.bien = Bien.objects.create(
+            titre="F2", adresse="Mermoz", surface=40, loyer_ref=Decimal("90000"), proprietaire=cls.bailleur
+        )
+        cls.bail = Bail.objects.create(
+            bien=cls.bien, locataire=cls.locataire, date_debut=date(2025, 1, 1), date_fin=date(2025, 12, 31),
+            montant_loyer=Decimal("90000"), depot_garantie=Decimal("90000"),
+        )
+
+    def creer_loyer(self, mois, **champs):
+        champs.setdefault("montant_du", self.bail.montant_loyer)
+        return Loyer.objects.create(
+            bail=self.bail, periode_debut=date(2025, mois, 1), periode_fin=date(2025, mois, 28),
+            date_echeance=date(2025, mois, 5), **champs,
+        )
 
 
 class EtatDesLieuxModelTests(TestCase):
@@ -53,4 +126,1246 @@ class EtatDesLieuxModelTests(TestCase):
             checklist="",
         )
 
-        self.assertEqual(str(etat), f"EDL Entrée - {bail.id}")
\ No newline at end of file
+        self.assertEqual(str(etat), f"EDL Entrée - {bail.id}")
+
+
+class BenchmarkTests(TestCase):
+    def test_percentile_rang_le_plus_proche(self):
+        valeurs = [5, 1, 4, 2, 3, 10, 9, 8, 7, 6]
+        self.assertEqual(percentile(valeurs, 50), 5)
+        self.assertEqual(percentile(valeurs, 95), 10)
+        self.assertEqual(percentile(valeurs, 0), 1)
+        self.assertEqual(percentile([42], 99), 42)
+        self.assertIsNone(percentile([], 50))
+
+    def test_resumer(self):
+        resume = resumer([float(ms) for ms in range(1, 101)])
+        self.assertEqual(resume["n"], 100)
+        self.assertEqual((resume["min"], resume["max"], resume["moyenne"]), (1.0, 100.0, 50.5))
+        self.assertEqual((resume["p50"], resume["p90"], resume["p95"], resume["p99"]), (50.0, 90.0, 95.0, 99.0))
+
+    def test_comparer(self):
+        ancien = {"scenarios": {
+            "home": {"latence_ms": {"p50": 10.0, "p95": 20.0}, "requetes": 4, "memoire_pic_ko": 0},
+            "supprime": {"latence_ms": {"p50": 5.0}},
+        }}
+        nouveau = {"scenarios": {
+            "home": {"latence_ms": {"p50": 12.0, "p95": 15.0}, "requetes": 4, "memoire_pic_ko": 30.0},
+            "ajoute": {"requetes": 2},
+        }}
+        lignes = {(nom, metrique): (avant, apres, variation) for nom, metrique, avant, apres, variation in comparer(ancien, nouveau)}
+
+        self.assertEqual(lignes[("home", "p50")], (10.0, 12.0, 20.0))
+        self.assertEqual(lignes[("home", "p95")], (20.0, 15.0, -25.0))
+        self.assertEqual(lignes[("home", "requetes")], (4, 4, 0.0))
+        # Pas de variation sans référence (absente ou nulle)
+        self.assertEqual(lignes[("home", "memoire_pic_ko")], (0, 30.0, None))
+        self.assertEqual(lignes[("ajoute", "requetes")], (None, 2, None))
+        self.assertEqual(lignes[("supprime", "p50")], (5.0, None, None))
+        self.assertNotIn(("supprime", "p95"), lignes)
+
+    def test_home_mesure_la_vue_et_non_le_cache(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        sortie = f"{dossier}/bench.json"
+        call_command(
+            "bench", scenario=["home"], iterations=2, warmup=1, biens=5, output=sortie, stdout=io.StringIO()
+        )
+        with open(sortie, encoding="utf-8") as f:
+            mesure = json.load(f)["scenarios"]["home"]
+        self.assertEqual(mesure["statut"], 200)
+        self.assertGreater(mesure["requetes"], 0)
+
+
+@override_settings(
+    MIDDLEWARE=["apps.core.middleware.ProfilingMiddleware", *settings.MIDDLEWARE],
+    PROFILING_SAMPLE_RATE=1.0,
+)
+class ProfilingMiddlewareTests(TestCase):
+    def test_server_timing_header(self):
+        with self.assertLogs("apps.core.profiling", level="INFO") as logs:
+            response = self.client.get("/about/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("tpl;dur=", response["Server-Timing"])
+        self.assertIn("total;dur=", response["Server-Timing"])
+        self.assertIn('"vue": "about"', logs.output[0])
+
+    @override_settings(PROFILING_SLOW_MS=50)
+    def test_pile_capturee_pour_une_requete_lente(self):
+        def vue_lente(*args, **kwargs):
+            time.sleep(0.3)
+            return render(*args, **kwargs)
+
+        cache.clear()
+        self.addCleanup(cache.clear)
+        with mock.patch("apps.core.views.render", side_effect=vue_lente), \
+                self.assertLogs("apps.core.profiling", level="WARNING") as logs:
+            self.client.get("/about/")
+
+        ligne = json.loads(logs.output[0].split(":", 2)[2])
+        self.assertTrue(ligne["lente"])
+        self.assertIn("vue_lente", ligne["pile"])
+
+    def test_un_seul_thread_de_surveillance(self):
+        with self.assertLogs("apps.core.profiling", level="INFO"):
+            for _ in range(5):
+                self.client.get("/about/")
+        surveillants = [thread for thread in threading.enumerate() if thread.name == "profiling-piles"]
+        self.assertEqual(len(surveillants), 1)
+
+
+class ProfilMemoireTests(TestCase):
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        reglages = override_settings(MEMORY_PROFILE_DIR=Path(dossier))
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.dossier = Path(dossier)
+
+    def test_rapport_json(self):
+        with ProfilMemoire("essai") as profil:
+            tampon = bytearray(2 * 1024 * 1024)
+        del tampon
+
+        self.assertGreaterEqual(profil.rapport["pic_ko"], 2048)
+        self.assertTrue(profil.rapport["succes"])
+        self.assertEqual(json.loads(profil.chemin.read_text(encoding="utf-8"))["nom"], "essai")
+        self.assertEqual(profil.rapport["sites"][0]["fichier"], __file__)
+
+    def test_profil_imbrique_mesure_depuis_son_entree(self):
+        with ProfilMemoire("englobant") as englobant:
+            gros = bytearray(4 * 1024 * 1024)
+            with ProfilMemoire("imbrique") as imbrique:
+                petit = bytearray(1024 * 1024)
+                ligne_petit = sys._getframe().f_lineno - 1
+        del gros, petit
+
+        self.assertGreaterEqual(imbrique.rapport["pic_ko"], 1024)
+        self.assertLess(imbrique.rapport["pic_ko"], 2048)
+        self.assertEqual(
+            (imbrique.rapport["sites"][0]["fichier"], imbrique.rapport["sites"][0]["ligne"]), (__file__, ligne_petit)
+        )
+        # Le pic de l'englobant survit à la remise à zéro faite par l'imbriqué
+        self.assertGreaterEqual(englobant.rapport["pic_ko"], 5 * 1024)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    @override_settings(MEMORY_PROFILE_TASKS=True)
+    def test_decorateur_de_tache(self):
+        @profiler_memoire_tache
+        def ma_tache():
+            return 42
+
+        self.assertEqual(ma_tache(), 42)
+        self.assertEqual(len(list(self.dossier.glob("tache_ma_tache_*.json"))), 1)
+
+
+class GrandLivreTests(BailTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        get_user_model().objects.filter(pk=cls.locataire.pk).update(first_name="Awa", last_name="Diop")
+        cls.admin = get_user_model().objects.create_superuser(username="admin", password="pass1234")
+        loyer = Loyer.objects.create(
+            bail=cls.bail, periode_debut=date(2025, 6, 1), periode_fin=date(2025, 6, 30),
+            date_echeance=date(2025, 6, 5), montant_du=Decimal("90000"),
+        )
+        cls.transaction = Transaction.objects.create(
+            loyer=loyer, montant=Decimal("90000"), provider="WAVE", est_validee=True
+        )
+        Transaction.objects.create(loyer=loyer, montant=Decimal("1000"), provider="CASH")
+        cls.annee = cls.transaction.created_at.year
+        cls.depense = Depense.objects.create(
+            bien=cls.bien, type_depense="AUTRE", libelle="Robinet", montant=Decimal("15000"),
+            date_paiement=date(cls.annee, 3, 2),
+        )
+
+    def setUp(self):
+        dossier = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, dossier)
+        self.dossier = Path(dossier)
+
+    @staticmethod
+    def _lignes(source):
+        feuille = openpyxl.load_workbook(source).active
+        return feuille, [list(ligne) for ligne in feuille.iter_rows(values_only=True)]
+
+    def test_service_identique_a_l_ancienne_vue(self):
+        self.client.force_login(self.admin)
+        reponse = self.client.get("/comptabilite/grand-livre/export/", {"annee": self.annee})
+        feuille, lignes = self._lignes(io.BytesIO(reponse.content))
+
+        # Contenu et mise en forme de l'export tel que la vue le construisait
+        self.assertEqual(feuille.title, f"Grand Livre {self.annee}")
+        self.assertEqual(lignes, [
+            ["Date", "Type", "Libellé / Tiers", "Bien concerné", "Recette (Crédit)", "Dépense (Débit)"],
+            [
+                datetime.combine(self.transaction.created_at.date(), datetime.min.time()), "RECETTE",
+                "Loyer 06/2025 - Awa Diop", "F2", 90000, 0,
+            ],
+            [
+                datetime(self.annee, 3, 2), "DEPENSE", f"{self.depense.get_type_depense_display()} : Robinet",
+                "F2", 0, 15000,
+            ],
+        ])
+        self.assertEqual(feuille["E2"].number_format, '#,##0 "FCFA"')
+        self.assertEqual(feuille["A1"].fill.start_color.rgb[-6:], "10B981")
+        self.assertEqual(feuille.column_dimensions["C"].width, 48)
+
+    def test_commande_avec_profil_memoire(self):
+        sortie = io.StringIO()
+        fichier = self.dossier / "gl.xlsx"
+        with override_settings(MEMORY_PROFILE_DIR=self.dossier):
+            call_command(
+                "export_grand_livre", "--profile-memory", annee=self.annee, output=str(fichier), stdout=sortie
+            )
+
+        self.assertIn("Mémoire : pic", sortie.getvalue())
+        rapport, = self.dossier.glob("commande_export_grand_livre_*.json")
+        self.assertGreater(json.loads(rapport.read_text(encoding="utf-8"))["pic_ko"], 0)
+
+        self.client.force_login(self.admin)
+        reponse = self.client.get("/comptabilite/grand-livre/export/", {"annee": self.annee})
+        self.assertEqual(self._lignes(fichier)[1], self._lignes(io.BytesIO(reponse.content))[1])
+
+
+@override_settings(METRICS_ENABLED=True, METRICS_BACKEND="memory", METRICS_TOKEN="secret")
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics.reinitialiser_backend()
+        self.addCleanup(metrics.reinitialiser_backend)
+
+    def test_exposition_prometheus(self):
+        RELANCES.inc(statut="envoyee")
+        RELANCES.inc(statut="envoyee")
+        TACHES_DUREE.observe(0.2, tache="generer_loyers")
+
+        response = self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer secret")
+
+        self.assertEqual(response.status_code, 200)
+        contenu = response.content.decode()
+        self.assertIn('mada_relances_total{statut="envoyee"} 2', contenu)
+        self.assertIn('mada_taches_duree_secondes_bucket{tache="generer_loyers",le="0.1"} 0', contenu)
+        self.assertIn('mada_taches_duree_secondes_bucket{tache="generer_loyers",le="0.25"} 1', contenu)
+        self.assertIn('mada_taches_duree_secondes_count{tache="generer_loyers"} 1', contenu)
+
+    def test_acces_refuse_sans_jeton(self):
+        self.assertEqual(self.client.get("/metrics/").status_code, 403)
+        self.assertEqual(self.client.get("/metrics/", HTTP_AUTHORIZATION="Bearer secreT").status_code, 403)
+
+
+@override_settings(SLOW_QUERY_MS=0, SLOW_QUERY_MAX_ROWS=5)
+class RequetesLentesTests(TestCase):
+    def setUp(self):
+        slow_queries.installer(connection)
+        self.addCleanup(connection.execute_wrappers.remove, slow_queries.enregistrer_si_lente)
+
+    def _requetes_disponibles(self, nombre=1):
+        jeton = slow_queries.definir_contexte("vue:test")
+        try:
+            # Écriture différée au commit de la transaction appelante
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(nombre):
+                    list(Bien.objects.disponibles())
+        finally:
+            slow_queries.reinitialiser_contexte(jeton)
+        return RequeteLente.objects.filter(contexte="vue:test")
+
+    def test_capture_avec_plan(self):
+        captures = self._requetes_disponibles()
+        self.assertTrue(captures.exists())
+        self.assertNotEqual(captures.first().plan, "")
+        self.assertEqual(captures.first().base, "default")
+
+    def test_table_circulaire_reduite_par_la_purge(self):
+        captures = self._requetes_disponibles(10)
+        self.assertEqual(len({c.empreinte for c in captures}), 1)
+        self.assertGreater(RequeteLente.objects.count(), 5)
+
+        slow_queries.purger()
+        self.assertEqual(RequeteLente.objects.count(), 5)
+
+    def test_explain_en_echec_sans_effet_sur_la_requete(self):
+        with mock.patch.object(slow_queries, "_expliquer", side_effect=DatabaseError("timeout")), \
+                self.assertLogs("apps.core.slow_queries", level="WARNING"):
+            captures = self._requetes_disponibles()
+        self.assertEqual(captures.first().plan, "")
+        self.assertEqual(Bien.objects.count(), 0)
+
+    def test_pas_d_explain_sur_verrou_ni_ecriture(self):
+        self.assertTrue(slow_queries._expliquable("SELECT * FROM t WHERE id = %s", False))
+        self.assertFalse(slow_queries._expliquable("SELECT * FROM t WHERE id = %s FOR UPDATE", False))
+        self.assertFalse(slow_queries._expliquable("SELECT * FROM t FOR NO KEY UPDATE SKIP LOCKED", False))
+        self.assertFalse(slow_queries._expliquable("UPDATE t SET nom = %s", False))
+        self.assertFalse(slow_queries._expliquable("SELECT 1", True))
+
+    def test_normalisation(self):
+        self.assertEqual(
+            slow_queries.empreinte("SELECT * FROM t WHERE id IN (%s, %s) AND nom = 'a'"),
+            slow_queries.empreinte("SELECT * FROM t WHERE id IN (%s)  AND nom = 'bb'"),
+        )
+
+
+class CachePublicTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_page_accueil_invalidee_par_signal(self):
+        self.assertEqual(self.client.get("/", {"sort": "prix", "q": ""})["X-Cache"], "MISS")
+        # Query string normalisée : l'ordre des paramètres est indifférent
+        self.assertEqual(self.client.get("/?q=&sort=prix")["X-Cache"], "HIT")
+
+        proprietaire = get_user_model().objects.create_user(username="owner", password="pass1234")
+        Bien.objects.create(
+            titre="Studio",
+            adresse="2 rue Carnot",
+            ville="Thiès",
+            surface=20,
+            nb_pieces=1,
+            loyer_ref=Decimal("50000"),
+            proprietaire=proprietaire,
+        )
+        self.assertEqual(self.client.get("/?q=&sort=prix")["X-Cache"], "MISS")
+
+    def test_utilisateur_connecte_non_cache(self):
+        user = get_user_model().objects.create_user(username="u", password="pass1234")
+        self.client.force_login(user)
+        self.assertNotIn("X-Cache", self.client.get("/about/"))
+
+    def test_en_tetes_rejoues_sur_hit(self):
+        @cache_public.cache_publique(cache_public.PAGES)
+        def vue(request):
+            reponse = HttpResponse("<urlset/>", content_type="application/xml")
+            reponse["X-Robots-Tag"] = "noindex, noodp"
+            reponse["Last-Modified"] = "Wed, 01 Jan 2025 00:00:00 GMT"
+            return reponse
+
+        for attendu in ("MISS", "HIT"):
+            requete = RequestFactory().get("/sitemap.xml")
+            requete.user = AnonymousUser()
+            reponse = vue(requete)
+            self.assertEqual(reponse["X-Cache"], attendu)
+            self.assertEqual(reponse["Content-Type"], "application/xml")
+            self.assertEqual(reponse["X-Robots-Tag"], "noindex, noodp")
+            self.assertEqual(reponse["Last-Modified"], "Wed, 01 Jan 2025 00:00:00 GMT")
+
+
+class SitemapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        proprietaire = get_user_model().objects.create_user(username="owner", password="pass1234")
+        bien = Bien.objects.create(
+            titre="Villa",
+            adresse="3 corniche",
+            ville="Dakar",
+            surface=120,
+            loyer_ref=Decimal("400000"),
+            proprietaire=proprietaire,
+        )
+        cls.annonce = Annonce.objects.create(bien=bien, titre="Villa", prix=Decimal("400000"), statut="PUBLIE")
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_index_et_section_biens(self):
+        for _ in range(2):  # MISS puis HIT : mêmes en-têtes
+            index = self.client.get("/sitemap.xml")
+            self.assertContains(index, "/sitemap-biens.xml")
+            self.assertContains(index, "<lastmod>")
+            self.assertIn("noindex", index["X-Robots-Tag"])
+        self.assertEqual(index["X-Cache"], "HIT")
+
+        section = self.client.get("/sitemap-biens.xml")
+        self.assertContains(section, f"/annonce/{self.annonce.pk}/")
+
+    def test_fichiers_generes_servis_sans_redemarrage(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        with override_settings(MEDIA_ROOT=media):
+            self.assertEqual(self.client.get("/sitemaps/sitemap.xml").status_code, 404)
+            call_command("generer_sitemaps", domaine="example.com", stdout=io.StringIO())
+
+            index = self.client.get("/sitemaps/sitemap.xml")
+            self.assertEqual(index["Content-Type"], "application/xml")
+            self.assertIn("Last-Modified", index)
+            self.assertIn(b"https://example.com/sitemaps/sitemap-biens-1.xml", b"".join(index.streaming_content))
+            section = self.client.get("/sitemaps/sitemap-biens-1.xml")
+            self.assertIn(f"/annonce/{self.annonce.pk}/".encode(), b"".join(section.streaming_content))
+        self.assertEqual(self.client.get("/sitemaps/../settings.py").status_code, 404)
+
+
+class ConnexionsBaseDeDonneesTests(SimpleTestCase):
+    FICHIER_SETTINGS = str(Path(settings.BASE_DIR) / "config" / "settings.py")
+    ENV_POSTGRESQL = {
+        "SECRET_KEY": "test",
+        "DEBUG": "False",
+        "DB_NAME": "immo",
+        "DB_USER": "immo",
+        "DB_PASSWORD": "secret",
+        "DB_REPLICA_HOST": "replica.local",
+        "EMAIL_HOST_USER": "immo@example.com",
+        "EMAIL_HOST_PASSWORD": "secret",
+    }
+
+    def _databases(self, **env):
+        with mock.patch.dict(os.environ, {**self.ENV_POSTGRESQL, **env}, clear=True):
+            return runpy.run_path(self.FICHIER_SETTINGS)["DATABASES"]
+
+    def test_modes_par_type_de_processus(self):
+        attendus = {"web": (60, 2, 10), "worker": (300, 1, 4), "beat": (0, 0, 2)}
+        for type_processus, (max_age, min_size, max_size) in attendus.items():
+            with self.subTest(mode="none", type=type_processus):
+                databases = self._databases(DB_POOL_MODE="none", DB_PROCESS_TYPE=type_processus)
+                for alias in ("default", "replica"):
+                    self.assertNotIn("CONN_MAX_AGE", databases[alias])
+                    self.assertNotIn("OPTIONS", databases[alias])
+
+            with self.subTest(mode="persistent", type=type_processus):
+                databases = self._databases(DB_POOL_MODE="persistent", DB_PROCESS_TYPE=type_processus)
+                for alias in ("default", "replica"):
+                    self.assertEqual(databases[alias]["CONN_MAX_AGE"], max_age)
+                    self.assertIs(databases[alias]["CONN_HEALTH_CHECKS"], True)
+                    self.assertNotIn("OPTIONS", databases[alias])
+
+            with self.subTest(mode="pool", type=type_processus):
+                databases = self._databases(DB_POOL_MODE="pool", DB_PROCESS_TYPE=type_processus)
+                for alias in ("default", "replica"):
+                    self.assertEqual(databases[alias]["CONN_MAX_AGE"], 0)
+                    pool = databases[alias]["OPTIONS"]["pool"]
+                    self.assertEqual((pool["min_size"], pool["max_size"]), (min_size, max_size))
+                    self.assertEqual(pool["timeout"], 10)
+
+    def test_persistent_par_defaut(self):
+        databases = self._databases()
+        self.assertEqual(databases["default"]["CONN_MAX_AGE"], 60)
+        self.assertIs(databases["default"]["CONN_HEALTH_CHECKS"], True)
+
+    def test_surcharges_par_type_puis_globales(self):
+        databases = self._databases(
+            DB_POOL_MODE="pool",
+            DB_PROCESS_TYPE="worker",
+            DB_POOL_MAX_SIZE_WORKER="8",
+            DB_POOL_MAX_SIZE="20",
+            DB_POOL_MIN_SIZE="3",
+            DB_POOL_TIMEOUT="5",
+        )
+        pool = databases["default"]["OPTIONS"]["pool"]
+        self.assertEqual((pool["min_size"], pool["max_size"], pool["timeout"]), (3, 8, 5))
+
+    def test_pool_ignore_hors_postgresql(self):
+        databases = self._databases(DEBUG="True", DB_POOL_MODE="pool")
+        self.assertEqual(databases["default"]["ENGINE"], "django.db.backends.sqlite3")
+        self.assertNotIn("OPTIONS", databases["default"])
+
+    def test_mode_invalide(self):
+        with self.assertRaisesMessage(ImproperlyConfigured, "DB_POOL_MODE invalide"):
+            self._databases(DB_POOL_MODE="pgbouncer")
+
+
+@skipUnless("replica_test" in settings.DATABASES, "alias miroir déclaré par config/settings_test.py")
+@override_settings(REPLICA_DB_ALIAS="replica_test")
+class ReplicaRouterTests(TransactionTestCase):
+    # "replica_test" : miroir de "default" ; TransactionTestCase pour que les
+    # écritures soient validées et donc visibles depuis la connexion de la réplique
+    databases = {"default", "replica_test"}
+
+    def setUp(self):
+        proprietaire = get_user_model().objects.create_user(username="owner", password="pass1234")
+        self.bien = Bien.objects.create(
+            titre="F3",
+            adresse="1 rue",
+            ville="Dakar",
+            surface=60,
+            loyer_ref=Decimal("150000"),
+            proprietaire=proprietaire,
+        )
+
+    def _lire_bien(self):
+        with CaptureQueriesContext(connections["replica_test"]) as replique:
+            bien = Bien.objects.get(pk=self.bien.pk)
+        return bien, len(replique.captured_queries)
+
+    def test_lectures_sur_default_hors_bloc_marque(self):
+        bien, requetes_replique = self._lire_bien()
+        self.assertEqual(bien._state.db, "default")
+        self.assertEqual(requetes_replique, 0)
+
+    def test_lectures_du_bloc_sur_la_replique(self):
+        with utiliser_replica():
+            bien, requetes_replique = self._lire_bien()
+        self.assertEqual(bien._state.db, "replica_test")
+        self.assertEqual(bien.titre, "F3")
+        self.assertEqual(requetes_replique, 1)
+
+    def test_decorateur(self):
+        @utiliser_replica()
+        def reporting():
+            return self._lire_bien()
+
+        self.assertEqual(reporting()[0]._state.db, "replica_test")
+        self.assertEqual(self._lire_bien()[0]._state.db, "default")
+
+    def test_lectures_apres_ecriture_sur_default(self):
+        jeton, etat = demarrer_requete()
+        try:
+            with utiliser_replica():
+                self.assertEqual(self._lire_bien()[1], 1)
+                with CaptureQueriesContext(connections["replica_test"]) as replique:
+                    Bien.objects.filter(pk=self.bien.pk).update(titre="F3 rénové")
+                self.assertEqual(replique.captured_queries, [])
+                self.assertTrue(etat["ecriture"])
+                bien, requetes_replique = self._lire_bien()
+                self.assertEqual((bien.titre, requetes_replique), ("F3 rénové", 0))
+        finally:
+            terminer_requete(jeton)
+
+    def test_primaire_force_par_la_session(self):
+        jeton, _ = demarrer_requete(forcer_primaire=True)
+        try:
+            with utiliser_replica():
+                self.assertEqual(self._lire_bien()[1], 0)
+        finally:
+            terminer_requete(jeton)
+
+    @override_settings(REPLICA_DB_ALIAS="absente")
+    def test_sans_replique_configuree(self):
+        with utiliser_replica():
+            self.assertEqual(self._lire_bien()[1], 0)
+
+    # --- ReplicaSessionMiddleware ---
+
+    def _traiter(self, vue, cookie=None):
+        requete = RequestFactory().post("/webhooks/paiement/")
+        if cookie:
+            requete.COOKIES[settings.SESSION_COOKIE_NAME] = cookie
+        chaine = SessionMiddleware(ReplicaSessionMiddleware(AuthenticationMiddleware(vue)))
+        return requete, chaine(requete)
+
+    def _ecrire(self, requete):
+        Bien.objects.filter(pk=self.bien.pk).update(titre="F3 rénové")
+        return HttpResponse()
+
+    def test_ecriture_anonyme_sans_session(self):
+        def webhook(requete):
+            # APIView sans authentification : DRF remplace request.user par AnonymousUser()
+            requete.user = AnonymousUser()
+            return self._ecrire(requete)
+
+        requete, reponse = self._traiter(webhook)
+        self.assertFalse(requete.session.accessed)
+        self.assertFalse(reponse.has_header("Vary"))
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, reponse.cookies)
+        self.assertFalse(Session.objects.exists())
+
+    def test_ecriture_authentifiee_force_le_primaire_ensuite(self):
+        self.client.force_login(get_user_model().objects.get(username="owner"))
+        cookie = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+
+        self._traiter(self._ecrire, cookie)
+        self.assertIn(ReplicaSessionMiddleware.CLE_SESSION, SessionStore(cookie).load())
+
+        lectures = []
+
+        @utiliser_replica()
+        def reporting(requete):
+            lectures.append(self._lire_bien()[1])
+            return HttpResponse()
+
+        self._traiter(reporting, cookie)
+        self.assertEqual(lectures, [0])
+
+    @override_settings(REPLICA_DB_ALIAS="absente")
+    def test_session_ignoree_sans_replique(self):
+        self.client.force_login(get_user_model().objects.get(username="owner"))
+        cookie = self.client.cookies[settings.SESSION_COOKIE_NAME].value
+
+        self._traiter(self._ecrire, cookie)
+        self.assertNotIn(ReplicaSessionMiddleware.CLE_SESSION, SessionStore(cookie).load())
+
+
+class SuppressionSyncTests(BailTestCase):
+    def test_soft_delete_bail_trace_bail_et_loyers(self):
+        loyer = self.creer_loyer(1)
+        avant = self.bail.updated_at
+
+        self.bail.delete()
+
+        self.bail.refresh_from_db()
+        self.assertGreater(self.bail.updated_at, avant)
+        self.assertEqual(
+            set(Suppression.objects.filter(locataire=self.locataire).values_list("type_objet", "objet_id")),
+            {("bail", self.bail.pk), ("loyer", loyer.pk)},
+        )
+
+    def test_suppression_definitive_du_bail(self):
+        Bail.all_objects.filter(pk=self.bail.pk).delete()
+        self.assertTrue(
+            Suppression.objects.filter(type_objet="bail", objet_id=self.bail.pk, locataire=self.locataire).exists()
+        )
+
+    def test_suppression_loyers_une_lecture_par_loyer(self):
+        loyer_ids = [self.creer_loyer(mois).pk for mois in (1, 2, 3)]
+
+        with CaptureQueriesContext(connection) as requetes:
+            Loyer.objects.filter(bail=self.bail).delete()
+
+        self.assertEqual(
+            set(Suppression.objects.filter(locataire=self.locataire).values_list("type_objet", "objet_id")),
+            {("loyer", pk) for pk in loyer_ids},
+        )
+        # Le locataire est lu une fois par loyer (partagé entre les receivers), sans charger le bail
+        lectures_bail = [
+            q["sql"] for q in requetes.captured_queries
+            if q["sql"].startswith("SELECT") and 'FROM "core_bail"' in q["sql"]
+        ]
+        self.assertEqual(len(lectures_bail), len(loyer_ids))
+        self.assertTrue(all(sql.startswith('SELECT "core_bail"."locataire_id" AS') for sql in lectures_bail))
+
+
+class DerivesImagesTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        reglages = override_settings(MEDIA_ROOT=media, IMAGE_DERIVES_LARGEURS=(320, 640, 4000))
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def _photo(self):
+        tampon = io.BytesIO()
+        Image.new("RGB", (1600, 1200), "navy").save(tampon, "JPEG")
+        return default_storage.save("biens/salon.jpg", ContentFile(tampon.getvalue()))
+
+    def test_derives_generes_une_seule_fois(self):
+        nom = self._photo()
+        manifeste = images.generer_derives(nom)
+
+        # Pas d'agrandissement : 4000 est ramené à la largeur de l'original
+        self.assertEqual(set(manifeste["fichiers"]["webp"]), {"320", "640", "1600"})
+        self.assertTrue(default_storage.exists(manifeste["fichiers"]["jpeg"]["320"]))
+
+        with mock.patch.object(images, "_encoder") as encoder:
+            self.assertEqual(images.generer_derives(nom), manifeste)
+        encoder.assert_not_called()
+
+    def test_balise_photo_responsive(self):
+        nom = self._photo()
+        gabarit = Template("{% load photos %}{% photo_responsive photo alt='Salon' %}")
+        bien = Bien(photo_principale=nom)
+
+        self.assertNotIn("<picture>", gabarit.render(Context({"photo": bien.photo_principale})))
+
+        images.generer_derives(nom)
+        html = gabarit.render(Context({"photo": bien.photo_principale}))
+        self.assertIn('<source type="image/webp" srcset="/media/derives/biens/salon.jpg/320.webp 320w', html)
+        self.assertIn('alt="Salon"', html)
+
+    def test_photo_remplacee_supprime_les_anciens_derives(self):
+        def jpeg():
+            tampon = io.BytesIO()
+            Image.new("RGB", (800, 600), "navy").save(tampon, "JPEG")
+            return ContentFile(tampon.getvalue(), name="salon.jpg")
+
+        proprietaire = get_user_model().objects.create_user(username="owner", password="pass1234")
+        with mock.patch("apps.core.tasks.generer_derives_image.delay"), \
+                self.captureOnCommitCallbacks(execute=True):
+            bien = Bien.objects.create(
+                titre="F3", adresse="1 rue", ville="Dakar", surface=60,
+                loyer_ref=Decimal("150000"), proprietaire=proprietaire, photo_principale=jpeg(),
+            )
+        ancien = bien.photo_principale.name
+        images.generer_derives(ancien)
+        self.assertTrue(default_storage.exists(f"derives/{ancien}/320.webp"))
+
+        # Sauvegarde sans nouvelle photo : rien à supprimer
+        with self.captureOnCommitCallbacks(execute=True):
+            bien.save()
+        self.assertIsNotNone(images.manifeste(ancien))
+
+        bien.photo_principale = jpeg()
+        with mock.patch("apps.core.tasks.generer_derives_image.delay"), \
+                self.captureOnCommitCallbacks(execute=True):
+            bien.save()
+        self.assertNotEqual(bien.photo_principale.name, ancien)
+        self.assertIsNone(images.manifeste(ancien))
+        self.assertFalse(default_storage.exists(f"derives/{ancien}/320.webp"))
+
+
+class TeleversementTests(BailTestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        reglages = override_settings(MEDIA_ROOT=media, TELEVERSEMENT_TAILLE_MORCEAU=1024)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.client.force_login(self.bailleur)
+        self.contenu = b"%PDF-1.4\n" + b"x" * 2500
+
+    def _creer(self, cible="depense.justificatif"):
+        reponse = self.client.post(
+            "/api/televersements/",
+            {"cible": cible, "nom_original": "facture.pdf", "type_mime": "application/pdf", "taille": len(self.contenu)},
+            content_type="application/json",
+        )
+        self.assertEqual(reponse.status_code, 201)
+        return reponse["Location"]
+
+    def _patch(self, url, offset, morceau):
+        return self.client.patch(
+            url, morceau, content_type="application/offset+octet-stream", headers={"Upload-Offset": str(offset)}
+        )
+
+    def _envoyer(self, url):
+        for offset in range(0, len(self.contenu), 1024):
+            reponse = self._patch(url, offset, self.contenu[offset:offset + 1024])
+        return reponse
+
+    def test_envoi_par_morceaux_et_reprise(self):
+        url = self._creer()
+        self.assertEqual(self._patch(url, 0, self.contenu[:1024])["Upload-Offset"], "1024")
+
+        # Morceau renvoyé après une coupure : le serveur indique où reprendre
+        conflit = self._patch(url, 0, self.contenu[:1024])
+        self.assertEqual(conflit.status_code, 409)
+        self.assertEqual(self.client.head(url)["Upload-Offset"], "1024")
+        self.assertEqual(self._patch(url, 1024, b"x" * 2000).status_code, 413)
+
+        self._patch(url, 1024, self.contenu[1024:2048])
+        fin = self._patch(url, 2048, self.contenu[2048:])
+        self.assertEqual(fin.json()["statut"], "TERMINE")
+
+        envoi = Televersement.objects.get()
+        self.assertTrue(envoi.fichier.startswith("depenses/justificatifs/"))
+        with default_storage.open(envoi.fichier) as f:
+            self.assertEqual(f.read(), self.contenu)
+        self.assertFalse(default_storage.listdir(f"televersements/{envoi.pk}")[1])
+
+    def test_type_verifie(self):
+        url = self._creer()
+        self.assertEqual(self._patch(url, 0, b"MZ" + self.contenu[2:1024]).status_code, 400)
+
+    def test_rattachement_par_formulaire(self):
+        self._envoyer(self._creer())
+        envoi = Televersement.objects.get()
+        donnees = {
+            "bien": self.bien.pk, "type_depense": "AUTRE", "libelle": "Robinet", "montant": "15000",
+            "date_paiement": "2025-06-01", "justificatif_televersement": str(envoi.pk),
+        }
+        self.assertFalse(DepenseForm(donnees, user=self.locataire).is_valid())
+
+        form = DepenseForm(donnees, user=self.bailleur)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save().justificatif.name, envoi.fichier)
+
+    def test_rattachement_immediat_visible_par_la_synchronisation(self):
+        politique = {
+            **service_televersement.POLITIQUES["bail.fichier_contrat"],
+            "rattacher_a": lambda utilisateur: Bail.objects.get(pk=self.bail.pk),
+        }
+        avant = self.bail.updated_at
+        with mock.patch.dict(service_televersement.POLITIQUES, {"bail.fichier_contrat": politique}):
+            self._envoyer(self._creer("bail.fichier_contrat"))
+
+        self.bail.refresh_from_db()
+        self.assertEqual(self.bail.fichier_contrat.name, Televersement.objects.get().fichier)
+        self.assertGreater(self.bail.updated_at, avant)
+
+
+class GedTests(BailTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        bailleurs, _ = Group.objects.get_or_create(name="BAILLEUR")
+        locataires, _ = Group.objects.get_or_create(name="LOCATAIRE")
+        cls.bailleur.groups.add(bailleurs)
+        cls.locataire.groups.add(locataires)
+        cls.autre = get_user_model().objects.create_user(username="autre", password="pass1234")
+        cls.autre.groups.add(locataires)
+
+    def _deposer_contrat(self):
+        self.bail.fichier_contrat.name = "baux/contrat.pdf"
+        self.bail.save()
+
+    def test_index_tenu_par_les_signaux(self):
+        self.assertFalse(Document.objects.exists())
+        self._deposer_contrat()
+        document = Document.objects.get(type_document="CONTRAT", objet_id=self.bail.pk)
+        self.assertEqual(document.proprietaire, self.bailleur)
+        self.assertEqual(document.locataire, self.locataire)
+
+        self.bail.fichier_contrat = None
+        self.bail.save()
+        self.assertFalse(Document.objects.exists())
+
+    def test_liste_restreinte_au_role(self):
+        self._deposer_contrat()
+        for user, attendu in ((self.bailleur, 1), (self.locataire, 1), (self.autre, 0)):
+            with self.subTest(user=user.username):
+                self.client.force_login(user)
+                reponse = self.client.get("/documents/", {"type": "CONTRAT", "annee": "2025"})
+                self.assertEqual(len(reponse.context["documents"]), attendu)
+
+    def test_reindexation_retire_les_orphelins(self):
+        self._deposer_contrat()
+        # Fichier retiré hors de l'ORM : les signaux ne l'ont pas vu
+        Bail.objects.filter(pk=self.bail.pk).update(fichier_contrat="")
+        sortie = io.StringIO()
+        call_command("indexer_documents", sans_taille=True, stdout=sortie)
+        self.assertIn("CONTRAT : 0 indexé(s), 1 retiré(s)", sortie.getvalue())
+        self.assertFalse(Document.objects.exists())
+
+        Bail.objects.filter(pk=self.bail.pk).update(fichier_contrat="baux/contrat.pdf")
+        call_command("indexer_documents", sans_taille=True, stdout=sortie)
+        self.assertIn("CONTRAT : 1 indexé(s), 0 retiré(s)", sortie.getvalue())
+        self.assertEqual(Document.objects.get().objet_id, self.bail.pk)
+
+    def _exporter_depuis_un_media_temporaire(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        reglages = override_settings(MEDIA_ROOT=media, EXPORT_DOCUMENTS_SEUIL_DIRECT=1)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+        self.bail.fichier_contrat.save("contrat.pdf", ContentFile(b"%PDF-1.4 contrat"))
+
+    def test_export_zip_en_flux(self):
+        self._exporter_depuis_un_media_temporaire()
+        self.client.force_login(self.locataire)
+        reponse = self.client.post("/documents/export/", {"annee": "2025"})
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(reponse.streaming_content)))
+        self.assertEqual(archive.namelist(), [f"2025/contrats/f2_2025-01_{self.bail.pk}.pdf"])
+        self.assertEqual(archive.read(archive.namelist()[0]), b"%PDF-1.4 contrat")
+
+    def test_export_au_dela_du_seuil_prepare_en_tache_de_fond(self):
+        self._exporter_depuis_un_media_temporaire()
+        self.client.force_login(self.locataire)
+        with mock.patch("apps.core.views.exporter_documents.delay") as delay, \
+                override_settings(EXPORT_DOCUMENTS_SEUIL_DIRECT=0), \
+                self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/documents/export/", {"proprietaire": str(self.bailleur.pk)})
+        export = ExportDocuments.objects.get()
+        delay.assert_called_once_with(str(export.pk))
+
+        export_documents.executer(export)
+        self.assertEqual(export.nb_documents, 1)
+        with default_storage.open(export.fichier) as f:
+            self.assertIsNone(zipfile.ZipFile(f).testzip())
+
+    def test_lien_d_export_reserve_au_demandeur(self):
+        self._exporter_depuis_un_media_temporaire()
+        export = ExportDocuments.objects.create(utilisateur=self.locataire, filtres={"annee": "2025"})
+        export_documents.executer(export)
+        self.client.force_login(self.locataire)
+        self.assertEqual(self.client.get(export.get_absolute_url()).status_code, 200)
+        self.client.force_login(self.autre)
+        self.assertEqual(self.client.get(export.get_absolute_url()).status_code, 404)
+
+
+class RepartitionMediasTests(BailTestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        reglages = override_settings(MEDIA_ROOT=media)
+        reglages.enable()
+        self.addCleanup(reglages.disable)
+
+    def _deposer_avant_decoupage(self, contenu=b"%PDF ancien"):
+        ancien = default_storage.save("baux_signes/ancien.pdf", ContentFile(contenu))
+        Bail.objects.filter(pk=self.bail.pk).update(fichier_contrat=ancien)
+        Document.objects.filter(objet_id=self.bail.pk).update(fichier=ancien)
+        return ancien
+
+    def _repartir(self, **options):
+        sortie = io.StringIO()
+        call_command("repartir_medias", stdout=sortie, **options)
+        self.bail.refresh_from_db()
+        return sortie.getvalue()
+
+    def test_upload_to_reparti(self):
+        self.bail.fichier_contrat.save("contrat.pdf", ContentFile(b"%PDF nouveau"))
+        self.assertRegex(self.bail.fichier_contrat.name, r"^baux_signes/\d{4}/\d{2}/[0-9a-f]{2}/contrat\.pdf$")
+
+    def test_migration_des_fichiers_existants(self):
+        self.bail.fichier_contrat.save("contrat.pdf", ContentFile(b"%PDF nouveau"))
+        ancien = self._deposer_avant_decoupage()
+        avant = Bail.objects.get(pk=self.bail.pk).updated_at
+
+        self._repartir(lot=1)
+        self.assertRegex(self.bail.fichier_contrat.name, r"^baux_signes/\d{4}/\d{2}/[0-9a-f]{2}/ancien\.pdf$")
+        self.assertEqual(self.bail.fichier_contrat.read(), b"%PDF ancien")
+        self.assertFalse(default_storage.exists(ancien))
+        self.assertEqual(Document.objects.get(objet_id=self.bail.pk).fichier, self.bail.fichier_contrat.name)
+        # Remonté par la synchronisation mobile malgré bulk_update
+        self.assertGreater(self.bail.updated_at, avant)
+
+        self.assertIn("core.Bail.fichier_contrat : 0 fichier(s)", self._repartir(dry_run=True))
+
+    def test_homonyme_de_meme_taille_non_reutilise(self):
+        ancien = self._deposer_avant_decoupage()
+        upload_to = Bail._meta.get_field("fichier_contrat").upload_to
+        homonyme = default_storage.save(
+            upload_to.chemin(ancien, default_storage.get_modified_time(ancien)), ContentFile(b"%PDF autre!")
+        )
+
+        self._repartir()
+        self.assertNotEqual(self.bail.fichier_contrat.name, homonyme)
+        self.assertEqual(self.bail.fichier_contrat.read(), b"%PDF ancien")
+        with default_storage.open(homonyme) as f:
+            self.assertEqual(f.read(), b"%PDF autre!")
+
+    def test_copie_d_un_lot_interrompu_reutilisee(self):
+        ancien = self._deposer_avant_decoupage()
+        upload_to = Bail._meta.get_field("fichier_contrat").upload_to
+        copie = default_storage.save(
+            upload_to.chemin(ancien, default_storage.get_modified_time(ancien)), ContentFile(b"%PDF ancien")
+        )
+
+        self._repartir()
+        self.assertEqual(self.bail.fichier_contrat.name, copie)
+        self.assertEqual(default_storage.listdir(copie.rsplit("/", 1)[0])[1], ["ancien.pdf"])
+
+
+class ArchivageTests(BailTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # Bail avec loyers : historique comptable, jamais archivé
+        cls.bien_loue = Bien.objects.create(
+            titre="F3", adresse="Marcory", surface=70, loyer_ref=Decimal("1"), proprietaire=cls.bailleur
+        )
+        cls.bail_paye = Bail.objects.create(
+            bien=cls.bien_loue, locataire=cls.locataire, date_debut=date(2025, 1, 1), date_fin=date(2025, 12, 31),
+            montant_loyer=Decimal("1"), depot_garantie=Decimal("1"),
+        )
+        Loyer.objects.create(
+            bail=cls.bail_paye, periode_debut=date(2025, 1, 1), periode_fin=date(2025, 1, 31),
+            date_echeance=date(2025, 1, 5), montant_du=Decimal("1"),
+        )
+
+    def _supprimer(self, il_y_a):
+        quand = timezone.now() - il_y_a
+        Bail.all_objects.update(deleted_at=quand)
+        Bien.all_objects.update(deleted_at=quand)
+        call_command("archiver_supprimes", stdout=io.StringIO())
+
+    def test_lignes_supprimees_anciennes_archivees(self):
+        self._supprimer(timedelta(days=400))
+        self.assertEqual(list(Bail.all_objects.values_list("pk", flat=True)), [self.bail_paye.pk])
+        self.assertEqual(list(Bien.all_objects.values_list("pk", flat=True)), [self.bien_loue.pk])
+        self.assertEqual(BailArchive.objects.get().donnees["fields"]["montant_loyer"], "90000")
+
+    def test_suppression_recente_conservee(self):
+        self._supprimer(timedelta(days=1))
+        self.assertEqual(Bail.all_objects.count(), 2)
+        self.assertFalse(BailArchive.objects.exists())
+
+    def test_restauration(self):
+        self._supprimer(timedelta(days=400))
+        archivage.restaurer(BienArchive.objects.get())
+        restaure = archivage.restaurer(BailArchive.objects.get())
+        self.assertEqual(restaure.montant_loyer, Decimal("90000"))
+        # Restauré tel quel : toujours supprimé, mais de nouveau dans la table vivante
+        self.assertIsNotNone(Bail.all_objects.get(pk=self.bail.pk).deleted_at)
+        self.assertFalse(BailArchive.objects.exists())
+
+
+class PartitionsTests(BailTestCase):
+    def test_bornes_annuelles(self):
+        self.assertEqual(
+            partitions._bornes(Loyer._meta.get_field("periode_debut"), 2025), ("'2025-01-01'", "'2026-01-01'")
+        )
+        debut, fin = partitions._bornes(Transaction._meta.get_field("created_at"), 2025)
+        self.assertTrue(debut.startswith("'2025-01-01T00:00:00"))
+        self.assertTrue(fin.startswith("'2026-01-01T00:00:00"))
+
+    def test_sans_effet_sur_une_table_ordinaire(self):
+        # SQLite, ou tables PostgreSQL non converties : rien à maintenir
+        self.assertEqual(partitions.maintenir(), {})
+
+    def test_annee_referencee_par_une_transaction(self):
+        loyer = self.creer_loyer(6)
+        self.assertEqual(partitions.references(Loyer, 2025), [])
+        Transaction.objects.create(loyer=loyer, montant=Decimal("90000"), provider="CASH")
+        self.assertEqual(partitions.references(Loyer, 2025), ["core_transaction"])
+        self.assertEqual(partitions.references(Loyer, 2024), [])
+
+
+@skipUnless(connection.vendor == "postgresql", "Partitionnement disponible uniquement sous PostgreSQL")
+class PartitionsPostgresqlTests(BailTestCase):
+    def _compter(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {connection.ops.quote_name(table)}")
+            return cursor.fetchone()[0]
+
+    def _loyer_de(self, annee):
+        return Loyer.objects.create(
+            bail=self.bail, periode_debut=date(annee, 1, 1), periode_fin=date(annee, 1, 31),
+            date_echeance=date(annee, 1, 5), montant_du=Decimal("90000"),
+        )
+
+    def test_convertir_conserve_lignes_et_ids(self):
+        loyer = self.creer_loyer(6)
+        annee_courante = timezone.localdate().year
+
+        self.assertTrue(partitions.convertir(Loyer, annees_avance=1))
+        self.assertTrue(partitions.est_partitionnee(Loyer))
+        self.assertFalse(partitions.convertir(Loyer))
+        self.assertEqual(partitions.annees_partitions(Loyer), list(range(2025, annee_courante + 2)))
+        self.assertEqual(self._compter("core_loyer_2025"), 1)
+        self.assertEqual(Loyer.objects.get().pk, loyer.pk)
+        # Séquence recréée au-delà des ids existants
+        self.assertGreater(self.creer_loyer(7).pk, loyer.pk)
+
+    def test_creer_partition_reprend_les_lignes_du_defaut(self):
+        partitions.convertir(Loyer, annees_avance=0)
+        futur = timezone.localdate().year + 3
+        self._loyer_de(futur)
+        self.assertEqual(self._compter("core_loyer_defaut"), 1)
+
+        self.assertTrue(partitions.creer_partition(Loyer, futur))
+        self.assertFalse(partitions.creer_partition(Loyer, futur))
+        self.assertEqual(self._compter(f"core_loyer_{futur}"), 1)
+        self.assertEqual(self._compter("core_loyer_defaut"), 0)
+        self.assertEqual(Loyer.objects.count(), 1)
+
+    def test_retention_attend_les_lignes_qui_referencent(self):
+        ancien = self._loyer_de(2015)
+        for model in (Loyer, Transaction):
+            partitions.convertir(model, annees_avance=0)
+        # Paiement tardif : transaction de l'année courante sur un loyer de 2015
+        Transaction.objects.create(loyer=ancien, montant=Decimal("90000"), provider="CASH")
+
+        bilan = partitions.maintenir(annees_avance=0, retention=5)
+        self.assertNotIn(2015, bilan["core_loyer"]["detachees"])
+        self.assertIn(2015, partitions.annees_partitions(Loyer))
+
+        Transaction.objects.all().delete()
+        bilan = partitions.maintenir(annees_avance=0, retention=5)
+        self.assertIn(2015, bilan["core_loyer"]["detachees"])
+        self.assertFalse(Loyer.objects.exists())
+        self.assertEqual(self._compter("core_loyer_2015"), 1)
+
+
+class ChevauchementBauxTests(BailTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Bail.objects.filter(pk=cls.bail.pk).update(est_signe=True)
+
+    def _bail(self, debut, fin):
+        return Bail(
+            bien=self.bien, locataire=self.locataire, date_debut=debut, date_fin=fin,
+            montant_loyer=Decimal("1"), depot_garantie=Decimal("1"), est_signe=True,
+        )
+
+    def test_bornes_incluses(self):
+        # Commencer le jour de la fin du bail existant chevauche
+        with self.assertRaisesMessage(ValidationError, "Ce bien a déjà un bail actif pour cette période."):
+            self._bail(date(2025, 12, 31), date(2026, 6, 30)).save()
+
+    def test_bail_consecutif_accepte(self):
+        self._bail(date(2026, 1, 1), date(2026, 6, 30)).save()
+        self.assertEqual(Bail.objects.count(), 2)
+
+    def test_traitement_en_masse_sans_verification_python(self):
+        # Pas de requête de vérification : la contrainte PostgreSQL s'en charge
+        with CaptureQueriesContext(connection) as requetes:
+            self._bail(date(2026, 1, 1), date(2026, 6, 30)).save(valider=False)
+        lectures = [q["sql"] for q in requetes if q["sql"].startswith("SELECT")]
+        self.assertFalse([sql for sql in lectures if 'FROM "core_bail"' in sql])
+        self.assertEqual(Bail.objects.count(), 2)
+
+    @skipUnless(connection.vendor == "postgresql", "Contrainte d'exclusion disponible uniquement sous PostgreSQL")
+    def test_traitement_en_masse_chevauchement_refuse_par_la_contrainte(self):
+        with self.assertRaisesMessage(ValidationError, "Ce bien a déjà un bail actif pour cette période."):
+            self._bail(date(2025, 6, 1), date(2025, 6, 30)).save(valider=False)
+        # Point de sauvegarde annulé : la transaction du test reste utilisable
+        self.assertEqual(Bail.objects.count(), 1)
+
+    def test_contrainte_d_exclusion_postgresql_uniquement(self):
+        contrainte = next(c for c in Bail._meta.constraints if c.name == "bail_sans_chevauchement")
+        sql = contrainte.create_sql(Bail, connection.SchemaEditorClass(connection))
+        if connection.vendor == "postgresql":
+            self.assertIn("EXCLUDE", str(sql))
+        else:
+            self.assertIsNone(sql)
+
+
+class ImportPortefeuilleTests(BailTestCase):
+    entete = "email;prenom;nom;titre;type;adresse;surface;debut;fin;loyer;depot;proprietaire\n"
+    valides = [
+        "awa@example.com;Awa;Diop;Studio 1;Appartement;Plateau;25;2025-01-01;2025-12-31;90000;90000;\n",
+        "awa@example.com;Awa;Diop;Studio 1;Appartement;Plateau;25;01/01/2026;2026-12-31;90000;90000;\n",
+        # Bien existant du bailleur, à la suite de son bail signé
+        "moussa@example.com;Moussa;Fall;F2;APPARTEMENT;Mermoz;40;2026-01-01;2026-12-30;300000;600000;\n",
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.bailleur.groups.add(Group.objects.create(name="BAILLEUR"))
+        Bail.objects.filter(pk=cls.bail.pk).update(est_signe=True)
+
+    def _importer(self, lignes):
+        return importer(io.BytesIO((self.entete + "".join(lignes)).encode()), "portefeuille.csv", self.bailleur)
+
+    def test_erreurs_par_ligne_et_rien_cree(self):
+        rapport = self._importer([
+            self.valides[0],
+            "awa@example.com;Awa;Diop;Studio 1;Appartement;Plateau;25;01/06/2025;2026-05-31;90000;90000;\n",
+            "moussa@example.com;Moussa;Fall;F2;APPARTEMENT;Mermoz;40;2025-12-31;2026-12-30;300000;600000;\n",
+            "ibou@example.com;Ibou;Sarr;F4;APPARTEMENT;Mermoz;40;2025-03-01;2026-02-28;1;1;autre@example.com\n",
+            "ibou@example.com;Ibou;Sarr;F5;APPARTEMENT;Mermoz;40;2025-03-01;2026-02-28;abc;1;\n",
+        ])
+        self.assertEqual(
+            rapport.erreurs_par_ligne(),
+            [
+                (3, ["Chevauche la ligne 2 (du 01/01/2025 au 31/12/2025)."]),
+                (4, ["Chevauche un bail existant (du 01/01/2025 au 31/12/2025)."]),
+                (5, ["Vous ne pouvez importer que vos propres biens (colonne proprietaire)."]),
+                (6, ["montant_loyer : Saisissez un nombre."]),
+            ],
+        )
+        self.assertEqual(Bail.objects.count(), 1)
+        self.assertFalse(get_user_model().objects.filter(email="awa@example.com").exists())
+
+    def test_creation_en_masse(self):
+        rapport = self._importer(self.valides)
+        self.assertTrue(rapport.valide, rapport.erreurs)
+        self.assertEqual((rapport.baux_crees, rapport.biens_crees, rapport.locataires_crees), (3, 1, 2))
+        self.assertEqual(Bien.objects.filter(titre="F2").count(), 1)
+        self.assertEqual(Bail.objects.filter(bien=self.bien).count(), 2)
+
+    def test_locataire_cree_sans_mot_de_passe(self):
+        self._importer(self.valides)
+        awa = get_user_model().objects.get(email="awa@example.com")
+        self.assertFalse(awa.has_usable_password())
+        self.assertTrue(awa.groups.filter(name="LOCATAIRE").exists())
+        self.assertEqual(awa.profile.user_id, awa.pk)
+        self.assertEqual(Bail.objects.filter(locataire=awa, est_signe=True).count(), 2)
+
+
+class RapprochementReleveTests(BailTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.mai, cls.juin, cls.juillet = [
+            Loyer.objects.create(
+                bail=cls.bail, periode_debut=date(2025, mois, 1), periode_fin=date(2025, mois, 28),
+                date_echeance=date(2025, mois, 5), montant_du=Decimal("90000"),
+            )
+            for mois in (5, 6, 7)
+        ]
+        cls.releve = (
+            "Transaction ID;Date;Amount;Counterparty Phone;Note\n"
+            f"T1;2025-06-03 10:00:00;90 000;771234567;loyer {cls.juillet.reference_paiement}\n"
+            "T2;2025-06-04 09:30:00;90000;00221771234567;loyer\n"
+            "T3;2025-06-05 08:00:00;50000;780000000;\n"
+            "T4;2025-06-06 08:00:00;-2000;771234567;frais\n"
+        ).encode()
+
+    def _rapprocher(self):
+        return rapprochement.rapprocher(io.BytesIO(self.releve), "wave.csv", "WAVE")
+
+    def test_rapprochement_par_reference_puis_par_telephone(self):
+        rapport = self._rapprocher()
+        self.assertEqual((rapport.rapprochees, rapport.a_revoir, rapport.ignorees), (2, 1, 1))
+        self.juin.refresh_from_db()
+        self.juillet.refresh_from_db()
+        self.assertEqual((self.juin.statut, self.juillet.statut), ("PAYE", "PAYE"))
+        self.assertEqual(Transaction.objects.filter(provider="WAVE", est_validee=True).count(), 2)
+
+    def test_ligne_sans_correspondance_en_file_de_verification(self):
+        self._rapprocher()
+        ligne = LigneReleve.objects.get()
+        self.assertEqual((ligne.reference_externe, ligne.motif), ("T3", "AUCUN"))
+
+    def test_reimport_sans_doublon(self):
+        self._rapprocher()
+        rapport = self._rapprocher()
+        self.assertEqual((rapport.rapprochees, rapport.deja_importees), (0, 3))
+        self.assertEqual(Transaction.objects.count(), 2)
+
+    def test_rapprochement_manuel(self):
+        self._rapprocher()
+        ligne = LigneReleve.objects.get()
+        ligne.loyer = self.mai
+        rapprochement.rapprocher_ligne(ligne, self.bailleur)
+        self.mai.refresh_from_db()
+        self.assertEqual(
+            (self.mai.statut, self.mai.montant_verse, ligne.statut), ("PARTIEL", Decimal("50000"), "RAPPROCHEE")
+        )
+
+
+@override_settings(PAIEMENT_WEBHOOK_SECRETS={"WAVE": "secret-test", "OM": "secret-om"})
+class WebhookPaiementTests(BailTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.loyer = Loyer.objects.create(
+            bail=cls.bail, periode_debut=date(2025, 6, 1), periode_fin=date(2025, 6, 30),
+            date_echeance=date(2025, 6, 5), montant_du=Decimal("90000"),
+        )
+        cls.corps = json.dumps({
+            "id": "EV_1",
+            "type": "checkout.session.completed",
+            "data": {
+                "transaction_id": "T-WH-1", "amount": "40000", "client_reference": cls.loyer.reference_paiement,
+                "payment_status": "succeeded", "when_completed": "2025-06-03T10:00:00Z",
+            },
+        }).encode()
+
+    def _notifier(self, signature=None):
+        return self.client.post(
+            reverse("api-webhook-paiement", args=["wave"]), self.corps, content_type="application/json",
+            HTTP_WAVE_SIGNATURE=signature or webhooks.signer("WAVE", self.corps),
+        )
+
+    def test_signature_invalide_refusee(self):
+        self.assertEqual(self._notifier("t=1,v1=00").status_code, 403)
+        self.assertFalse(EvenementPaiement.objects.exists())
+
+    def test_doublon_reconnu_et_enregistre_une_fois(self):
+        reponse = self._notifier()
+        self.assertEqual((reponse.status_code, reponse.json()["doublon"]), (200, False))
+        reponse = self._notifier()
+        self.assertEqual((reponse.status_code, reponse.json()["doublon"]), (200, True))
+        self.assertEqual(EvenementPaiement.objects.get().statut, "RECU")
+
+    def test_traitement_credite_le_loyer_une_seule_fois(self):
+        self._notifier()
+        evenement = EvenementPaiement.objects.get()
+
+        webhooks.traiter(evenement.pk)
+        evenement.refresh_from_db()
+        self.loyer.refresh_from_db()
+        self.assertEqual(evenement.statut, "TRAITE")
+        self.assertEqual(evenement.transaction.reference_externe, "T-WH-1")
+        self.assertEqual((self.loyer.statut, self.loyer.montant_verse), ("PARTIEL", Decimal("40000")))
+        # Déjà traité : sans effet
+        self.assertIsNone(webhooks.traiter(evenement.pk))
+        self.assertEqual(Transaction.objects.count(), 1)
+
+    def test_broker_indisponible_evenement_acquitte_et_repris(self):
+        with mock.patch("apps.api.views.traiter_evenement_paiement.delay", side_effect=ConnectionError), \
+                self.assertLogs("apps.api.views", "ERROR"), \
+                self.captureOnCommitCallbacks(execute=True):
+            reponse = self._notifier()
+        self.assertEqual(reponse.status_code, 200)
+        # Reste "reçu" : reprendre_evenements_paiement le relancera
+        self.assertEqual(EvenementPaiement.objects.get().statut, "RECU")
+
+    def test_sans_identifiant_reference_par_cle_d_idempotence(self):
+        self.corps = json.dumps({
+            "status": "success", "amount": "40000", "reference": self.loyer.reference_paiement,
+        }).encode()
+        self._notifier()
+        evenement = EvenementPaiement.objects.get()
+
+        webhooks.traiter(evenement.pk)
+        transaction_paiement = Transaction.objects.get()
+        self.assertEqual(transaction_paiement.reference_externe, evenement.cle_idempotence)
+        self.assertNotEqual(transaction_paiement.reference_externe, "None")
@@ -45,6 +45,7 @@ urlpatterns = [
     path("gestion/biens/", views.biens_list, name="biens_list"),
     path("gestion/biens/<int:pk>/edit/", views.edit_bien, name="edit_bien"),
     path('nouveau-locataire/', views.unified_creation_view, name='unified_creation'),
+    path('import-portefeuille/', views.import_portefeuille, name='import_portefeuille'),
 
     # ============================================
     # GESTION BAUX
@@ -71,8 +72,11 @@ urlpatterns = [
     # GED / DOCUMENTS
     # ============================================
     path("documents/", views.documents_list, name="documents_list"),
+    path("documents/export/", views.export_documents, name="export_documents"),
+    path("documents/export/<uuid:export_id>/", views.download_export_documents, name="download_export_documents"),
     path("document/quittance/<int:loyer_id>/", views.download_quittance, name="download_quittance"),
     path("document/bail/<int:bail_id>/", views.download_contrat, name="download_contrat"),
+    path("document/edl/<int:edl_id>/", views.download_edl, name="download_edl"),
     path("document/kyc/<int:user_id>/<str:doc_type>/", views.download_kyc, name="download_kyc"),
 
     # ============================================
@@ -85,6 +89,11 @@ urlpatterns = [
     # ============================================
     path("gestion/actions/generate-rents/", views.trigger_rent_generation, name="trigger_rent_generation"),
 
+    # ============================================
+    # SUPERVISION
+    # ============================================
+    path("metrics/", views.metrics, name="metrics"),
+
     # ============================================
     # PAIEMENTS
     # ============================================
@@ -1,11 +1,11 @@
+import hmac
 import logging
 import mimetypes
 from datetime import date
 from itertools import chain
+from urllib.parse import urlencode
 
-import openpyxl
 from django.db import transaction
-from openpyxl.styles import Font, PatternFill, Alignment
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import get_user_model
@@ -14,14 +14,18 @@ from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.models import Group
 from django.core.exceptions import PermissionDenied
 from django.core.mail import send_mail
+from django.core.files.storage import default_storage
+from django.core.paginator import Paginator
 from django.core.management import call_command
 from django.db.models import Sum, Count, Q, F
-from django.http import FileResponse, Http404, HttpResponse
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.urls import reverse, reverse_lazy
 from django.utils import timezone
 from django.views.generic import ListView, DetailView, FormView
 from django.views.generic.edit import FormMixin
+from django.utils.decorators import method_decorator
+from django.utils.http import http_date
 from django.core.exceptions import ValidationError
 from .services.paiement import PaymentService
 from .forms import CashPaymentForm
@@ -35,6 +39,8 @@ from .forms import (
     EtatDesLieuxForm,
     LocataireCreationForm,
     DepenseForm, UnifiedCreationForm,
+    ImportPortefeuilleForm,
+    LigneImportForm,
 )
 from .models import (
     Bien,
@@ -45,13 +51,25 @@ from .models import (
     EtatDesLieux,
     Transaction,
     Depense,
+    Document,
+    ExportDocuments,
 )
+from . import cache as cache_public
+from .metrics import EXCEL_TAILLE, exposer
+from .profiling import chronometre
+from .routers import utiliser_replica
+from .sitemaps import DOSSIER as SITEMAPS_DOSSIER
 from .permissions import (
     is_admin,
     is_bailleur,
     is_locataire,
     get_active_bail,
 )
+from .services.comptabilite import ecrire_grand_livre_excel
+from .services import export_documents as export_documents_service
+from .services import import_portefeuille as import_portefeuille_service
+from .services.documents import documents_visibles, filtrer
+from .tasks import exporter_documents
 from .services.stats import DashboardService
 
 logger = logging.getLogger(__name__)
@@ -62,6 +80,7 @@ User = get_user_model()
 # PAGES PUBLIQUES
 # ============================================================================
 
+@method_decorator(cache_public.cache_publique(cache_public.CATALOGUE), name="dispatch")
 class HomeView(ListView):
     model = Annonce
     template_name = "home.html"
@@ -112,10 +131,14 @@ class HomeView(ListView):
         context.update(
             {
                 "types_bien": Bien.TYPE_CHOICES,
-                "villes": (
-                    base_qs.values_list("bien__ville", flat=True)
-                    .distinct()
-                    .order_by("bien__ville")
+                "villes": cache_public.get_or_set(
+                    cache_public.CATALOGUE,
+                    ("villes",),
+                    lambda: list(
+                        base_qs.values_list("bien__ville", flat=True)
+                        .distinct()
+                        .order_by("bien__ville")
+                    ),
                 ),
                 "annonces_count": paginator.count if paginator else 0,
             }
@@ -150,8 +173,11 @@ class AnnonceDetailView(FormMixin, DetailView):
                 bien__type_bien=self.object.bien.type_bien,
                 bien__ville=self.object.bien.ville,
             )
-            .exclude(id=self.object.id)[:3]
+            .exclude(id=self.object.id)
+            .select_related("bien")[:3]
         )
+        # Évaluée paresseusement : aucune requête si le fragment est en cache
+        context["cache_version"] = cache_public.version(cache_public.CATALOGUE)
         context.setdefault("form", self.get_form())
         return context
 
@@ -204,15 +230,31 @@ class ContactView(FormView):
         return super().form_valid(form)
 
 
+@cache_public.cache_publique(cache_public.PAGES, timeout=settings.CACHE_PUBLIC_TIMEOUT)
 def about(request):
     return render(request, "about.html")
 
 
+def sitemap_genere(request, nom):
+    """Fichier écrit par `manage.py generer_sitemaps` (stockage des médias)."""
+    chemin = f"{SITEMAPS_DOSSIER}/{nom}"
+    if not default_storage.exists(chemin):
+        raise Http404("Sitemap non généré.")
+    response = FileResponse(default_storage.open(chemin, "rb"), content_type="application/xml")
+    response["X-Robots-Tag"] = "noindex, noodp, noarchive"
+    try:
+        response["Last-Modified"] = http_date(default_storage.get_modified_time(chemin).timestamp())
+    except NotImplementedError:
+        pass
+    return response
+
+
 # ============================================================================
 # COMPTABILITÉ
 # ============================================================================
 
 @login_required
+@utiliser_replica()
 def grand_livre(request):
     if not is_admin(request.user):
         raise PermissionDenied("Accès réservé aux administrateurs.")
@@ -274,54 +316,15 @@ def export_grand_livre_excel(request):
     except (TypeError, ValueError):
         annee = date.today().year
 
-    recettes = (
-        Transaction.objects.filter(est_validee=True, created_at__year=annee)
-        .select_related("loyer__bail__bien", "loyer__bail__locataire")
-    )
-    depenses = Depense.objects.filter(date_paiement__year=annee).select_related("bien")
-
     response = HttpResponse(
         content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
     response["Content-Disposition"] = f'attachment; filename="Grand_Livre_{annee}.xlsx"'
 
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = f"Grand Livre {annee}"
-
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(start_color="10B981", end_color="10B981", fill_type="solid")
-    center_align = Alignment(horizontal="center")
-    currency_fmt = '#,##0 "FCFA"'
-
-    headers = ["Date", "Type", "Libellé / Tiers", "Bien concerné", "Recette (Crédit)", "Dépense (Débit)"]
-    ws.append(headers)
-
-    for cell in ws[1]:
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = center_align
-
-    # Recettes
-    for r in recettes:
-        libelle = f"Loyer {r.loyer.periode_debut.strftime('%m/%Y')} - {r.loyer.bail.locataire.get_full_name()}"
-        ws.append([r.created_at.date(), "RECETTE", libelle, r.loyer.bail.bien.titre, r.montant, 0])
-
-    # Dépenses
-    for d in depenses:
-        ws.append([d.date_paiement, "DEPENSE", f"{d.get_type_depense_display()} : {d.libelle}", d.bien.titre, 0, d.montant])
-
-    # Formats monétaires colonnes E/F
-    for row in ws.iter_rows(min_row=2, min_col=5, max_col=6):
-        for cell in row:
-            cell.number_format = currency_fmt
+    with chronometre("xlsx"):
+        ecrire_grand_livre_excel(annee, response)
 
-    # Largeurs colonnes
-    widths = [15, 15, 48, 30, 22, 22]
-    for i, w in enumerate(widths, start=1):
-        ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = w
-
-    wb.save(response)
+    EXCEL_TAILLE.observe(len(response.content), export="grand_livre")
     return response
 
 
@@ -488,7 +491,7 @@ def add_bail(request):
     biens_queryset = Bien.objects.filter(proprietaire=request.user) if is_bailleur(request.user) else Bien.objects.all()
 
     if request.method == "POST":
-        form = BailForm(request.POST, request.FILES)
+        form = BailForm(request.POST, request.FILES, user=request.user)
         form.fields["bien"].queryset = biens_queryset
         if form.is_valid():
             bail = form.save()
@@ -501,7 +504,7 @@ def add_bail(request):
                 messages.warning(request, "Le bail a été créé, mais la génération du PDF a échoué.")
             return redirect("bail_detail", pk=bail.pk)
     else:
-        form = BailForm()
+        form = BailForm(user=request.user)
         form.fields["bien"].queryset = biens_queryset
 
     return render(
@@ -559,7 +562,7 @@ def add_etat_des_lieux(request, bail_id, type_edl):
     disabled_fields = ["bail", "type_edl"]
 
     if request.method == "POST":
-        form = EtatDesLieuxForm(request.POST, request.FILES, instance=instance)
+        form = EtatDesLieuxForm(request.POST, request.FILES, instance=instance, user=request.user)
         for f in disabled_fields:
             if f in form.fields:
                 form.fields[f].disabled = True
@@ -568,7 +571,7 @@ def add_etat_des_lieux(request, bail_id, type_edl):
             messages.success(request, "L'état des lieux a été enregistré avec succès.")
             return redirect("bail_detail", pk=bail.pk)
     else:
-        form = EtatDesLieuxForm(instance=instance)
+        form = EtatDesLieuxForm(instance=instance, user=request.user)
         for f in disabled_fields:
             if f in form.fields:
                 form.fields[f].disabled = True
@@ -612,10 +615,27 @@ def download_contrat(request, bail_id):
     return response
 
 
+@login_required
+def download_edl(request, edl_id):
+    edl = get_object_or_404(EtatDesLieux.objects.select_related("bail__bien"), pk=edl_id)
+    bail = edl.bail
+
+    if not (is_admin(request.user) or bail.bien.proprietaire_id == request.user.pk or bail.locataire_id == request.user.pk):
+        raise PermissionDenied("Vous n'avez pas l'autorisation de télécharger cet état des lieux.")
+
+    if not edl.pdf:
+        raise Http404("Aucun PDF n'est disponible pour cet état des lieux.")
+
+    response = FileResponse(edl.pdf.open("rb"), content_type="application/pdf")
+    response["Content-Disposition"] = f'inline; filename="EDL_{edl.get_type_edl_display()}_{bail.id}.pdf"'
+    return response
+
+
 # ============================================================================
 # LOYERS / PAIEMENTS
 # ============================================================================
 @login_required
+@utiliser_replica()
 def loyers_list(request):
     if not is_admin(request.user):
         raise PermissionDenied("Accès réservé aux administrateurs.")
@@ -863,6 +883,27 @@ def trigger_rent_generation(request):
         messages.error(request, "Une erreur est survenue lors du lancement de l'opération.")
 
     return redirect("dashboard")
+
+
+# ============================================================================
+# SUPERVISION
+# ============================================================================
+
+def metrics(request):
+    """
+    Exposition Prometheus. Accès : jeton `Authorization: Bearer <METRICS_TOKEN>`
+    (scraper) ou administrateur connecté.
+    """
+    jeton = getattr(settings, "METRICS_TOKEN", "")
+    autorisation = request.headers.get("Authorization", "")
+    # Comparaison à temps constant : pas d'indice sur le jeton via la latence
+    jeton_valide = bool(jeton) and hmac.compare_digest(autorisation.encode(), f"Bearer {jeton}".encode())
+    if not (jeton_valide or is_admin(request.user)):
+        raise PermissionDenied("Accès réservé à la supervision.")
+
+    return HttpResponse(exposer(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # ============================================================================
 # UTILISATEURS
 # ============================================================================
@@ -934,7 +975,7 @@ def add_depense(request):
         raise PermissionDenied("Vous n'avez pas les droits pour ajouter une dépense.")
 
     if request.method == "POST":
-        form = DepenseForm(request.POST, request.FILES)
+        form = DepenseForm(request.POST, request.FILES, user=request.user)
         if is_bailleur(request.user):
             form.fields["bien"].queryset = Bien.objects.filter(proprietaire=request.user)
 
@@ -945,7 +986,7 @@ def add_depense(request):
 
         messages.error(request, "Erreur dans le formulaire. Veuillez vérifier les champs.")
     else:
-        form = DepenseForm()
+        form = DepenseForm(user=request.user)
         if is_bailleur(request.user):
             form.fields["bien"].queryset = Bien.objects.filter(proprietaire=request.user)
 
@@ -958,29 +999,73 @@ def add_depense(request):
 
 @login_required
 def documents_list(request):
-    user = request.user
+    """
+    GED : une seule requête paginée sur l'index Document, restreinte au rôle
+    (proprietaire / locataire indexés), filtrable par type, année, bailleur
+    ou locataire.
+    """
+    documents, filtres = filtrer(
+        documents_visibles(request.user).select_related("bien", "locataire"), request.GET
+    )
+    page_obj = Paginator(documents, settings.GED_PAR_PAGE).get_page(request.GET.get("page"))
+    annee_courante = timezone.localdate().year
+
+    return render(
+        request,
+        "documents/ged_list.html",
+        {
+            "page_obj": page_obj,
+            "documents": page_obj.object_list,
+            "types": Document.TYPE_CHOICES,
+            "annees": range(annee_courante + 1, annee_courante - 10, -1),
+            "filtres": filtres,
+            "filtres_querystring": urlencode(filtres),
+            "exports": request.user.exports_documents.all()[:5],
+        },
+    )
 
-    baux = Bail.objects.none()
-    quittances = Loyer.objects.none()
-    edls = EtatDesLieux.objects.none()
 
-    if is_admin(user):
-        baux = Bail.objects.select_related("bien", "locataire").filter(fichier_contrat__isnull=False).exclude(fichier_contrat="")
-        quittances = Loyer.objects.select_related("bail__locataire", "bail__bien").filter(quittance__isnull=False).exclude(quittance="")
-        edls = EtatDesLieux.objects.select_related("bail__bien").filter(pdf__isnull=False).exclude(pdf="")
+@login_required
+def export_documents(request):
+    """
+    ZIP des documents de la GED correspondant aux filtres (POST). Envoyé en
+    flux direct si la sélection est petite ; sinon préparé en tâche de fond,
+    le lien arrivant par e-mail et dans la GED.
+    """
+    if request.method != "POST":
+        return redirect("documents_list")
+
+    documents, filtres = export_documents_service.selection(request.user, request.POST)
+    retour = reverse("documents_list") + (f"?{urlencode(filtres)}" if filtres else "")
+    nb = documents.count()
+    if nb == 0:
+        messages.info(request, "Aucun document à exporter pour ces filtres.")
+        return redirect(retour)
+
+    if nb > settings.EXPORT_DOCUMENTS_SEUIL_DIRECT:
+        export = ExportDocuments.objects.create(utilisateur=request.user, filtres=filtres)
+        transaction.on_commit(lambda: exporter_documents.delay(str(export.pk)))
+        messages.success(
+            request,
+            f"{nb} documents : l'archive est en préparation. "
+            "Le lien de téléchargement apparaîtra ici et vous sera envoyé par e-mail.",
+        )
+        return redirect(retour)
+
+    response = StreamingHttpResponse(export_documents_service.flux_zip(documents), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{export_documents_service.nom_archive(filtres)}"'
+    return response
 
-    elif is_bailleur(user):
-        biens_ids = Bien.objects.filter(proprietaire=user).values_list("id", flat=True)
-        baux = Bail.objects.filter(bien_id__in=biens_ids).select_related("locataire", "bien").filter(fichier_contrat__isnull=False).exclude(fichier_contrat="")
-        quittances = Loyer.objects.filter(bail__bien_id__in=biens_ids).select_related("bail__locataire", "bail__bien").filter(quittance__isnull=False).exclude(quittance="")
-        edls = EtatDesLieux.objects.filter(bail__bien_id__in=biens_ids).select_related("bail__bien").filter(pdf__isnull=False).exclude(pdf="")
 
-    elif is_locataire(user):
-        baux = Bail.objects.filter(locataire=user).select_related("bien").filter(fichier_contrat__isnull=False).exclude(fichier_contrat="")
-        quittances = Loyer.objects.filter(bail__locataire=user).select_related("bail__bien").filter(quittance__isnull=False).exclude(quittance="")
-        edls = EtatDesLieux.objects.filter(bail__locataire=user).select_related("bail__bien").filter(pdf__isnull=False).exclude(pdf="")
+@login_required
+def download_export_documents(request, export_id):
+    export = get_object_or_404(ExportDocuments, pk=export_id, utilisateur=request.user)
+    if export.statut != "TERMINE" or not default_storage.exists(export.fichier):
+        raise Http404("Cette archive n'est pas (ou plus) disponible.")
 
-    return render(request, "documents/ged_list.html", {"baux": baux, "quittances": quittances, "edls": edls})
+    response = FileResponse(default_storage.open(export.fichier, "rb"), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{export_documents_service.nom_archive(export.filtres)}"'
+    return response
 
 
 @login_required
@@ -1175,6 +1260,43 @@ def unified_creation_view(request):
         form = UnifiedCreationForm(user=request.user)
 
     return render(request, "utilisateurs/add_unified.html", {"form": form})
+
+
+@login_required
+def import_portefeuille(request):
+    """
+    Import d'un portefeuille complet (locataires, biens, baux signés) depuis
+    un .xlsx ou un .csv : tout est validé avant d'écrire, le rapport indique
+    les lignes à corriger. Contrats PDF et invitations partent en tâche de fond.
+    """
+    if not (is_admin(request.user) or is_bailleur(request.user)):
+        raise PermissionDenied("Accès réservé.")
+
+    rapport = None
+    if request.method == "POST":
+        form = ImportPortefeuilleForm(request.POST, request.FILES)
+        if form.is_valid():
+            fichier = form.cleaned_data["fichier"]
+            rapport = import_portefeuille_service.importer(
+                fichier.file, fichier.name, request.user, simulation=form.cleaned_data["simulation"]
+            )
+            if rapport.valide and not rapport.simulation:
+                messages.success(
+                    request,
+                    f"{rapport.baux_crees} bail(s) importé(s) : {rapport.biens_crees} bien(s) et "
+                    f"{rapport.locataires_crees} locataire(s) créés. Les contrats sont en cours de génération.",
+                )
+                return redirect("dashboard")
+    else:
+        form = ImportPortefeuilleForm()
+
+    return render(request, "utilisateurs/import_portefeuille.html", {
+        "form": form,
+        "rapport": rapport,
+        "colonnes": [nom for nom in LigneImportForm.base_fields],
+    })
+
+
 @login_required
 def telecharger_contrat_bail(request, bail_id):
     # On récupère le bail en vérifiant que l'utilisateur est soit le locataire, soit le proprio, soit admin
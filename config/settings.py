@@ -39,6 +39,9 @@ ALLOWED_HOSTS = get_env_variable(
     "localhost,127.0.0.1",
 ).split(",")
 
+# Domaine public (URLs absolues hors requête : sitemap pré-généré)
+SITE_DOMAIN = get_env_variable("SITE_DOMAIN", "madagroupe.com")
+
 CSRF_TRUSTED_ORIGINS = get_env_variable(
     "CSRF_TRUSTED_ORIGINS",
     "http://localhost:8000",
@@ -55,6 +58,7 @@ DJANGO_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.humanize",
+    "django.contrib.sitemaps",
 ]
 
 THIRD_PARTY_APPS = [
@@ -83,6 +87,76 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
+# ===================== PROFILAGE DES REQUÊTES (opt-in) ========================
+# Server-Timing + ligne de log JSON (SQL, templates, PDF/Excel, total) par requête.
+PROFILING_ENABLED = get_env_variable("PROFILING_ENABLED", "False").lower() == "true"
+PROFILING_SAMPLE_RATE = float(get_env_variable("PROFILING_SAMPLE_RATE", "1.0"))
+PROFILING_SLOW_MS = float(get_env_variable("PROFILING_SLOW_MS", "1000"))
+
+if PROFILING_ENABLED:
+    # En tête de chaîne pour que la durée totale inclue les autres middlewares
+    MIDDLEWARE.insert(0, "apps.core.middleware.ProfilingMiddleware")
+
+# ===================== MÉTRIQUES (Prometheus) ========================
+# "memory" : par processus (dev) ; "redis" : partagé entre workers Gunicorn / Celery.
+METRICS_ENABLED = get_env_variable("METRICS_ENABLED", "False").lower() == "true"
+METRICS_BACKEND = get_env_variable("METRICS_BACKEND", "redis" if not DEBUG else "memory")
+METRICS_REDIS_URL = get_env_variable(
+    "METRICS_REDIS_URL",
+    get_env_variable("CELERY_BROKER_URL", "redis://localhost:6379/0"),
+)
+METRICS_TOKEN = get_env_variable("METRICS_TOKEN", "")
+
+if METRICS_ENABLED:
+    MIDDLEWARE.insert(0, "apps.core.middleware.MetricsMiddleware")
+
+# ===================== REQUÊTES LENTES ========================
+# Capture des requêtes SQL > SLOW_QUERY_MS avec leur plan (admin : "Requêtes lentes").
+SLOW_QUERY_ENABLED = get_env_variable("SLOW_QUERY_ENABLED", "False").lower() == "true"
+SLOW_QUERY_MS = float(get_env_variable("SLOW_QUERY_MS", "500"))
+SLOW_QUERY_MAX_ROWS = int(get_env_variable("SLOW_QUERY_MAX_ROWS", "1000"))
+# Plan des SELECT capturés (EXPLAIN ANALYZE réservé aux tâches Celery et aux commandes)
+SLOW_QUERY_EXPLAIN = get_env_variable("SLOW_QUERY_EXPLAIN", "True").lower() == "true"
+
+if SLOW_QUERY_ENABLED:
+    MIDDLEWARE.append("apps.core.middleware.SlowQueryContextMiddleware")
+
+# ===================== PROFILAGE MÉMOIRE ========================
+# Rapports JSON des commandes lancées avec --profile-memory et des tâches
+# décorées par profiler_memoire_tache (si MEMORY_PROFILE_TASKS).
+MEMORY_PROFILE_DIR = Path(get_env_variable("MEMORY_PROFILE_DIR", str(BASE_DIR / "profils_memoire")))
+MEMORY_PROFILE_TASKS = get_env_variable("MEMORY_PROFILE_TASKS", "False").lower() == "true"
+
+# ===================== CACHE ========================
+# Redis en production (CACHE_URL), mémoire locale en développement.
+# Les pages publiques sont invalidées par signaux (apps/core/cache.py).
+CACHE_URL = get_env_variable("CACHE_URL", "" if DEBUG else "redis://localhost:6379/1")
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+            "KEY_PREFIX": "mada",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "mada-immo",
+        }
+    }
+# Filet de sécurité : durée de vie maximale d'une page publique en cache (secondes)
+CACHE_PUBLIC_TIMEOUT = int(get_env_variable("CACHE_PUBLIC_TIMEOUT", "600"))
+# API catalogue mobile : Cache-Control public (CDN / proxy), revalidation par ETag
+API_CATALOGUE_MAX_AGE = int(get_env_variable("API_CATALOGUE_MAX_AGE", "60"))
+API_CATALOGUE_STALE = int(get_env_variable("API_CATALOGUE_STALE", "300"))
+# Écran d'accueil locataire (/api/mobile/me/) : cache par utilisateur, invalidé par signaux
+API_ME_TIMEOUT = int(get_env_variable("API_ME_TIMEOUT", "300"))
+API_ME_NB_LOYERS = int(get_env_variable("API_ME_NB_LOYERS", "6"))
+# Listes API sérialisées depuis .values() (apps/api/lecture_rapide.py) ; False = serializers DRF
+API_LECTURE_RAPIDE = get_env_variable("API_LECTURE_RAPIDE", "True").lower() == "true"
+
 ROOT_URLCONF = "config.urls"
 TEMPLATES = [
     {
@@ -109,6 +183,12 @@ if DEBUG:
             "NAME": BASE_DIR / "db.sqlite3",
         }
     }
+    if get_env_variable("DB_REPLICA_NAME", ""):
+        # Deuxième fichier SQLite pour tester le routage en local
+        DATABASES["replica"] = {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": get_env_variable("DB_REPLICA_NAME"),
+        }
 else:
     DATABASES = {
         "default": {
@@ -120,6 +200,81 @@ else:
             "PORT": get_env_variable("DB_PORT", "5432"),
         }
     }
+    if get_env_variable("DB_REPLICA_HOST", ""):
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "HOST": get_env_variable("DB_REPLICA_HOST"),
+            "PORT": get_env_variable("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+            "USER": get_env_variable("DB_REPLICA_USER", DATABASES["default"]["USER"]),
+            "PASSWORD": get_env_variable("DB_REPLICA_PASSWORD", DATABASES["default"]["PASSWORD"]),
+        }
+
+# ===================== RÉPLIQUE EN LECTURE ========================
+# Vues / services de reporting marqués utiliser_replica() : lectures sur "replica"
+# si l'alias est configuré (DB_REPLICA_HOST, ou DB_REPLICA_NAME en SQLite local).
+REPLICA_DB_ALIAS = "replica"
+# Après une écriture, la session lit sur le primaire pendant ce délai (retard de réplication)
+REPLICA_STICKY_SECONDS = float(get_env_variable("REPLICA_STICKY_SECONDS", "10"))
+DATABASE_ROUTERS = ["apps.core.routers.ReplicaRouter"]
+
+if "replica" in DATABASES:
+    # En test, la réplique est un miroir de la base par défaut
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("django.contrib.sessions.middleware.SessionMiddleware") + 1,
+        "apps.core.middleware.ReplicaSessionMiddleware",
+    )
+
+# ===================== CONNEXIONS BASE DE DONNÉES ========================
+# DB_POOL_MODE :
+#   - "none"       : une connexion par requête / tâche (comportement historique)
+#   - "persistent" : connexion réutilisée CONN_MAX_AGE secondes, vérifiée avant réutilisation
+#   - "pool"       : pool psycopg 3 (psycopg-pool) partagé par les threads du processus
+# Les tailles dépendent du type de processus (DB_PROCESS_TYPE = web | worker | beat)
+# et se surchargent par DB_<PARAMÈTRE>_<TYPE> puis DB_<PARAMÈTRE>, ex. DB_POOL_MAX_SIZE_WORKER=4.
+DB_PROCESS_TYPE = get_env_variable("DB_PROCESS_TYPE", "web").lower()
+DB_POOL_MODE = get_env_variable("DB_POOL_MODE", "persistent").lower()
+
+_DB_DEFAUTS = {
+    #          CONN_MAX_AGE, POOL_MIN_SIZE, POOL_MAX_SIZE
+    "web": (60, 2, 10),
+    "worker": (300, 1, 4),
+    "beat": (0, 0, 2),
+}
+
+
+def _db_parametre(nom, index):
+    defaut = _DB_DEFAUTS.get(DB_PROCESS_TYPE, _DB_DEFAUTS["web"])[index]
+    return int(
+        get_env_variable(f"DB_{nom}_{DB_PROCESS_TYPE.upper()}", get_env_variable(f"DB_{nom}", str(defaut)))
+    )
+
+
+if DB_POOL_MODE not in ("none", "persistent", "pool"):
+    raise ImproperlyConfigured(f"DB_POOL_MODE invalide : {DB_POOL_MODE!r} (none, persistent ou pool)")
+
+for _alias in DATABASES:
+    if DB_POOL_MODE == "persistent":
+        DATABASES[_alias]["CONN_MAX_AGE"] = _db_parametre("CONN_MAX_AGE", 0)
+        DATABASES[_alias]["CONN_HEALTH_CHECKS"] = True
+if DB_POOL_MODE == "pool" and DATABASES["default"]["ENGINE"].endswith("postgresql"):
+    from psycopg_pool import ConnectionPool
+
+    for _alias in DATABASES:
+        # Le pool gère lui-même la durée de vie : CONN_MAX_AGE doit rester à 0
+        DATABASES[_alias]["CONN_MAX_AGE"] = 0
+        DATABASES[_alias]["OPTIONS"] = {
+            **DATABASES[_alias].get("OPTIONS", {}),
+            "pool": {
+                "min_size": _db_parametre("POOL_MIN_SIZE", 1),
+                "max_size": _db_parametre("POOL_MAX_SIZE", 2),
+                # Attente maximale d'une connexion libre avant erreur
+                "timeout": int(get_env_variable("DB_POOL_TIMEOUT", "10")),
+                # Connexions recyclées régulièrement (bascule DNS, fuites côté serveur)
+                "max_lifetime": 1800,
+                "check": ConnectionPool.check_connection,
+            },
+        }
 # ===================== SÉCURITÉ HTTPS (AJOUTÉ) ========================
 if not DEBUG:
     # Rediriger tout le trafic HTTP vers HTTPS
@@ -161,6 +316,38 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Dérivés des photos (apps/core/services/images.py), générés par Celery après dépôt
+IMAGE_DERIVES_LARGEURS = tuple(
+    int(largeur) for largeur in get_env_variable("IMAGE_DERIVES_LARGEURS", "320,640,1280").split(",")
+)
+IMAGE_DERIVES_FORMATS = ("webp", "jpeg")
+IMAGE_DERIVES_QUALITE = int(get_env_variable("IMAGE_DERIVES_QUALITE", "80"))
+# Durée pendant laquelle l'absence de dérivés est gardée en cache (secondes)
+IMAGE_DERIVES_CACHE_ABSENT = 60
+# Téléversements reprenables (apps/core/services/televersement.py)
+TELEVERSEMENT_TAILLE_MORCEAU = int(get_env_variable("TELEVERSEMENT_TAILLE_MORCEAU", str(5 * 1024 * 1024)))
+TELEVERSEMENT_EXPIRATION_HEURES = int(get_env_variable("TELEVERSEMENT_EXPIRATION_HEURES", "48"))
+# GED : documents par page
+GED_PAR_PAGE = 30
+# Export ZIP de la GED : au-delà de ce nombre de documents, archive préparée par Celery
+EXPORT_DOCUMENTS_SEUIL_DIRECT = int(get_env_variable("EXPORT_DOCUMENTS_SEUIL_DIRECT", "300"))
+EXPORT_DOCUMENTS_EXPIRATION_HEURES = int(get_env_variable("EXPORT_DOCUMENTS_EXPIRATION_HEURES", "72"))
+# Biens / baux supprimés depuis plus de N jours : déplacés dans les tables d'archive
+ARCHIVAGE_DELAI_JOURS = int(get_env_variable("ARCHIVAGE_DELAI_JOURS", "365"))
+# Partitionnement par année de Loyer / Transaction / HistoriqueRelance (PostgreSQL, apps/core/partitions.py)
+PARTITIONS_ANNEES_AVANCE = int(get_env_variable("PARTITIONS_ANNEES_AVANCE", "2"))
+# Partitions plus anciennes détachées (0 : jamais). 10 ans : conservation des pièces comptables
+PARTITIONS_RETENTION_ANNEES = int(get_env_variable("PARTITIONS_RETENTION_ANNEES", "10"))
+# Import en masse de portefeuille (xlsx/csv) : lignes maximum par fichier
+IMPORT_PORTEFEUILLE_MAX_LIGNES = int(get_env_variable("IMPORT_PORTEFEUILLE_MAX_LIGNES", "5000"))
+# Webhooks de paiement (apps/core/services/webhooks.py) : secret HMAC par opérateur (vide : refusés)
+PAIEMENT_WEBHOOK_SECRETS = {
+    "WAVE": get_env_variable("WAVE_WEBHOOK_SECRET", ""),
+    "OM": get_env_variable("OM_WEBHOOK_SECRET", ""),
+}
+# Écart maximal entre l'horodatage signé et la réception (rejeu d'une requête capturée)
+PAIEMENT_WEBHOOK_TOLERANCE_SECONDES = int(get_env_variable("PAIEMENT_WEBHOOK_TOLERANCE_SECONDES", "300"))
+PAIEMENT_WEBHOOK_TENTATIVES_MAX = 5
 
 LOGIN_URL = "login"
 LOGIN_REDIRECT_URL = "dashboard"
@@ -188,6 +375,42 @@ CELERY_BEAT_SCHEDULE = {
         "task": "apps.core.tasks.generer_loyers_task",
         "schedule": crontab(hour=6, minute=0, day_of_month=1),
     },
+    "purger-televersements": {
+        "task": "apps.core.tasks.purger_televersements",
+        "schedule": crontab(hour=3, minute=30),
+    },
+    "purger-exports-documents": {
+        "task": "apps.core.tasks.purger_exports_documents",
+        "schedule": crontab(hour=3, minute=45),
+    },
+    "purger-requetes-lentes": {
+        "task": "apps.core.tasks.purger_requetes_lentes",
+        "schedule": crontab(minute=15),
+    },
+    "maintenir-partitions": {
+        "task": "apps.core.tasks.maintenir_partitions",
+        "schedule": crontab(hour=4, minute=0, day_of_month=1),
+    },
+    "reprendre-evenements-paiement": {
+        "task": "apps.core.tasks.reprendre_evenements_paiement",
+        "schedule": crontab(minute="*/5"),
+    },
 }
 
 TAILWIND_APP_NAME = "theme"
+
+# ===================== LOGGING ========================
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "apps.core.profiling": {
+            "handlers": ["console"],
+            "level": "INFO",
+            "propagate": False,
+        },
+    },
+}
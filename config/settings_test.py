@@ -0,0 +1,11 @@
+"""
+Réglages des tests : python manage.py test --settings=config.settings_test
+
+Ajoute "replica_test", miroir de la base de test "default" : ReplicaRouterTests
+y lit réellement les données écrites sur le primaire (REPLICA_DB_ALIAS).
+Hors de ces tests, l'alias n'est pas routé (REPLICA_DB_ALIAS reste "replica").
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+DATABASES["replica_test"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
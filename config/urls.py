@@ -2,16 +2,13 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.contrib.auth import views as auth_views
-from django.contrib.sitemaps.views import sitemap
-from django.urls import path, include
+from django.contrib.sitemaps import views as sitemaps_views
+from django.urls import path, include, re_path
 from django.views.generic import TemplateView
 
-from apps.core.sitemaps import BienSitemap, StaticViewSitemap
-
-sitemaps = {
-    "biens": BienSitemap,
-    "static": StaticViewSitemap,
-}
+from apps.core.cache import CATALOGUE, cache_publique
+from apps.core.sitemaps import SITEMAPS
+from apps.core.views import sitemap_genere
 
 urlpatterns = [
     # Django admin (réservé)
@@ -29,7 +26,19 @@ urlpatterns = [
     path("api/", include("apps.api.urls")),
 
     # SEO
-    path("sitemap.xml", sitemap, {"sitemaps": sitemaps}, name="django.contrib.sitemaps.views.sitemap"),
+    path(
+        "sitemap.xml",
+        cache_publique(CATALOGUE)(sitemaps_views.index),
+        {"sitemaps": SITEMAPS, "sitemap_url_name": "sitemap_section"},
+        name="sitemap_index",
+    ),
+    path(
+        "sitemap-<section>.xml",
+        cache_publique(CATALOGUE)(sitemaps_views.sitemap),
+        {"sitemaps": SITEMAPS},
+        name="sitemap_section",
+    ),
+    re_path(r"^sitemaps/(?P<nom>sitemap[\w-]*\.xml)$", sitemap_genere, name="sitemap_genere"),
     path("robots.txt", TemplateView.as_view(template_name="robots.txt", content_type="text/plain")),
     path('sw.js', TemplateView.as_view(template_name="sw.js", content_type='application/javascript'), name='sw.js'),
 ]
@@ -0,0 +1,118 @@
+// Envoi reprenable des documents volumineux (voir apps/core/services/televersement.py).
+// Sur un <input type="file" data-televersement="<cible>">, le fichier est envoyé
+// par morceaux à /api/televersements/ dès sa sélection ; en cas de coupure, l'envoi
+// reprend à l'offset connu du serveur. L'identifiant obtenu est placé dans le champ
+// caché data-televersement-champ et le fichier retiré de l'input : le formulaire
+// n'envoie plus que cet identifiant.
+(function () {
+    const URL_API = "/api/televersements/";
+    const ESSAIS_MAX = 8;
+
+    function csrf() {
+        const cookie = document.cookie.split("; ").find((c) => c.startsWith("csrftoken="));
+        return cookie ? decodeURIComponent(cookie.split("=")[1]) : "";
+    }
+
+    function attendre(ms) {
+        return new Promise((resoudre) => setTimeout(resoudre, ms));
+    }
+
+    async function requete(url, options) {
+        const reponse = await fetch(url, {
+            credentials: "same-origin",
+            ...options,
+            headers: { "X-CSRFToken": csrf(), ...(options.headers || {}) },
+        });
+        return reponse;
+    }
+
+    async function offsetServeur(url) {
+        const reponse = await requete(url, { method: "HEAD" });
+        if (!reponse.ok) throw new Error("Téléversement introuvable");
+        return parseInt(reponse.headers.get("Upload-Offset"), 10);
+    }
+
+    async function envoyer(fichier, cible, progression) {
+        const creation = await requete(URL_API, {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({
+                cible: cible,
+                nom_original: fichier.name,
+                type_mime: fichier.type,
+                taille: fichier.size,
+            }),
+        });
+        const infos = await creation.json();
+        if (!creation.ok) throw new Error(Object.values(infos).flat().join(" "));
+
+        const url = creation.headers.get("Location");
+        let offset = 0;
+        let essais = 0;
+        while (offset < fichier.size) {
+            const morceau = fichier.slice(offset, offset + infos.taille_morceau);
+            let reponse;
+            try {
+                reponse = await requete(url, {
+                    method: "PATCH",
+                    headers: {
+                        "Content-Type": "application/offset+octet-stream",
+                        "Upload-Offset": String(offset),
+                    },
+                    body: morceau,
+                });
+            } catch (erreur) {
+                reponse = null; // réseau coupé : on reprend là où le serveur en est
+            }
+
+            if (reponse && reponse.ok) {
+                offset = parseInt(reponse.headers.get("Upload-Offset"), 10);
+                essais = 0;
+                progression(offset / fichier.size);
+            } else if (reponse && reponse.status === 409) {
+                offset = parseInt(reponse.headers.get("Upload-Offset"), 10);
+            } else if (reponse && reponse.status < 500) {
+                const erreur = await reponse.json().catch(() => ({}));
+                throw new Error(erreur.detail || Object.values(erreur).flat().join(" ") || "Envoi refusé");
+            } else {
+                essais += 1;
+                if (essais > ESSAIS_MAX) throw new Error("Connexion perdue, réessayez plus tard.");
+                await attendre(Math.min(30000, 1000 * 2 ** essais));
+                offset = await offsetServeur(url).catch(() => offset);
+            }
+        }
+        return infos.id;
+    }
+
+    function brancher(input) {
+        const cache = document.getElementById(input.dataset.televersementChamp);
+        const statut = document.createElement("p");
+        statut.className = "mt-1 text-xs text-neutral-400";
+        input.insertAdjacentElement("afterend", statut);
+
+        input.addEventListener("change", async () => {
+            const fichier = input.files[0];
+            if (!fichier || !cache) return;
+            const boutons = input.form.querySelectorAll("[type=submit]");
+            boutons.forEach((b) => (b.disabled = true));
+            cache.value = "";
+            statut.className = "mt-1 text-xs text-neutral-400";
+            try {
+                cache.value = await envoyer(fichier, input.dataset.televersement, (p) => {
+                    statut.textContent = `Envoi : ${Math.round(p * 100)} %`;
+                });
+                input.value = "";
+                statut.textContent = `✓ ${fichier.name} envoyé`;
+            } catch (erreur) {
+                statut.textContent = erreur.message;
+                statut.className = "mt-1 text-xs text-red-400";
+            } finally {
+                boutons.forEach((b) => (b.disabled = false));
+            }
+        });
+    }
+
+    document.addEventListener("DOMContentLoaded", () => {
+        document.querySelectorAll("input[type=file][data-televersement]").forEach(brancher);
+    });
+})();